@@ -1,12 +1,17 @@
-from typing import Dict, Any, Optional, Callable, List, Union
+from typing import Dict, Any, Optional, Callable, List, Union, Iterable
 from src.utils.logger import get_main_logger, get_rag_logger
 from src.book_data_interface import BookDataInterface
 from src.embedding import EmbeddingService
-from src.services.text_processor import load_and_preprocess_text, extract_dates, extract_named_entities, extract_key_phrases
+from src.services.text_processor import load_and_preprocess_text, chunk_id
+from src.services.feature_extractor import FeatureExtractor, FeatureExtractionStage, get_feature_extractor
 from src.vector_store_service import VectorStoreService
+from src.manifest_store import ManifestStore, diff_chunk_ids
+from src.services.deduplication import NearDuplicateDetector
+from src.ingest_pipeline import IngestPipeline
+from src.config import DEFERRED_FEATURE_EXTRACTION, DEDUP_ENABLED
 from tqdm import tqdm
+import numpy as np
 import time
-import asyncio
 
 logger = get_main_logger()
 rag_logger = get_rag_logger()
@@ -15,17 +20,45 @@ class BookDataFactory:
     def __init__(self, 
                  embedding_service: EmbeddingService, 
                  vector_store_service: VectorStoreService,
-                 progress_callback: Optional[Callable[[str, int, int], None]] = None):
+                 progress_callback: Optional[Callable[[str, int, int], None]] = None,
+                 feature_extractor: Optional[FeatureExtractor] = None,
+                 deferred_features: bool = DEFERRED_FEATURE_EXTRACTION,
+                 manifest_store: Optional[ManifestStore] = None,
+                 deduplicate: bool = DEDUP_ENABLED):
         self.embedding_service = embedding_service
         self.vector_store_service = vector_store_service
         self.progress_callback = progress_callback
+        self.feature_extractor = feature_extractor or get_feature_extractor()
+        self.deferred_features = deferred_features
+        self.manifest_store = manifest_store or ManifestStore()
+        self.deduplicate = deduplicate
 
-    async def report_progress(self, status, current, total):
-        if self.progress_callback:
-            await self.progress_callback(status, current, total)
+    def report_progress(self, status: str, current: int, total: int,
+                        progress_callback: Optional[Callable[[str, int, int], None]] = None):
+        """
+        Report progress to the given callback or the factory's one.
 
-    def create_from_text(self, input_data: Union[str, Dict[str, Any]]) -> BookDataInterface:
-        """Create BookDataInterface from raw text or preprocessed data."""
+        Callbacks are called synchronously from the ingesting thread, so they must
+        be thread-safe and must not block (WebSocketManager.progress_callback
+        hands events to the event loop). A failing callback does not stop the ingest.
+        """
+        callback = progress_callback or self.progress_callback
+        if not callback:
+            return
+        try:
+            callback(status, current, total)
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {str(e)}")
+
+    def create_from_text(self, input_data: Union[str, Dict[str, Any]], book_id: Optional[str] = None,
+                         progress_callback: Optional[Callable[[str, int, int], None]] = None) -> BookDataInterface:
+        """
+        Create BookDataInterface from raw text or preprocessed data.
+
+        If book_id is given, the chunks are diffed against the previously stored
+        version of the book: only new chunks are upserted and chunks that no longer
+        exist are deleted. Unchanged chunks are served from the embedding cache.
+        """
         try:
             logger.info(f"Starting create_from_text with input type: {type(input_data)}")
             rag_logger.info(
@@ -34,7 +67,7 @@ class BookDataFactory:
                 f"{'-'*50}"
             )
             
-            asyncio.create_task(self.report_progress("Starting text processing", 0, 4))
+            self.report_progress("Starting text processing", 0, 4, progress_callback)
             
             # Get preprocessed data
             logger.info("Calling load_and_preprocess_text...")
@@ -49,7 +82,7 @@ class BookDataFactory:
             if not chunks:
                 raise ValueError("No chunks found in preprocessed data")
             
-            asyncio.create_task(self.report_progress("Extracting features", 1, 4))
+            self.report_progress("Extracting features", 1, 4, progress_callback)
 
             # Convert chunks to text
             logger.info("Converting chunks to text...")
@@ -57,40 +90,38 @@ class BookDataFactory:
             logger.info(f"Text chunks type: {type(text_chunks)}")
             logger.info(f"First text chunk type: {type(text_chunks[0])}")
             
-            # Extract features
-            logger.info("Extracting features...")
-            dates = extract_dates(text_chunks)
-            logger.info(f"Dates extracted: {len(dates)}")
-            entities = extract_named_entities(text_chunks)
-            logger.info(f"Entities extracted: {len(entities)}")
-            key_phrases = extract_key_phrases(text_chunks)
-            logger.info(f"Key phrases extracted: {len(key_phrases)}")
+            # Collapse near-duplicate chunks (headers, licence pages, TOCs) before embedding
+            dedup = None
+            if self.deduplicate:
+                dedup = NearDuplicateDetector().deduplicate(text_chunks)
+                text_chunks = dedup['chunks']
             
-            logger.info("Features extracted successfully")
-            rag_logger.info(
-                f"\nFeature Extraction:\n"
-                f"Chunks: {len(chunks)}\n"
-                f"Dates: {len(dates)}\n"
-                f"Entities: {len(entities)}\n"
-                f"Key phrases: {len(key_phrases)}\n"
-                f"{'-'*50}"
-            )
+            # Extract features: in the background when deferred, so that only
+            # chunking and embedding stand between upload and the first answer
+            feature_stage = FeatureExtractionStage(text_chunks, self.feature_extractor)
+            if self.deferred_features:
+                logger.info(f"Starting background feature extraction with {self.feature_extractor.name} engine...")
+                feature_stage.start()
+            else:
+                logger.info(f"Extracting features with {self.feature_extractor.name} engine...")
+                feature_stage.run()
+                logger.info("Features extracted successfully")
             
-            asyncio.create_task(self.report_progress("Creating embeddings", 2, 4))
+            self.report_progress("Creating embeddings", 2, 4, progress_callback)
             
             # Create embeddings
             logger.info("Creating embeddings...")
             embeddings = self._create_embeddings_with_retry(text_chunks)
             logger.info(f"Embeddings created: {len(embeddings)}")
             
-            asyncio.create_task(self.report_progress("Storing vectors", 3, 4))
+            self.report_progress("Storing vectors", 3, 4, progress_callback)
             
-            # Store vectors
+            # Store vectors: only chunks that are not already stored for this book
             logger.info("Storing vectors...")
-            self.vector_store_service.store_vectors(text_chunks, embeddings)
+            ingest_stats = self._store_changed_vectors(text_chunks, embeddings, book_id)
             logger.info("Vectors stored successfully")
             
-            asyncio.create_task(self.report_progress("Completed", 4, 4))
+            self.report_progress("Completed", 4, 4, progress_callback)
             
             logger.info("Creating BookDataInterface instance...")
             return BookDataInterface(
@@ -98,9 +129,13 @@ class BookDataFactory:
                 embeddings=embeddings,
                 processed_text=preprocessed_data,
                 embedding_service=self.embedding_service,  # Pass the service
-                dates=dates,
-                entities=entities,
-                key_phrases=key_phrases
+                feature_stage=feature_stage,
+                metadata={
+                    **ingest_stats,
+                    'chunk_positions': dedup['canonical_indices'] if dedup else None,
+                    'duplicates': self._duplicate_references(dedup, ingest_stats['chunk_ids']),
+                    'dedup_stats': dedup['stats'] if dedup else None
+                }
             )
         except Exception as e:
             error_msg = f"Error in create_from_text: {str(e)}"
@@ -108,6 +143,129 @@ class BookDataFactory:
             rag_logger.error(f"\nBook Processing Error:\n{error_msg}\n{'-'*50}")
             raise
 
+    def create_from_stream(self, segments: Iterable[str], book_id: Optional[str] = None,
+                           progress_callback: Optional[Callable[[str, int, int], None]] = None) -> BookDataInterface:
+        """
+        Create BookDataInterface from a stream of text segments (file blocks, pages).
+
+        Chunking, embedding and vector upserts run as overlapped pipeline stages,
+        so the full text is never held in memory. Features are extracted once all
+        chunks are known.
+        """
+        try:
+            rag_logger.info(f"\nBook Processing Start:\nInput: stream\n{'-'*50}")
+            result = self._make_pipeline(progress_callback).run(segments, book_id)
+            chunks = result.pop('chunks')
+            embeddings = result.pop('embeddings')
+            if not chunks:
+                raise ValueError("No chunks found in input stream")
+
+            feature_stage = FeatureExtractionStage(chunks, self.feature_extractor)
+            if self.deferred_features:
+                feature_stage.start()
+            else:
+                feature_stage.run()
+
+            return BookDataInterface(
+                chunks=chunks,
+                embeddings=embeddings,
+                processed_text={'chunks': chunks},  # The full text is not retained when streaming
+                embedding_service=self.embedding_service,
+                feature_stage=feature_stage,
+                metadata=result
+            )
+        except Exception as e:
+            error_msg = f"Error in create_from_stream: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            rag_logger.error(f"\nBook Processing Error:\n{error_msg}\n{'-'*50}")
+            raise
+
+    def ingest_chunks(self, chunks: Iterable[str], book_id: str, **manifest_extra: Any) -> Dict[str, Any]:
+        """
+        Embed and store already split chunks of a book without building a BookDataInterface.
+
+        Used for bulk ingest, where only the vector store and manifest are updated.
+        Returns the pipeline result without chunks and embeddings.
+        """
+        result = self._make_pipeline().run_chunks(chunks, book_id, **manifest_extra)
+        result.pop('chunks')
+        result.pop('embeddings')
+        return result
+
+    def _make_pipeline(self, progress_callback: Optional[Callable[[str, int, int], None]] = None) -> IngestPipeline:
+        return IngestPipeline(
+            embed=self._create_embeddings_with_retry,
+            vector_store_service=self.vector_store_service,
+            manifest_store=self.manifest_store,
+            deduplicate=self.deduplicate,
+            progress_callback=progress_callback
+        )
+
+    def restore_vectors(self, book_data: BookDataInterface) -> Optional[Dict[str, Any]]:
+        """
+        Make the vector store hold a stored book snapshot again, without creating embeddings.
+
+        Does nothing if the book manifest already lists exactly the snapshot's vectors.
+        """
+        metadata = book_data.get_metadata()
+        book_id = metadata.get('book_id')
+        if not book_id:
+            return None
+        manifest = self.manifest_store.get(book_id)
+        if manifest and manifest['chunk_ids'] == metadata.get('chunk_ids'):
+            return None
+        logger.info(f"Restoring vectors of {book_id} from snapshot")
+        embeddings = book_data.get_embeddings()
+        if isinstance(embeddings, np.ndarray):  # Memory-mapped library index
+            embeddings = embeddings.tolist()
+        return self._store_changed_vectors(book_data.get_chunks(), embeddings, book_id)
+
+    def _store_changed_vectors(self, chunks: List[str], embeddings: List[List[float]],
+                               book_id: Optional[str]) -> Dict[str, Any]:
+        """Upsert new chunks, delete removed ones and update the book manifest."""
+        hashes = [chunk_id(chunk) for chunk in chunks]
+        vector_ids = [f"{book_id}-{h}" if book_id else h for h in hashes]
+
+        previous = self.manifest_store.get(book_id) if book_id else None
+        diff = diff_chunk_ids(previous['chunk_ids'] if previous else [], vector_ids)
+        added = set(diff['added'])
+
+        # Upsert each new vector once, even if the same chunk text repeats in the book
+        positions = list({vid: i for i, vid in enumerate(vector_ids) if vid in added}.values())
+        if positions:
+            self.vector_store_service.store_vectors(
+                [chunks[i] for i in positions],
+                [embeddings[i] for i in positions],
+                [vector_ids[i] for i in positions]
+            )
+        if diff['removed']:
+            self.vector_store_service.delete_vectors(diff['removed'])
+        if book_id:
+            self.manifest_store.save(book_id, vector_ids)
+
+        rag_logger.info(
+            f"\nIncremental Ingest:\n"
+            f"Book: {book_id or 'n/a'}\n"
+            f"Previous version: {'yes' if previous else 'no'}\n"
+            f"Added: {len(diff['added'])}, removed: {len(diff['removed'])}, unchanged: {len(diff['unchanged'])}\n"
+            f"{'-'*50}"
+        )
+        return {
+            'book_id': book_id,
+            'chunk_ids': vector_ids,
+            'added': len(diff['added']),
+            'removed': len(diff['removed']),
+            'unchanged': len(diff['unchanged'])
+        }
+
+    @staticmethod
+    def _duplicate_references(dedup: Optional[Dict[str, Any]], chunk_ids: List[str]) -> Dict[str, List[int]]:
+        """Map canonical chunk IDs to the original positions of the chunks collapsed onto them."""
+        if not dedup:
+            return {}
+        position_to_id = dict(zip(dedup['canonical_indices'], chunk_ids))
+        return {position_to_id[canonical]: positions for canonical, positions in dedup['references'].items()}
+
     def _create_embeddings_with_retry(self, chunks: List[str], max_retries: int = 3) -> List[List[float]]:
         """Helper method to create embeddings with retry logic."""
         for attempt in range(max_retries):
@@ -1,8 +1,10 @@
 from typing import List, Dict, Any, Optional  # Import necessary types for type hinting
 import pickle  # Import pickle for object serialization
 import os  # Import os for file and directory operations
+import numpy as np  # Import numpy for the embedding matrix
 from src.data_source import DataSource
 from src.embedding import EmbeddingService  # Import the EmbeddingService for embedding functionalities
+from src.services.feature_extractor import FeatureExtractionStage  # Background feature extraction stage
 
 
 class BookDataInterface(DataSource):
@@ -13,33 +15,41 @@ class BookDataInterface(DataSource):
                  embedding_service: EmbeddingService,  # Instance of EmbeddingService for embedding operations
                  dates: Optional[List[str]] = None,  # Optional list of dates associated with the chunks
                  entities: Optional[List[Dict[str, Any]]] = None,  # Optional list of entities found in the text
-                 key_phrases: Optional[List[str]] = None):  # Optional list of key phrases extracted from the text
+                 key_phrases: Optional[List[str]] = None,  # Optional list of key phrases extracted from the text
+                 feature_stage: Optional[FeatureExtractionStage] = None,  # Optional background stage computing the features
+                 metadata: Optional[Dict[str, Any]] = None):  # Optional book metadata (book ID, chunk IDs, ingest stats)
         self._chunks = chunks  # Initialize the chunks
-        self._embeddings = embeddings  # Initialize the embeddings
+        if embeddings is not None and not isinstance(embeddings, np.ndarray):
+            embeddings = np.asarray(embeddings, dtype=np.float64)  # One matrix built once, scored by every search without a copy
+        self._embeddings = embeddings  # Initialize the embeddings (arrays, e.g. memory-mapped indexes, are kept as they are)
         self._processed_text = processed_text  # Initialize the processed text
         self._embedding_service = embedding_service  # Initialize the embedding service
-        self._dates = dates or []  # Initialize dates, default to empty list if None
-        self._entities = entities or []  # Initialize entities, default to empty list if None
-        self._key_phrases = key_phrases or []  # Initialize key phrases, default to empty list if None
+        # Features come from a (possibly still running) stage; known values form a completed one
+        self._feature_stage = feature_stage or FeatureExtractionStage.completed(dates, entities, key_phrases)
+        self._metadata = metadata or {}  # Initialize metadata, default to empty dict if None
         
     @classmethod
-    def from_file(cls, file_path: str):
-        """Create an instance of BookDataInterface from a file."""
+    def from_file(cls, file_path: str, embedding_service: Optional[EmbeddingService] = None,
+                  embeddings: Optional[Any] = None):
+        """Create an instance of BookDataInterface from a file (embeddings stored separately can be passed in)."""
         with open(file_path, 'rb') as f:  # Open the file in binary read mode
             data = pickle.load(f)  # Load the data from the file
-        return cls(data['chunks'], data['embeddings'], data.get('processed_text', {}), 
-                   data.get('embedding_service', {}), data.get('dates', []), 
-                   data.get('entities', []), data.get('key_phrases', []))  # Return an instance with loaded data
+        embeddings = embeddings if embeddings is not None else data['embeddings']  # Use separately stored embeddings if given
+        return cls(data['chunks'], embeddings, data.get('processed_text', {}), 
+                   embedding_service or data.get('embedding_service', {}), data.get('dates', []), 
+                   data.get('entities', []), data.get('key_phrases', []),
+                   metadata=data.get('metadata', {}))  # Return an instance with loaded data
 
-    def save(self, file_path: str):
-        """Save the current instance data to a file."""
+    def save(self, file_path: str, include_embeddings: bool = True):
+        """Save the current instance data to a file (without embeddings if they are stored separately)."""
         data = {
             'chunks': self._chunks,  # Store chunks
-            'embeddings': self._embeddings,  # Store embeddings
+            'embeddings': self._embeddings if include_embeddings else None,  # Store embeddings
             'processed_text': self._processed_text,  # Store processed text
-            'dates': self._dates,  # Store dates
-            'entities': self._entities,  # Store entities
-            'key_phrases': self._key_phrases  # Store key phrases
+            'dates': self.get_dates(),  # Store dates (waits for feature extraction)
+            'entities': self.get_entities(),  # Store entities
+            'key_phrases': self.get_key_phrases(),  # Store key phrases
+            'metadata': self._metadata  # Store metadata
         }
         os.makedirs(os.path.dirname(file_path), exist_ok=True)  # Create directory if it doesn't exist
         with open(file_path, 'wb') as f:  # Open the file in binary write mode
@@ -53,22 +63,34 @@ class BookDataInterface(DataSource):
         """Return the list of text chunks."""
         return self._chunks  # Return the stored chunks
 
-    def get_embeddings(self) -> List[List[float]]:
-        """Return the list of embeddings."""
+    def get_embeddings(self) -> np.ndarray:
+        """Return the embeddings, one row per chunk."""
         return self._embeddings  # Return the stored embeddings
 
     def get_processed_text(self) -> Dict[str, Any]:
         """Return the processed text data."""
         return self._processed_text  # Return the processed text
 
-    def get_dates(self) -> List[str]:
-        """Return the list of dates associated with the chunks."""
-        return self._dates  # Return the stored dates
+    def get_dates(self, block: bool = True, timeout: Optional[float] = None) -> List[str]:
+        """Return the list of dates; partial results if block is False and extraction is still running."""
+        return self._feature_stage.get('dates', block, timeout)  # Return the extracted dates
 
-    def get_entities(self) -> List[Dict[str, Any]]:
-        """Return the list of entities found in the text."""
-        return self._entities  # Return the stored entities
+    def get_entities(self, block: bool = True, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return the list of entities found in the text; partial results if block is False."""
+        return self._feature_stage.get('entities', block, timeout)  # Return the extracted entities
 
-    def get_key_phrases(self) -> List[str]:
-        """Return the list of key phrases extracted from the text."""
-        return self._key_phrases  # Return the stored key phrases
+    def get_key_phrases(self, block: bool = True, timeout: Optional[float] = None) -> List[str]:
+        """Return the list of key phrases extracted from the text; partial results if block is False."""
+        return self._feature_stage.get('key_phrases', block, timeout)  # Return the extracted key phrases
+
+    def get_metadata(self) -> Dict[str, Any]:
+        """Return the book metadata (book ID, chunk IDs, ingest statistics)."""
+        return self._metadata  # Return the stored metadata
+
+    def get_chunk_positions(self) -> Optional[List[int]]:
+        """Return the position of each chunk in the book before deduplication (None if it is its index)."""
+        return self._metadata.get('chunk_positions')  # Near-duplicate chunks dropped at ingest leave gaps
+
+    def get_feature_status(self) -> Dict[str, Any]:
+        """Return the status of the feature extraction stage."""
+        return self._feature_stage.get_status()  # Return status, progress and timing of the stage
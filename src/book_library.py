@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from src.config import (
+    BOOK_LIBRARY_DIR, EMBEDDING_MODEL, CHUNK_SIZE, OVERLAP, CHUNKING_STRATEGY,
+    CDC_MIN_CHUNK_SIZE, CDC_MAX_CHUNK_SIZE, CDC_WINDOW,
+    DEDUP_ENABLED, DEDUP_THRESHOLD, FEATURE_EXTRACTOR, PINECONE_INDEX_NAME
+)
+from src.book_data_interface import BookDataInterface
+from src.embedding import EmbeddingService
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read block by block."""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while block := f.read(block_size):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def processing_config() -> Dict[str, Any]:
+    """Settings that change the processed book; a change invalidates library entries."""
+    return {
+        'chunking_strategy': CHUNKING_STRATEGY,
+        'chunk_size': CHUNK_SIZE,
+        'overlap': OVERLAP,
+        'cdc_min_chunk_size': CDC_MIN_CHUNK_SIZE,
+        'cdc_max_chunk_size': CDC_MAX_CHUNK_SIZE,
+        'cdc_window': CDC_WINDOW,
+        'dedup_enabled': DEDUP_ENABLED,
+        'dedup_threshold': DEDUP_THRESHOLD,
+        'embedding_model': EMBEDDING_MODEL,
+        'feature_extractor': FEATURE_EXTRACTOR
+    }
+
+
+def library_key(content_hash: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Library key of a book: its content hash combined with the processing configuration."""
+    config = config if config is not None else processing_config()
+    config_hash = hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{content_hash}-{config_hash[:16]}"
+
+
+class BookLibrary:
+    """
+    Content-addressed store of processed books.
+
+    Each entry holds a BookDataInterface snapshot (chunks, features, metadata),
+    its embeddings as a float32 .npy index and the vector-store state it was
+    ingested with (index, book ID, vector IDs), so a file seen before is served
+    without reprocessing. The index is memory-mapped on load: processes serving
+    the same book share its pages instead of each holding a copy.
+    """
+
+    def __init__(self, library_dir: str = BOOK_LIBRARY_DIR):
+        self.library_dir = library_dir
+        os.makedirs(library_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Callable[[str], None]]] = {}  # Keys being saved -> callbacks for when they are
+
+    def _snapshot_path(self, key: str) -> str:
+        return os.path.join(self.library_dir, f"{key}.pkl")
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.library_dir, f"{key}.json")
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.library_dir, f"{key}.npy")
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry metadata for a key, or None if the book is not in the library."""
+        path = self._entry_path(key)
+        if not os.path.exists(path) or not os.path.exists(self._snapshot_path(key)):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading library entry {key}: {str(e)}")
+            return None
+
+    def get(self, key: str, embedding_service: Optional[EmbeddingService] = None,
+            mmap: bool = True) -> Optional[BookDataInterface]:
+        """Load the snapshot stored under a key, or None on a miss (embeddings memory-mapped if mmap)."""
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+        try:
+            embeddings = None
+            if os.path.exists(self._index_path(key)):  # Snapshots written before the .npy index hold their embeddings
+                embeddings = np.load(self._index_path(key), mmap_mode='r' if mmap else None)
+            book_data = BookDataInterface.from_file(self._snapshot_path(key), embedding_service, embeddings)
+        except Exception as e:
+            logger.error(f"Error loading library snapshot {key}: {str(e)}")
+            return None
+        logger.info(f"Library hit for {key}: {len(book_data)} chunks")
+        return book_data
+
+    def put(self, key: str, book_data: BookDataInterface, wait: bool = True) -> None:
+        """
+        Store a processed book.
+
+        The snapshot includes the extracted features, so saving waits for feature
+        extraction; with wait=False this happens in a background thread.
+        """
+        if not wait:
+            with self._lock:
+                self._pending.setdefault(key, [])
+            threading.Thread(target=self.put, args=(key, book_data), name=f"library-{key[:8]}", daemon=True).start()
+            return
+        try:
+            start = time.perf_counter()
+            metadata = book_data.get_metadata()
+            tmp_path = f"{self._index_path(key)}.tmp.npy"
+            np.save(tmp_path, np.asarray(book_data.get_embeddings(), dtype=np.float32))
+            os.replace(tmp_path, self._index_path(key))
+
+            tmp_path = f"{self._snapshot_path(key)}.tmp"
+            book_data.save(tmp_path, include_embeddings=False)
+            os.replace(tmp_path, self._snapshot_path(key))
+
+            entry = {
+                'key': key,
+                'book_id': metadata.get('book_id'),
+                'index_name': PINECONE_INDEX_NAME,
+                'chunk_ids': metadata.get('chunk_ids', []),
+                'chunks_count': len(book_data),
+                'created_at': time.time()
+            }
+            tmp_path = f"{self._entry_path(key)}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._entry_path(key))  # The entry is written last: it marks the snapshot complete
+
+            logger.info(f"Book stored in library as {key}")
+            rag_logger.info(
+                f"\nBook Library:\n"
+                f"Stored: {key}\n"
+                f"Chunks: {len(book_data)}\n"
+                f"Save time: {time.perf_counter() - start:.3f}s\n"
+                f"{'-'*50}"
+            )
+        except Exception as e:
+            logger.error(f"Error storing library entry {key}: {str(e)}")
+        finally:
+            self._notify_saved(key)
+
+    def when_saved(self, key: str, callback: Callable[[str], None]) -> None:
+        """
+        Call callback(key) once the entry is stored: at once if it already is,
+        otherwise when a running background put() finishes (never if it fails).
+        """
+        with self._lock:
+            if key in self._pending:
+                self._pending[key].append(callback)
+                return
+        callback(key)
+
+    def _notify_saved(self, key: str) -> None:
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+        if callbacks and self.get_entry(key) is None:
+            logger.warning(f"Library entry {key} was not stored; {len(callbacks)} save callbacks dropped")
+            return
+        for callback in callbacks:
+            try:
+                callback(key)
+            except Exception as e:
+                logger.error(f"Library save callback for {key} failed: {str(e)}")
+
+    def delete(self, key: str) -> bool:
+        """Remove an entry from the library."""
+        removed = False
+        for path in (self._entry_path(key), self._snapshot_path(key), self._index_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+                removed = True
+        return removed
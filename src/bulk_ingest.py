@@ -0,0 +1,213 @@
+"""
+Bulk ingest of many books (the `ingest` CLI command).
+
+Text extraction and chunking run in a process pool, one file per task, with
+every worker process kept busy. Extracted books go through a bounded queue to a
+small pool of threads that embeds and upserts the chunks of several books at
+once through a shared, rate-limited EmbeddingService; a full queue pauses the
+extraction, which bounds the books held in memory. Every finished book gets a manifest
+recording its content hash and processing configuration, so an interrupted run
+can be restarted and files that did not change are skipped.
+"""
+import os
+import glob
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+from src.config import EMBEDDING_MODEL, INGEST_CONCURRENCY, INGEST_QUEUE_SIZE
+from src.book_data_factory import BookDataFactory
+from src.book_library import hash_file, library_key
+from src.manifest_store import make_book_id
+from src.services.file_processor import FileProcessor
+from src.services.text_processor import iter_text_chunks
+from src.utils.tokens import count_tokens_batch
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf', '.docx', '.odt', '.epub')
+
+
+def resolve_inputs(path_or_glob: str) -> List[str]:
+    """Expand a directory (searched recursively) or glob pattern into supported book files."""
+    if os.path.isdir(path_or_glob):
+        paths = glob.glob(os.path.join(path_or_glob, '**', '*'), recursive=True)
+    else:
+        paths = glob.glob(path_or_glob, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS))
+
+
+def book_id_for(file_path: str, root: str) -> str:
+    """Book ID from the path relative to the input root, so equal file names in different folders differ."""
+    base = root if os.path.isdir(root) else os.path.dirname(root.split('*', 1)[0]) or '.'
+    relative = os.path.relpath(file_path, base)
+    return make_book_id(os.path.splitext(relative)[0].replace(os.sep, '_'))
+
+
+def extract_and_chunk(file_path: str) -> Dict[str, Any]:
+    """Extract and chunk one file (runs in worker processes)."""
+    start = time.perf_counter()
+    # Files are already processed in parallel; a nested PDF pool would oversubscribe the cores
+    chunks = list(iter_text_chunks(FileProcessor(pdf_workers=1).iter_text(file_path)))
+    return {
+        'chunks': chunks,
+        'tokens': sum(count_tokens_batch(chunks, EMBEDDING_MODEL)),
+        'seconds': time.perf_counter() - start
+    }
+
+
+@dataclass
+class IngestSummary:
+    """Totals of a bulk ingest run."""
+    files_total: int = 0
+    files_ingested: int = 0
+    files_skipped: int = 0
+    files_failed: int = 0
+    chunks: int = 0
+    tokens: int = 0
+    elapsed_seconds: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def files_per_minute(self) -> float:
+        return self.files_ingested * 60 / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def format(self) -> str:
+        lines = [
+            f"Files: {self.files_ingested} ingested, {self.files_skipped} unchanged, "
+            f"{self.files_failed} failed (of {self.files_total})",
+            f"Chunks: {self.chunks}, tokens: {self.tokens}",
+            f"Elapsed: {self.elapsed_seconds:.1f}s",
+            f"Throughput: {self.files_per_minute:.1f} files/min, "
+            f"{self.chunks_per_second:.1f} chunks/s, {self.tokens_per_second:.0f} tokens/s",
+        ]
+        lines += [f"Failed: {path}: {error}" for path, error in self.errors.items()]
+        return "\n".join(lines)
+
+
+class BulkIngester:
+    """Ingests many files concurrently; see the module docstring."""
+
+    def __init__(self,
+                 factory: BookDataFactory,
+                 workers: Optional[int] = None,
+                 concurrency: int = INGEST_CONCURRENCY,
+                 queue_size: int = INGEST_QUEUE_SIZE,
+                 on_file_done: Optional[Callable[[str, str], None]] = None):
+        """
+        Args:
+            factory: Factory whose embedding service (with a shared rate limiter),
+                vector store and manifest store are used for every book
+            workers: Processes for extraction and chunking (CPU count if None)
+            concurrency: Books embedded and upserted at the same time
+            queue_size: Extracted books waiting for an embedding thread
+            on_file_done: Called with (file path, 'ingested' | 'skipped' | 'failed')
+        """
+        self.factory = factory
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.on_file_done = on_file_done
+        self._lock = threading.Lock()
+
+    def ingest(self, path_or_glob: str, force: bool = False) -> IngestSummary:
+        """Ingest every supported file under a directory or matching a glob."""
+        files = resolve_inputs(path_or_glob)
+        summary = IngestSummary(files_total=len(files))
+        start = time.perf_counter()
+        logger.info(f"Bulk ingest of {len(files)} files with {self.workers} processes, concurrency {self.concurrency}")
+
+        extracted: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=self.queue_size)
+        # Spawned, not forked: the embedding threads run alongside, and a forked child could inherit a held lock
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as processes, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ingest") as threads:
+            for _ in range(self.concurrency):
+                threads.submit(self._store_books, extracted, summary)
+            try:
+                self._extract_books(processes, files, path_or_glob, force, summary, extracted)
+            finally:
+                for _ in range(self.concurrency):
+                    extracted.put(None)  # One stop marker per embedding thread
+
+        summary.elapsed_seconds = time.perf_counter() - start
+        rag_logger.info(f"\nBulk Ingest:\n{summary.format()}\n{'-'*50}")
+        return summary
+
+    def _extract_books(self, processes: ProcessPoolExecutor, files: List[str], root: str, force: bool,
+                       summary: IngestSummary, extracted: "queue.Queue[Optional[tuple]]") -> None:
+        """Keep every worker process extracting and hand finished books to the queue (blocks while it is full)."""
+        running: Dict[Future, tuple] = {}
+
+        def hand_over(done: Set[Future]) -> None:
+            for future in done:
+                extracted.put((*running.pop(future), future))
+
+        for path in files:
+            book_id = book_id_for(path, root)
+            try:
+                key = library_key(hash_file(path))
+            except Exception as e:
+                self._finish(path, 'failed', summary, error=e)
+                continue
+            manifest = self.factory.manifest_store.get(book_id)
+            if not force and manifest and manifest.get('library_key') == key:
+                self._finish(path, 'skipped', summary)
+                continue
+
+            if len(running) >= self.workers:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                hand_over(done)
+            running[processes.submit(extract_and_chunk, path)] = (path, book_id, key)
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            hand_over(done)
+
+    def _store_books(self, extracted: "queue.Queue[Optional[tuple]]", summary: IngestSummary) -> None:
+        """Embed and upsert extracted books until a stop marker arrives (runs in the embedding threads)."""
+        while True:
+            item = extracted.get()
+            if item is None:
+                return
+            path, book_id, key, future = item
+            try:
+                result = future.result()
+                if not result['chunks']:
+                    raise ValueError("No text extracted")
+                # The manifest (with the key) is written only after all vectors are stored: reruns resume here
+                self.factory.ingest_chunks(result['chunks'], book_id, library_key=key, source_path=path)
+            except Exception as e:
+                self._finish(path, 'failed', summary, error=e)
+                continue
+            self._finish(path, 'ingested', summary, chunks=len(result['chunks']), tokens=result['tokens'])
+
+    def _finish(self, path: str, status: str, summary: IngestSummary, chunks: int = 0, tokens: int = 0,
+                error: Optional[Exception] = None) -> None:
+        """Count a finished file and report it (thread-safe)."""
+        if error is not None:
+            logger.error(f"Failed to ingest {path}: {str(error)}")
+        with self._lock:
+            if status == 'ingested':
+                summary.files_ingested += 1
+                summary.chunks += chunks
+                summary.tokens += tokens
+            elif status == 'skipped':
+                summary.files_skipped += 1
+            else:
+                summary.files_failed += 1
+                summary.errors[path] = str(error)
+            if self.on_file_done:
+                self.on_file_done(path, status)
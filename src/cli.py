@@ -1,16 +1,28 @@
 import os  # Importing os module for file path operations
-from openai import OpenAI  # Importing OpenAI client for API interactions
+import asyncio  # Importing asyncio for the concurrency limit of async questions
+from concurrent.futures import ThreadPoolExecutor  # Importing thread pool for chunk scoring off the event loop
+from openai import OpenAI, AsyncOpenAI  # Importing OpenAI clients for API interactions
 from src.book_data_factory import BookDataFactory  # Importing factory for creating book data
 from src.services.file_processor import FileProcessor  # Importing file processor for handling book files
 from src.utils.logger import get_main_logger, get_rag_logger  # Importing logging utilities
 from src.embedding import EmbeddingService  # Importing embedding service for generating embeddings
-from src.rag import rag_query  # Importing function for querying the RAG system
+from src.rag import rag_query, arag_query, astream_rag_query, abatch_rag_query  # Importing functions for querying the RAG system
 from src.book_data_interface import BookDataInterface  # Importing interface for book data handling
 from src.openai_service import OpenAIService  # Importing OpenAI service for API interactions
 from src.pinecone_manager import PineconeManager  # Importing Pinecone manager for vector storage
 from src.cache_manager import CacheManager  # Importing cache manager for caching functionalities
-from src.config import OPENAI_API_KEY, CACHE_DIR  # Importing configuration constants
-from typing import Union, TextIO  # Importing types for type hinting
+from src.config import (  # Importing configuration constants
+    OPENAI_API_KEY, OPENAI_BASE_URL, CACHE_DIR, STREAMING_INGEST, BOOK_LIBRARY_ENABLED,
+    EMBEDDING_REQUESTS_PER_MINUTE, EMBEDDING_TOKENS_PER_MINUTE, INGEST_CONCURRENCY, INGEST_QUEUE_SIZE,
+    ASK_CONCURRENCY, RETRIEVAL_WORKERS, TOP_K_CHUNKS
+)
+from typing import Any, AsyncIterator, Callable, Dict, List, Union, TextIO, Optional  # Importing types for type hinting
+from src.manifest_store import make_book_id  # Importing helper deriving book IDs from file names
+from src.book_library import BookLibrary, library_key, hash_file  # Importing content-addressed library of processed books
+from src.bulk_ingest import BulkIngester, resolve_inputs  # Importing bulk ingest of directories of books
+from src.utils.rate_limiter import RateLimiter  # Importing rate limiter for shared embedding budget
+from src.utils.single_flight import SingleFlight, question_key  # Importing coalescing of identical questions
+import hashlib  # Importing hashlib for hashing raw text input
 from src.vector_store_service import VectorStoreService  # Importing vector store service for managing embeddings
 from tqdm import tqdm  # Importing tqdm for progress bar functionality
 import sys  # Importing sys for system-specific parameters and functions
@@ -30,31 +42,33 @@ def create_progress_bar(desc: str, total: int) -> tqdm:
         ncols=80  # Width of the progress bar
     )
 
-def progress_callback(progress_info):
-    """Callback функция для отображения прогресса"""
+def progress_callback(status: str, current: int, total: int):
+    """Callback функция для отображения прогресса (status, current, total)"""
     # Используем существующий create_progress_bar
     if not hasattr(progress_callback, 'pbar'):
-        progress_callback.pbar = create_progress_bar(
-            progress_info['message'], 
-            progress_info['total']
-        )
+        progress_callback.pbar = create_progress_bar(status, total)
     
     # Обновляем прогресс
-    current = progress_info['current'] - progress_callback.pbar.n
-    progress_callback.pbar.update(current)
+    progress_callback.pbar.set_description(status)
+    progress_callback.pbar.update(current - progress_callback.pbar.n)
     
     # Закрываем если завершено
-    if progress_info['progress'] >= 100:
+    if current >= total:
         progress_callback.pbar.close()
         delattr(progress_callback, 'pbar')
 
 class BookAssistant:
     """Main class for handling book processing and question answering."""
     
-    def __init__(self, progress_callback=progress_callback):
-        """Initialize all necessary services."""
+    def __init__(self, progress_callback=progress_callback, rate_limiter: Optional[RateLimiter] = None):
+        """
+        Initialize all necessary services (rate_limiter is shared by all embedding calls).
+
+        progress_callback=None turns off progress output, the per-batch embedding bars included.
+        """
         # Initialize base services
-        self.openai_client = OpenAI(api_key=OPENAI_API_KEY)  # Initialize OpenAI client with API key
+        self.openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)  # Initialize OpenAI client with API key
+        self.async_openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)  # Initialize async client for query embeddings
         self.vector_store = PineconeManager(lazy_init=False)  # Initialize Pinecone manager
         self.cache_manager = CacheManager(CACHE_DIR)  # Initialize cache manager with cache directory
         
@@ -63,7 +77,9 @@ class BookAssistant:
         self.embedding_service = EmbeddingService(
             openai_client=self.openai_client,  # Pass OpenAI client to embedding service
             cache_manager=self.cache_manager,  # Pass cache manager to embedding service
-            progress_callback=self.update_progress  # Set progress callback for embedding service
+            progress_callback=self.update_progress if progress_callback is not None else None,  # Set progress callback for embedding service
+            rate_limiter=rate_limiter,  # Set shared rate limiter for embedding requests
+            async_client=self.async_openai_client  # Set async client for non-blocking query embeddings
         )
         self.vector_store_service = VectorStoreService(vector_store=self.vector_store)  # Initialize vector store service
         
@@ -73,16 +89,68 @@ class BookAssistant:
             vector_store_service=self.vector_store_service,  # Pass vector store service to factory
             progress_callback=progress_callback  # Set progress callback for factory
         )
+        self.library = BookLibrary() if BOOK_LIBRARY_ENABLED else None  # Processed books keyed by content
+        self.retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")  # Chunk scoring for async questions
+        self.ask_semaphore = asyncio.Semaphore(ASK_CONCURRENCY)  # Limit of questions in flight
+        self.question_flight = SingleFlight("ask")  # Coalesces identical concurrent questions
         logger.info("Book Assistant initialized")  # Log initialization of Book Assistant
         rag_logger.info("\nSystem Initialization:\nStatus: Ready\n" + "-"*50)  # Log system status
 
-    def load_and_process_book(self, input_data: Union[str, TextIO]) -> BookDataInterface:
-        """Load and process book from file path or text content."""
+    def load_and_process_book(self, input_data: Union[str, TextIO], book_id: Optional[str] = None,
+                              content_hash: Optional[str] = None,
+                              progress_callback: Optional[Callable[[str, int, int], None]] = None) -> BookDataInterface:
+        """
+        Load and process book from file path or text content.
+
+        Files get a book ID derived from their name unless one is given, so a
+        re-uploaded edition only re-ingests the chunks that changed. content_hash
+        (SHA-256 of the file, e.g. computed while uploading) is kept in the book metadata.
+
+        Books already in the library (same content and processing configuration)
+        are returned from their snapshot without reprocessing; metadata['library_hit']
+        tells which case applied. progress_callback receives (status, current, total)
+        while a streamed file is ingested.
+        """
+        key = None
+        if self.library is not None:
+            content_hash = content_hash or self._content_hash(input_data)
+            key = library_key(content_hash) if content_hash else None
+            book_data = self.library.get(key, self.embedding_service) if key else None
+            if book_data is not None:
+                self.book_data_factory.restore_vectors(book_data)  # Re-upsert if the index changed since
+                book_data.get_metadata().update(content_hash=content_hash, library_hit=True)
+                rag_logger.info(f"\nBook Loading:\nLibrary hit: {key}\n{'-'*50}")
+                return book_data
+
+        book_data = self._load_and_process_book(input_data, book_id, progress_callback)
+        book_data.get_metadata().update(content_hash=content_hash, library_hit=False)
+        if key:
+            self.library.put(key, book_data, wait=False)  # Saved once background feature extraction finishes
+        return book_data
+
+    @staticmethod
+    def _content_hash(input_data: Union[str, TextIO]) -> Optional[str]:
+        """SHA-256 of a file path's content or of raw text; None for streams."""
+        if not isinstance(input_data, str):
+            return None
+        if os.path.exists(input_data):
+            return hash_file(input_data)
+        return hashlib.sha256(input_data.encode('utf-8')).hexdigest()
+
+    def _load_and_process_book(self, input_data: Union[str, TextIO], book_id: Optional[str] = None,
+                               progress_callback: Optional[Callable[[str, int, int], None]] = None) -> BookDataInterface:
         try:
             # Get text content from input data
             if isinstance(input_data, str):
                 if os.path.exists(input_data):  # Check if input is a valid file path
+                    book_id = book_id or make_book_id(input_data)  # Identify the book by its file name
                     file_processor = FileProcessor()  # Initialize file processor
+                    if STREAMING_INGEST:
+                        # Stream the file through chunking, embedding and upserts
+                        return self.book_data_factory.create_from_stream(
+                            file_processor.iter_text(input_data), book_id=book_id,
+                            progress_callback=progress_callback
+                        )
                     text = file_processor.process_file(input_data)  # Process the file to get text
                 else:
                     text = input_data  # Use the input string as text
@@ -98,7 +166,7 @@ class BookAssistant:
                 f"Content length: {len(text)} chars\n"
                 f"{'-'*50}"
             )
-            return self.book_data_factory.create_from_text(text)  # Create and return BookDataInterface from text
+            return self.book_data_factory.create_from_text(text, book_id=book_id, progress_callback=progress_callback)  # Create and return BookDataInterface from text
         except Exception as e:
             error_msg = f"Error processing book: {str(e)}"  # Prepare error message
             logger.error(error_msg)  # Log error
@@ -128,6 +196,57 @@ class BookAssistant:
             rag_logger.error(f"\nAnswer Generation Error:\n{error_msg}\n{'-'*50}")  # Log answer generation error
             return f"An error occurred: {str(e)}"  # Return error message
 
+    async def answer_question_async(self, query: str, book_data: BookDataInterface) -> str:
+        """
+        Generate answer for a question without blocking the event loop.
+
+        At most ASK_CONCURRENCY questions are processed at once; further ones wait.
+        Identical questions about the same book asked while one is being answered
+        share its answer (one embedding, search and completion for all of them).
+        """
+        key = question_key(query, book_data, f"cosine-top{TOP_K_CHUNKS}")  # Book, normalized question, strategy
+        return await self.question_flight.do(key, lambda: self._answer_question_async(query, book_data))
+
+    async def _answer_question_async(self, query: str, book_data: BookDataInterface) -> str:
+        async with self.ask_semaphore:
+            logger.info(f"Processing query (async): {query}")  # Log the query being processed
+            answer = await arag_query(
+                query, book_data, self.openai_service, self.embedding_service, self.retrieval_executor
+            )  # Generate answer using async RAG query
+            rag_logger.info(
+                f"\nAnswer Generated:\n"
+                f"Length: {len(answer)} chars\n"
+                f"{'-'*50}"
+            )
+            return answer  # Return the generated answer
+
+    async def stream_answer(self, query: str, book_data: BookDataInterface) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the answer to a question as events (see astream_rag_query).
+
+        Shares the ASK_CONCURRENCY limit with answer_question_async.
+        """
+        async with self.ask_semaphore:
+            logger.info(f"Processing query (stream): {query}")  # Log the query being processed
+            async for event in astream_rag_query(
+                query, book_data, self.openai_service, self.embedding_service, self.retrieval_executor
+            ):
+                yield event  # Forward retrieval metadata, answer pieces and statistics
+
+    async def answer_batch(self, queries: List[str], book_data: BookDataInterface) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer several questions about a book as events (see abatch_rag_query).
+
+        The batch counts as one question towards ASK_CONCURRENCY; its answers are
+        generated BATCH_ANSWER_CONCURRENCY at a time.
+        """
+        async with self.ask_semaphore:
+            logger.info(f"Processing batch of {len(queries)} queries")  # Log the batch being processed
+            async for event in abatch_rag_query(
+                queries, book_data, self.openai_service, self.embedding_service, self.retrieval_executor
+            ):
+                yield event  # Forward answers as they complete, then statistics
+
     def run(self):
         """Run the interactive CLI session."""
         logger.info("Starting CLI session")  # Log the start of the CLI session
@@ -201,5 +320,31 @@ def analyze_file(file_path, chunk_size, overlap):
     except Exception as e:
         click.echo(f"Error analyzing file: {str(e)}", err=True)
 
+@cli.command()
+@click.argument('path')
+@click.option('--workers', default=None, type=int, help='Processes for extraction and chunking (default: all cores)')
+@click.option('--concurrency', default=INGEST_CONCURRENCY, help='Books embedded and upserted at the same time')
+@click.option('--queue-size', default=INGEST_QUEUE_SIZE, help='Extracted books waiting to be embedded')
+@click.option('--rpm', default=EMBEDDING_REQUESTS_PER_MINUTE, help='Embedding requests per minute')
+@click.option('--tpm', default=EMBEDDING_TOKENS_PER_MINUTE, help='Embedding tokens per minute')
+@click.option('--force', is_flag=True, help='Re-ingest files even if they did not change')
+def ingest(path, workers, concurrency, queue_size, rpm, tpm, force):
+    """Загружает все книги из директории или по glob-шаблону (например 'books/**/*.pdf')"""
+    assistant = BookAssistant(progress_callback=None, rate_limiter=RateLimiter(rpm, tpm))  # Per-book bars would interleave
+
+    with click.progressbar(length=len(resolve_inputs(path)), label='Ingesting') as bar:
+        ingester = BulkIngester(
+            assistant.book_data_factory,
+            workers=workers,
+            concurrency=concurrency,
+            queue_size=queue_size,
+            on_file_done=lambda file_path, status: bar.update(1)
+        )
+        summary = ingester.ingest(path, force=force)
+
+    click.echo(summary.format())
+    if summary.files_failed:
+        sys.exit(1)
+
 if __name__ == '__main__':
     cli()  # Теперь не нужно оборачивать в asyncio.run()
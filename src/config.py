@@ -6,6 +6,7 @@ load_dotenv()
 
 # Configuration parameters
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # OpenAI-compatible endpoint, e.g. the local stub server (tests/utils/openai_stub_server.py)
 EMBEDDING_MODEL = "text-embedding-3-small"
 GPT_MODEL = "gpt-4o-mini"  # Ensure this matches the desired model
 MAX_TOKENS = 15000
@@ -15,6 +16,61 @@ MAX_TOKENS = 15000
 CHUNK_SIZE = 1000
 OVERLAP = 150
 TOP_K_CHUNKS = 10  # Added for clarity
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 6000))  # Most prompt tokens spent on retrieved chunks
+
+# Query-focused compression: only the sentences of the found chunks that matter for the question are sent
+CONTEXT_COMPRESSION_ENABLED = os.getenv("CONTEXT_COMPRESSION_ENABLED", "false").lower() == "true"
+CONTEXT_COMPRESSION_RATIO = float(os.getenv("CONTEXT_COMPRESSION_RATIO", 0.3))  # Share of the words kept
+CONTEXT_COMPRESSION_NEIGHBOURS = 1  # Sentences kept on each side of a selected sentence
+CONTEXT_COMPRESSION_LEXICAL_WEIGHT = 0.4  # Weight of term overlap against embedding similarity
+CONTEXT_COMPRESSION_EMBED_MISSING = os.getenv("CONTEXT_COMPRESSION_EMBED_MISSING", "true").lower() == "true"  # Embed sentences not in the cache
+
+# Async question answering (web /ask)
+ASK_CONCURRENCY = int(os.getenv("ASK_CONCURRENCY", 64))  # Questions answered at the same time per worker
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", 4))  # Threads scoring chunks for async questions
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 100))  # Questions accepted by one /ask/batch request
+BATCH_ANSWER_CONCURRENCY = int(os.getenv("BATCH_ANSWER_CONCURRENCY", 16))  # Answers of one batch generated at the same time
+
+# Content-defined chunking: boundaries follow a rolling hash of the words,
+# so an edit only changes the chunks around it instead of shifting all later ones
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "content_defined")  # 'content_defined' or 'fixed'
+CDC_MIN_CHUNK_SIZE = CHUNK_SIZE // 2  # Minimum words per chunk (before overlap)
+CDC_MAX_CHUNK_SIZE = CHUNK_SIZE * 3 // 2  # Maximum words per chunk (before overlap)
+CDC_WINDOW = 16  # Words in the rolling hash window
+
+# Near-duplicate chunk elimination (MinHash + LSH) before embedding
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = 0.8  # Estimated Jaccard similarity at which chunks collapse
+MINHASH_NUM_PERM = 128  # Signature length
+MINHASH_BANDS = 16  # LSH bands (rows per band = MINHASH_NUM_PERM / MINHASH_BANDS)
+MINHASH_SHINGLE_SIZE = 5  # Words per shingle
+
+# Streaming ingest: chunking, embedding and upserts run as overlapped stages
+STREAMING_INGEST = os.getenv("STREAMING_INGEST", "true").lower() == "true"
+INGEST_QUEUE_SIZE = 2  # Batches that may wait between two pipeline stages (backpressure)
+
+# Bulk ingest (cli ingest): shared embedding rate limits and concurrency
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", 3000))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", 1000000))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 4))  # Books embedded and upserted at the same time
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 8))  # Extracted books waiting to be embedded (bounds memory)
+
+# PDF text extraction: large files are split into page ranges extracted in worker processes
+PDF_PARALLEL_MIN_PAGES = 64  # Smaller files are extracted page by page in the calling process
+PDF_PAGES_PER_TASK = 16  # Pages per worker task
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+
+# Feature Extraction Configuration
+FEATURE_EXTRACTOR = os.getenv("FEATURE_EXTRACTOR", "nltk")  # 'nltk' or 'spacy'
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_md")
+SPACY_BATCH_SIZE = 32  # Number of chunks per nlp.pipe batch
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", 1))  # Worker processes for nlp.pipe
+DEFERRED_FEATURE_EXTRACTION = os.getenv("DEFERRED_FEATURE_EXTRACTION", "true").lower() == "true"
+FEATURE_BATCH_SIZE = 16  # Chunks between publications of partial background extraction results
+
+# NLTK Configuration
+NLTK_DATA_DIR = os.getenv("NLTK_DATA")  # Bundled NLTK data directory (set in the Docker image)
+NLTK_AUTO_DOWNLOAD = os.getenv("NLTK_AUTO_DOWNLOAD", "true").lower() == "true"  # Download missing data on first use
 
 # Pinecone Configuration
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
@@ -29,6 +85,9 @@ PINECONE_METRIC = "cosine"
 # Cache and Embeddings Directory Configuration
 CACHE_DIR = 'data/cache'
 EMBEDDINGS_DIR = 'data/embeddings'
+MANIFEST_DIR = 'data/manifests'  # Chunk IDs of every stored book version
+BOOK_LIBRARY_DIR = 'data/library'  # Processed book snapshots keyed by content hash + processing config
+BOOK_LIBRARY_ENABLED = os.getenv("BOOK_LIBRARY_ENABLED", "true").lower() == "true"
 
 # Batch Size Configuration
 PINECONE_BATCH_SIZE = 100
@@ -53,6 +112,48 @@ OPENAI_HTTP_CONFIG = {
 # Configuration for file uploads
 UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
 MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes read and written per step when saving uploads
+
+# Storage of uploaded files: 'firebase', 'local' or 'none'; 'auto' is firebase when credentials are set, else none
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "auto")
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", 'data/storage')  # Root of the local storage backend
+STORAGE_UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", 2))  # Uploads to storage at the same time
+STORAGE_CHUNK_SIZE = 8 * 1024 * 1024  # Bytes per part of resumable uploads (a multiple of 256 KB for Firebase)
+
+# Background jobs of the web app (uploaded books are ingested off the event loop)
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", 2))  # Books ingested at the same time
+JOB_HISTORY_LIMIT = 100  # Finished jobs kept for /jobs/{id}
+JOB_STATE_DIR = os.getenv("JOB_STATE_DIR", 'data/jobs')  # Job states shared by all workers of the app ('' keeps them per process)
+# Key signing the login session cookie; must be the same in all workers of the app ('' generates one per process)
+SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY", os.getenv("FLASK_SECRET_KEY", ''))
+
+# Admission control of the web app: requests beyond the concurrency limit wait in a bounded queue;
+# when it is full (429) or the wait times out (503) they are refused with a Retry-After header
+QUERY_MAX_CONCURRENT = int(os.getenv("QUERY_MAX_CONCURRENT", ASK_CONCURRENCY))  # /ask requests served at the same time
+QUERY_MAX_QUEUE = int(os.getenv("QUERY_MAX_QUEUE", 128))  # /ask requests waiting for a slot
+QUERY_QUEUE_TIMEOUT = float(os.getenv("QUERY_QUEUE_TIMEOUT", 10.0))  # Seconds an /ask request may wait
+INGEST_MAX_CONCURRENT = int(os.getenv("INGEST_MAX_CONCURRENT", 4))  # Uploads received at the same time
+INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", 8))  # Uploads waiting for a slot
+INGEST_QUEUE_TIMEOUT = float(os.getenv("INGEST_QUEUE_TIMEOUT", 30.0))  # Seconds an upload may wait
+INGEST_MAX_PENDING_JOBS = int(os.getenv("INGEST_MAX_PENDING_JOBS", 8))  # Queued + running ingest jobs before uploads are refused
+ADMISSION_RETRY_AFTER = 5  # Retry-After seconds when no service time has been measured yet
+
+# WebSocket progress channels
+WS_SEND_TIMEOUT = 2.0  # Seconds a send to one client may take before the event is dropped for it
+WS_PROGRESS_MAX_RATE = 5.0  # Progress events per second and channel (faster updates are coalesced)
+
+# Books kept in memory by the web app (least recently used ones are evicted and reloaded from the library)
+BOOK_REGISTRY_MEMORY_MB = int(os.getenv("BOOK_REGISTRY_MEMORY_MB", 1024))
+
+# Catalog of ingested books shared by all workers of the app (each worker watches it for new books)
+BOOK_CATALOG_DIR = os.getenv("BOOK_CATALOG_DIR", 'data/catalog')
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", 1.0))  # Seconds between checks for catalog changes
+
+# Log inspection (/logs endpoint, LogAnalyzer)
+LOG_TAIL_BLOCK_SIZE = 64 * 1024  # Bytes read per step when reading a log backwards
+LOG_INDEX_INTERVAL = 1024 * 1024  # Log bytes between two checkpoints of the time-to-offset index
+LOG_FOLLOW_POLL_INTERVAL = 0.5  # Seconds between checks for new lines when following a log
+LOG_TAIL_MAX_LINES = 10000  # Most lines returned by one /logs request
 
 # Create necessary directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
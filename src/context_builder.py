@@ -0,0 +1,154 @@
+"""
+Context Builder Module
+
+Turns the chunks found for a query into the prompt context within a token budget:
+- chunks adjacent in the book are merged into one span, without the overlap
+  text they share (each chunk repeats the last OVERLAP words of the previous one);
+  adjacency uses the chunks' book positions, as deduplication may drop chunks
+  in between, and chunks that do not share exactly OVERLAP words stay apart
+- chunks are chosen by score until the budget (CONTEXT_TOKEN_BUDGET) is used
+- spans are ordered by their position in the book
+The tokens saved against joining the chunks verbatim are reported per query.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+from src.config import CONTEXT_TOKEN_BUDGET, GPT_MODEL, OVERLAP
+from src.utils.tokens import count_tokens, count_tokens_batch
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+
+@dataclass
+class Context:
+    """Prompt context built from search results."""
+    text: str
+    tokens: int  # Tokens of text
+    verbatim_tokens: int  # Tokens of the chunks joined as they are
+    spans: List[List[int]] = field(default_factory=list)  # Book positions of the chunks of each span, in book order
+    dropped: int = 0  # Search results left out to stay within the budget
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.verbatim_tokens - self.tokens, 0)
+
+
+def overlap_words(previous: List[str], current: List[str], overlap: int = OVERLAP) -> int:
+    """
+    Number of leading words of current that repeat the end of previous: the
+    configured overlap if they share exactly it, else 0 (a shorter match, e.g.
+    of a single common word, is a coincidence, not the chunker's overlap).
+    """
+    if overlap <= 0 or min(len(previous), len(current)) < overlap:
+        return 0
+    return overlap if previous[-overlap:] == current[:overlap] else 0
+
+
+def build_context(results: List[Dict[str, Any]],
+                  budget: int = CONTEXT_TOKEN_BUDGET,
+                  model: str = GPT_MODEL,
+                  metrics: MetricsCollector = default_metrics,
+                  positions: Optional[Sequence[int]] = None,
+                  overlap: int = OVERLAP) -> Context:
+    """
+    Build the prompt context from search results ({'chunk', 'score', 'index'}, best first).
+
+    Results are taken by score while they fit into the budget; a chunk that
+    follows or precedes a taken one only costs its text without the overlap.
+    Results without an 'index' are kept as spans of their own.
+
+    Args:
+        positions: Book position of each stored chunk (BookDataInterface.get_chunk_positions());
+            None if the chunk indices are the positions
+        overlap: Words each chunk repeats from the previous one when chunking
+    """
+    if not results:
+        return Context(text="", tokens=0, verbatim_tokens=0)
+
+    # Distinct chunks by position in the book (results without one get negative keys)
+    chunks: Dict[int, str] = {}
+    for i, result in enumerate(results):
+        index = result.get('index')
+        if index is None:
+            index = -1 - i
+        elif positions is not None:
+            index = positions[index]
+        chunks.setdefault(index, result['chunk'])
+    order = list(chunks)  # Score order
+    words = {index: chunks[index].split() for index in order}
+
+    # Words each chunk shares with the chunk before it in the book (0: not joined to it), and the tokens of both parts
+    shared = {
+        index: overlap_words(words[index - 1], words[index], overlap) if index > 0 and index - 1 in words else 0
+        for index in order
+    }
+    full_tokens = dict(zip(order, count_tokens_batch([chunks[i] for i in order], model)))
+    trimmed_tokens = dict(zip(order, count_tokens_batch(
+        [' '.join(words[i][shared[i]:]) for i in order], model
+    )))
+
+    selected = set()
+    used = 0
+    for index in order:
+        # Cost of the chunk, less what the next chunk saves if it is already taken
+        cost = trimmed_tokens[index] if shared[index] and index - 1 in selected else full_tokens[index]
+        if index >= 0 and index + 1 in selected and shared[index + 1]:
+            cost -= full_tokens[index + 1] - trimmed_tokens[index + 1]
+        if used + cost <= budget:
+            selected.add(index)
+            used += cost
+    if not selected:
+        selected.add(order[0])  # The best chunk is used even if it alone exceeds the budget (truncated below)
+
+    spans: List[List[int]] = []
+    for index in sorted(i for i in selected if i >= 0):
+        if spans and spans[-1][-1] == index - 1 and shared[index]:
+            spans[-1].append(index)
+        else:
+            spans.append([index])
+    spans += [[index] for index in order if index < 0 and index in selected]
+
+    texts = []
+    for span in spans:
+        parts = [chunks[span[0]]] + [' '.join(words[i][shared[i]:]) for i in span[1:]]
+        texts.append(' '.join(part for part in parts if part))
+    text = format_spans(texts)
+    tokens = count_tokens(text, model)
+    if tokens > budget:
+        text, tokens = _truncate(text, tokens, budget, model)
+
+    context = Context(
+        text=text,
+        tokens=tokens,
+        verbatim_tokens=count_tokens(format_spans([chunks[i] for i in order]), model),
+        spans=spans,
+        dropped=len(order) - len(selected)
+    )
+    metrics.observe_value("context_tokens", context.tokens)
+    metrics.observe_value("context_tokens_saved", context.tokens_saved)
+    rag_logger.info(
+        f"\nContext Built:\n"
+        f"Chunks: {len(selected)} of {len(order)} in {len(spans)} spans\n"
+        f"Tokens: {context.tokens} (verbatim {context.verbatim_tokens}, saved {context.tokens_saved})\n"
+        f"Budget: {budget}\n"
+        f"{'-'*50}"
+    )
+    return context
+
+
+def format_spans(texts: List[str]) -> str:
+    """Number the context passages as the prompt refers to them."""
+    return "\n\n".join(f"[{i+1}] {text}" for i, text in enumerate(texts))
+
+
+def _truncate(text: str, tokens: int, budget: int, model: str) -> tuple:
+    """Cut a text by words until it fits the budget."""
+    words = text.split(' ')
+    while tokens > budget and len(words) > 1:
+        words = words[:max(int(len(words) * budget / tokens) - 1, 1)]
+        tokens = count_tokens(' '.join(words), model)
+    logger.warning(f"Context truncated to {tokens} tokens (budget {budget})")
+    return ' '.join(words), tokens
@@ -0,0 +1,283 @@
+"""
+Context Compression Module
+
+Query-focused extractive compression of search results, run between search
+and context building (see build_context):
+- the found chunks are split into sentences (repeated sentences, e.g. from
+  the overlap of adjacent chunks, are scored once)
+- every sentence is scored against the query by term overlap (IDF-weighted
+  over the sentences) and by embedding similarity, both as matrix operations
+- the best sentences and their neighbours are kept until the target share
+  of the words (CONTEXT_COMPRESSION_RATIO) is reached, in their original order
+Sentence embeddings come through the embedding cache, so sentences seen
+before cost no API call. evaluate_compression measures the ratio and how much
+of the known evidence survives on an eval set.
+"""
+
+import re
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.embedding import EmbeddingService
+from src.config import (
+    CONTEXT_COMPRESSION_RATIO, CONTEXT_COMPRESSION_NEIGHBOURS,
+    CONTEXT_COMPRESSION_LEXICAL_WEIGHT, CONTEXT_COMPRESSION_EMBED_MISSING
+)
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+SENTENCE_MAX_WORDS = 60  # Longer "sentences" (lists, text without punctuation) are cut into pieces
+GAP_MARKER = " ... "  # Between kept sentences that were not adjacent
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])["\'»”)\]]*\s+(?=["\'«“(\[]?[A-ZА-ЯЁ0-9])|\n\s*\n')
+_TERM = re.compile(r'\w+')
+
+
+def split_sentences(text: str, max_words: int = SENTENCE_MAX_WORDS) -> List[str]:
+    """Split a text into sentences; over-long ones are cut every max_words words."""
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        words = sentence.split()
+        for i in range(0, len(words), max_words):
+            sentences.append(' '.join(words[i:i + max_words]))
+    return sentences
+
+
+def terms(text: str) -> List[str]:
+    return _TERM.findall(text.lower())
+
+
+@dataclass
+class CompressionResult:
+    """Search results with their chunks reduced to the sentences kept."""
+    results: List[Dict[str, Any]]
+    original_words: int
+    kept_words: int
+    sentences: int = 0
+    kept_sentences: int = 0
+    scores: List[float] = field(default_factory=list, repr=False)  # Per distinct sentence
+
+    @property
+    def ratio(self) -> float:
+        """Share of the words kept (1.0: nothing removed)."""
+        return self.kept_words / self.original_words if self.original_words else 1.0
+
+
+class ContextCompressor:
+    """
+    Keeps the sentences of search results that matter for the query.
+
+    The score of a sentence is lexical_weight * term overlap + (1 - lexical_weight)
+    * embedding similarity, each scaled to [0, 1] over the sentences of the
+    query. Without an embedding service (or when embedding fails) only the term
+    overlap is used; with embed_missing off, only sentences already in the
+    embedding cache get an embedding score.
+    """
+
+    def __init__(self,
+                 embedding_service: Optional[EmbeddingService] = None,
+                 ratio: float = CONTEXT_COMPRESSION_RATIO,
+                 neighbours: int = CONTEXT_COMPRESSION_NEIGHBOURS,
+                 lexical_weight: float = CONTEXT_COMPRESSION_LEXICAL_WEIGHT,
+                 embed_missing: bool = CONTEXT_COMPRESSION_EMBED_MISSING,
+                 metrics: MetricsCollector = default_metrics):
+        """
+        Args:
+            embedding_service: Source of (cached) sentence and query embeddings
+            ratio: Share of the words to keep
+            neighbours: Sentences kept on each side of a selected sentence
+            lexical_weight: Weight of term overlap against embedding similarity
+            embed_missing: Create embeddings for sentences not in the cache
+        """
+        self.embedding_service = embedding_service
+        self.ratio = ratio
+        self.neighbours = neighbours
+        self.lexical_weight = lexical_weight
+        self.embed_missing = embed_missing
+        self.metrics = metrics
+
+    def compress(self, query: str, results: List[Dict[str, Any]],
+                 query_embedding: Optional[Sequence[float]] = None) -> CompressionResult:
+        """
+        Compress search results ({'chunk', 'score', 'index'}, best first).
+
+        Results keep their order and fields; 'chunk' holds the kept sentences
+        and results with no sentence kept are left out.
+        """
+        start = time.perf_counter()
+        # Sentences of each result, as indices into the distinct sentences
+        distinct: Dict[str, int] = {}
+        layout: List[List[int]] = []
+        for result in results:
+            layout.append([distinct.setdefault(s, len(distinct)) for s in split_sentences(result['chunk'])])
+        sentences = list(distinct)
+        lengths = np.array([len(s.split()) for s in sentences])
+        original_words = sum(len(result['chunk'].split()) for result in results)
+        if not sentences:
+            return CompressionResult(results=list(results), original_words=original_words, kept_words=original_words)
+
+        scores = self._score(query, sentences, query_embedding)
+        kept = self._select(scores, lengths, layout, math.ceil(self.ratio * lengths.sum()))
+
+        compressed = []
+        emitted = set()  # A sentence repeated in several chunks is sent once
+        for number, (result, ids) in enumerate(zip(results, layout)):
+            groups: List[List[str]] = []
+            previous = None
+            for position, sentence_id in enumerate(ids):
+                if position not in kept.get(number, ()) or sentence_id in emitted:
+                    continue
+                emitted.add(sentence_id)
+                if previous is None or position != previous + 1:
+                    groups.append([])
+                groups[-1].append(sentences[sentence_id])
+                previous = position
+            if groups:
+                compressed.append({**result, 'chunk': GAP_MARKER.join(' '.join(group) for group in groups)})
+
+        outcome = CompressionResult(
+            results=compressed,
+            original_words=original_words,
+            kept_words=int(lengths[list(emitted)].sum()),
+            sentences=len(sentences),
+            kept_sentences=len(emitted),
+            scores=scores.tolist()
+        )
+        duration = time.perf_counter() - start
+        self.metrics.observe_value("context_compression_ratio", outcome.ratio)
+        self.metrics.observe_value("context_compression_seconds", duration)
+        rag_logger.info(
+            f"\nContext Compressed:\n"
+            f"Sentences: {outcome.kept_sentences} of {outcome.sentences}\n"
+            f"Words: {outcome.kept_words} of {outcome.original_words} ({outcome.ratio:.0%})\n"
+            f"Time: {duration:.3f}s\n"
+            f"{'-'*50}"
+        )
+        return outcome
+
+    def _score(self, query: str, sentences: List[str],
+               query_embedding: Optional[Sequence[float]]) -> np.ndarray:
+        lexical = _scale(self._lexical_scores(query, sentences))
+        if self.lexical_weight >= 1 or self.embedding_service is None:
+            return lexical
+        try:
+            semantic, available = self._embedding_scores(query, sentences, query_embedding)
+        except Exception as e:
+            logger.warning(f"Sentence embeddings unavailable, compressing by term overlap only: {str(e)}")
+            return lexical
+        combined = self.lexical_weight * lexical + (1 - self.lexical_weight) * _scale(semantic, available)
+        return np.where(available, combined, lexical)
+
+    @staticmethod
+    def _lexical_scores(query: str, sentences: List[str]) -> np.ndarray:
+        """IDF-weighted, saturated query term counts of every sentence (sentences x query terms)."""
+        vocabulary = {term: i for i, term in enumerate(dict.fromkeys(terms(query)))}
+        counts = np.zeros((len(sentences), max(len(vocabulary), 1)))
+        for row, sentence in enumerate(sentences):
+            columns = [vocabulary[t] for t in terms(sentence) if t in vocabulary]
+            np.add.at(counts[row], columns, 1)
+        if not vocabulary:
+            return counts[:, 0]
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log1p((len(sentences) - document_frequency + 0.5) / (document_frequency + 0.5))
+        return (counts / (counts + 1)) @ idf
+
+    def _embedding_scores(self, query: str, sentences: List[str],
+                          query_embedding: Optional[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Cosine similarity of every sentence to the query, and which sentences have an embedding."""
+        service = self.embedding_service
+        if query_embedding is None:
+            query_embedding = service.cache_manager.get(query)
+            if query_embedding is None:
+                query_embedding = service.create_embeddings([query])[0]
+        if self.embed_missing:
+            embeddings = service.create_embeddings(sentences)  # Cached sentences are not sent again
+        else:
+            embeddings = [service.cache_manager.get(sentence) for sentence in sentences]
+        available = np.array([embedding is not None for embedding in embeddings])
+        if not available.any():
+            return np.zeros(len(sentences)), available
+        dimension = len(query_embedding)
+        matrix = np.array([e if e is not None else np.zeros(dimension) for e in embeddings], dtype=np.float32)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+        similarities = np.divide(matrix @ query_vector, norms, out=np.zeros(len(sentences), dtype=np.float32),
+                                 where=norms > 0)
+        return similarities.astype(float), available
+
+    def _select(self, scores: np.ndarray, lengths: np.ndarray, layout: List[List[int]],
+                target_words: int) -> Dict[int, set]:
+        """Positions kept in the sentence list of each result, by result number."""
+        first_seen: Dict[int, Tuple[int, int]] = {}  # Sentence -> (result number, position)
+        for number, ids in enumerate(layout):
+            for position, sentence_id in enumerate(ids):
+                first_seen.setdefault(sentence_id, (number, position))
+
+        kept: Dict[int, set] = {}
+        taken = set()
+        words = 0
+        for sentence_id in np.argsort(-scores, kind='stable'):
+            if words >= target_words:
+                break
+            number, position = first_seen[int(sentence_id)]
+            ids = layout[number]
+            for neighbour in range(max(position - self.neighbours, 0),
+                                   min(position + self.neighbours + 1, len(ids))):
+                kept.setdefault(number, set()).add(neighbour)
+                if ids[neighbour] not in taken:
+                    taken.add(ids[neighbour])
+                    words += int(lengths[ids[neighbour]])
+        return kept
+
+
+def _scale(values: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Min-max scale to [0, 1] (over the masked values if a mask is given)."""
+    considered = values[mask] if mask is not None else values
+    if considered.size == 0:
+        return np.zeros_like(values, dtype=float)
+    low, high = considered.min(), considered.max()
+    if high <= low:
+        return np.where(values > 0, 1.0, 0.0) if high > 0 else np.zeros_like(values, dtype=float)
+    return np.clip((values - low) / (high - low), 0.0, 1.0)
+
+
+def evaluate_compression(examples: List[Dict[str, Any]],
+                         compress: Callable[[str, List[Dict[str, Any]]], CompressionResult]) -> Dict[str, Any]:
+    """
+    Measure compression on an eval set.
+
+    Each example has a 'question', its search 'results' and the 'evidence'
+    sentences that answer it. An evidence sentence counts as kept if it
+    appears in full in the compressed chunks (whitespace-normalised).
+
+    Returns:
+        Mean ratio of kept words, evidence recall over all evidence
+        sentences, the share of examples with all evidence kept and the
+        per-example figures
+    """
+    per_example = []
+    for example in examples:
+        outcome = compress(example['question'], example['results'])
+        text = ' '.join(' '.join(result['chunk'].split()) for result in outcome.results)
+        found = [' '.join(evidence.split()) in text for evidence in example['evidence']]
+        per_example.append({
+            'question': example['question'],
+            'ratio': outcome.ratio,
+            'evidence_kept': sum(found),
+            'evidence_total': len(found)
+        })
+
+    evidence_total = sum(e['evidence_total'] for e in per_example)
+    return {
+        'examples': len(per_example),
+        'ratio': sum(e['ratio'] for e in per_example) / len(per_example) if per_example else 1.0,
+        'evidence_recall': sum(e['evidence_kept'] for e in per_example) / evidence_total if evidence_total else 1.0,
+        'complete': sum(e['evidence_kept'] == e['evidence_total'] for e in per_example) / len(per_example)
+        if per_example else 1.0,
+        'per_example': per_example
+    }
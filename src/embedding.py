@@ -1,6 +1,7 @@
 from typing import List, Optional, Callable  # Import necessary types for type hinting
+import asyncio  # Import asyncio for the non-blocking embedding path
 import numpy as np  # Import NumPy for numerical operations
-from openai import OpenAI, RateLimitError, APIError, APITimeoutError, APIConnectionError  # Import OpenAI client and error classes
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APIError, APITimeoutError, APIConnectionError  # Import OpenAI client and error classes
 from src.config import (
     EMBEDDING_MODEL,  # Import the embedding model configuration
     PINECONE_BATCH_SIZE  # Import the batch size configuration for Pinecone
@@ -8,6 +9,8 @@ from src.config import (
 from src.utils.logger import get_main_logger, get_rag_logger  # Import logging utilities
 from src.cache_manager import CacheManager  # Import cache manager for caching embeddings
 from src.utils.metrics import MetricsCollector  # Import metrics collector for monitoring
+from src.utils.rate_limiter import RateLimiter  # Import rate limiter shared by concurrent callers
+from src.utils.tokens import count_tokens_batch  # Import token counting for token-based rate limits
 
 logger = get_main_logger()  # Initialize the main logger
 rag_logger = get_rag_logger()  # Initialize the RAG logger
@@ -33,13 +36,17 @@ class EmbeddingService:
         cache_manager: CacheManager,  # Cache manager for storing embeddings
         metrics_collector: Optional[MetricsCollector] = None,  # Optional metrics collector for monitoring
         progress_callback: Optional[Callable] = None,  # Optional callback for progress updates
-        batch_size: int = PINECONE_BATCH_SIZE  # Batch size for processing embeddings
+        batch_size: int = PINECONE_BATCH_SIZE,  # Batch size for processing embeddings
+        rate_limiter: Optional[RateLimiter] = None,  # Optional limiter for requests/tokens per minute
+        async_client: Optional[AsyncOpenAI] = None  # Optional async OpenAI client for acreate_embeddings
     ):
         self.client = openai_client  # Assign OpenAI client to instance variable
         self.cache_manager = cache_manager  # Assign cache manager to instance variable
         self.metrics = metrics_collector  # Assign metrics collector to instance variable
         self.progress_callback = progress_callback  # Assign progress callback to instance variable
         self.batch_size = batch_size  # Assign batch size to instance variable
+        self.rate_limiter = rate_limiter  # Assign rate limiter to instance variable
+        self.async_client = async_client  # Assign async OpenAI client to instance variable
         logger.info("EmbeddingService initialized")  # Log initialization of the service
         rag_logger.info("\nEmbedding Service:\nStatus: Initialized\n" + "-"*50)  # Log status in RAG logger
 
@@ -98,6 +105,9 @@ class EmbeddingService:
 
         # Create embeddings for uncached texts
         if uncached_texts:
+            if self.rate_limiter:  # Wait for the shared request/token budget
+                tokens = sum(count_tokens_batch(uncached_texts, EMBEDDING_MODEL)) if self.rate_limiter.tokens_per_minute else 0
+                self.rate_limiter.acquire(tokens)
             response = self.client.embeddings.create(
                 input=uncached_texts,  # Input the uncached texts
                 model=EMBEDDING_MODEL  # Specify the embedding model
@@ -112,6 +122,33 @@ class EmbeddingService:
 
         return embeddings  # Return the list of embeddings for the batch
 
+    async def acreate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embeddings without blocking the event loop (used to embed queries).
+
+        Cache lookups and rate-limiter waits run in threads; the API call uses the
+        async client. Texts are sent in one request, so this is meant for a few
+        short texts, not for whole books.
+        """
+        if self.async_client is None:  # Without an async client the sync path runs in a thread
+            return await asyncio.to_thread(self.create_embeddings, texts)
+
+        cached = await asyncio.to_thread(lambda: [self.cache_manager.get(text) for text in texts])  # Check the cache
+        uncached_indices = [i for i, embedding in enumerate(cached) if embedding is None]  # Indices to embed
+        if uncached_indices:
+            uncached_texts = [texts[i] for i in uncached_indices]
+            if self.rate_limiter:  # Wait for the shared request/token budget in a thread
+                tokens = sum(count_tokens_batch(uncached_texts, EMBEDDING_MODEL)) if self.rate_limiter.tokens_per_minute else 0
+                await asyncio.to_thread(self.rate_limiter.acquire, tokens)
+            response = await self.async_client.embeddings.create(
+                input=uncached_texts,  # Input the uncached texts
+                model=EMBEDDING_MODEL  # Specify the embedding model
+            )
+            for i, emb_data in zip(uncached_indices, response.data):
+                cached[i] = emb_data.embedding  # Fill in the new embedding
+            await asyncio.to_thread(lambda: [self.cache_manager.set(texts[i], cached[i]) for i in uncached_indices])
+        return cached  # Return embeddings in input order
+
 def cosine_similarity(a: List[float], b: List[float]) -> float:
     """Calculate cosine similarity between two vectors."""
     a = np.array(a, dtype=np.float64)  # Convert vector a to a NumPy array
@@ -0,0 +1,306 @@
+"""
+Streaming ingest pipeline.
+
+Text segments flow through overlapped stages connected by bounded queues:
+
+    reader -> chunker (+ dedup) -> embedding batches -> upsert batches
+
+Each stage runs in its own thread, so embedding batch N+1 is in flight while
+batch N is upserted, and CPU-bound chunking overlaps with network calls. A full
+queue blocks its producer (backpressure), so at most queue_size batches wait
+between two stages and the full book text is never held in memory.
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from src.config import PINECONE_BATCH_SIZE, INGEST_QUEUE_SIZE, DEDUP_ENABLED
+from src.services.text_processor import iter_text_chunks, chunk_id
+from src.services.deduplication import NearDuplicateDetector, dedup_savings, log_dedup_savings
+from src.manifest_store import ManifestStore
+from src.vector_store_service import VectorStoreService
+from src.utils.logger import get_main_logger, get_rag_logger
+from src.utils.metrics import MetricsCollector, default_metrics
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+_DONE = object()  # End-of-stream marker passed between stages
+
+
+@dataclass
+class StageStats:
+    """Work done by one pipeline stage."""
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0  # Time spent working, excluding waits on queues
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.throughput, 2)
+        }
+
+
+class _StageFailure:
+    """Carries an exception from a worker stage to the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class IngestPipeline:
+    """Runs chunking, embedding and vector upserts for one book as a stream."""
+
+    def __init__(self,
+                 embed: Callable[[List[str]], List[List[float]]],
+                 vector_store_service: VectorStoreService,
+                 manifest_store: Optional[ManifestStore] = None,
+                 batch_size: int = PINECONE_BATCH_SIZE,
+                 queue_size: int = INGEST_QUEUE_SIZE,
+                 deduplicate: bool = DEDUP_ENABLED,
+                 progress_callback: Optional[Callable[[str, int, int], None]] = None,
+                 metrics: Optional[MetricsCollector] = None):
+        """
+        Args:
+            embed: Function creating embeddings for a batch of texts
+            vector_store_service: Service the vectors are upserted into
+            manifest_store: Stores chunk IDs per book for incremental re-ingest
+            batch_size: Chunks per embedding and upsert batch
+            queue_size: Batches that may wait between two stages
+            deduplicate: Skip near-duplicate chunks before embedding
+            progress_callback: Called with (status, processed chunks, chunks seen so far)
+            metrics: Collector for per-stage throughput gauges
+        """
+        self.embed = embed
+        self.vector_store_service = vector_store_service
+        self.manifest_store = manifest_store or ManifestStore()
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.deduplicate = deduplicate
+        self.progress_callback = progress_callback
+        self.metrics = metrics or default_metrics
+
+    def run(self, segments: Iterable[str], book_id: Optional[str] = None, **manifest_extra: Any) -> Dict[str, Any]:
+        """Ingest a stream of text segments; see run_chunks for the result."""
+        return self.run_chunks(iter_text_chunks(segments), book_id, **manifest_extra)
+
+    def run_chunks(self, chunks: Iterable[str], book_id: Optional[str] = None, **manifest_extra: Any) -> Dict[str, Any]:
+        """
+        Ingest a stream of already split chunks.
+
+        manifest_extra fields are stored in the book manifest once all vectors are upserted.
+
+        Returns:
+            Dict with the canonical 'chunks', their 'embeddings', vector 'chunk_ids' and
+            'chunk_positions' (position of each chunk in the stream before deduplication),
+            incremental ingest counts ('added', 'removed', 'unchanged'), 'duplicates'
+            (canonical chunk ID -> positions of collapsed chunks), 'dedup_stats'
+            and per-stage 'stage_stats'.
+        """
+        self._stop = threading.Event()
+        self._stats = {name: StageStats(name) for name in ('chunking', 'embedding', 'upsert')}
+        self._chunks_seen = 0
+        self._duplicates: Dict[int, List[int]] = {}  # Canonical index -> original positions
+        self._removed_chunks: List[str] = []
+
+        chunk_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embedded_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        workers = [
+            threading.Thread(target=self._chunk_stage, args=(chunks, chunk_queue),
+                             name="ingest-chunker", daemon=True),
+            threading.Thread(target=self._embed_stage, args=(chunk_queue, embedded_queue),
+                             name="ingest-embedder", daemon=True),
+        ]
+
+        start = time.perf_counter()
+        logger.info(f"Starting streaming ingest for {book_id or 'unnamed book'}")
+        for worker in workers:
+            worker.start()
+        try:
+            # Upserts run on the calling thread, overlapped with the next embedding batch
+            result = self._upsert_stage(embedded_queue, book_id, manifest_extra)
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join(timeout=5)
+
+        result['stage_stats'] = self._report(time.perf_counter() - start, len(result['chunks']))
+        return result
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """Put an item, blocking while the queue is full; gives up once the pipeline stops."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        """Take the next item, re-raising upstream failures; ends the stream once the pipeline stops."""
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if isinstance(item, _StageFailure):
+                raise item.error
+            return item
+        return _DONE
+
+    def _chunk_stage(self, chunks: Iterable[str], out: queue.Queue) -> None:
+        stats = self._stats['chunking']
+        detector = NearDuplicateDetector() if self.deduplicate else None
+        batch: List[Tuple[int, str]] = []  # (stream position, chunk)
+        try:
+            chunks = iter(chunks)
+            while True:
+                t0 = time.perf_counter()
+                chunk = next(chunks, None)
+                if chunk is None:
+                    stats.busy_seconds += time.perf_counter() - t0
+                    break
+                position = self._chunks_seen
+                self._chunks_seen += 1
+                canonical = detector.add(chunk) if detector else None
+                stats.busy_seconds += time.perf_counter() - t0
+                stats.items += 1
+
+                if canonical is not None:
+                    self._duplicates.setdefault(canonical, []).append(position)
+                    self._removed_chunks.append(chunk)
+                    continue
+                batch.append((position, chunk))
+                if len(batch) >= self.batch_size:
+                    if not self._put(out, batch):
+                        return
+                    batch = []
+            if batch and not self._put(out, batch):
+                return
+            self._put(out, _DONE)
+        except BaseException as e:
+            self._put(out, _StageFailure(e))
+
+    def _embed_stage(self, inp: queue.Queue, out: queue.Queue) -> None:
+        stats = self._stats['embedding']
+        try:
+            while True:
+                batch = self._get(inp)
+                if batch is _DONE:
+                    break
+                t0 = time.perf_counter()
+                embeddings = self.embed([chunk for _, chunk in batch])
+                stats.busy_seconds += time.perf_counter() - t0
+                stats.items += len(batch)
+                if not self._put(out, (batch, embeddings)):
+                    return
+            self._put(out, _DONE)
+        except BaseException as e:
+            self._put(out, _StageFailure(e))
+
+    def _upsert_stage(self, inp: queue.Queue, book_id: Optional[str], manifest_extra: Dict[str, Any]) -> Dict[str, Any]:
+        stats = self._stats['upsert']
+        previous = self.manifest_store.get(book_id) if book_id else None
+        previous_ids = set(previous['chunk_ids']) if previous else set()
+
+        positions: List[int] = []
+        chunks: List[str] = []
+        embeddings: List[List[float]] = []
+        vector_ids: List[str] = []
+        stored = set(previous_ids)
+        added = unchanged = 0
+
+        while True:
+            item = self._get(inp)
+            if item is _DONE:
+                break
+            batch, batch_embeddings = item
+            t0 = time.perf_counter()
+            new_chunks, new_embeddings, new_ids = [], [], []
+            for (position, chunk), embedding in zip(batch, batch_embeddings):
+                h = chunk_id(chunk)
+                vector_id = f"{book_id}-{h}" if book_id else h
+                if vector_id in previous_ids:
+                    unchanged += 1
+                elif vector_id not in stored:
+                    # Upsert each new vector once, even if the same chunk text repeats
+                    new_chunks.append(chunk)
+                    new_embeddings.append(embedding)
+                    new_ids.append(vector_id)
+                    stored.add(vector_id)
+                    added += 1
+                positions.append(position)
+                chunks.append(chunk)
+                embeddings.append(embedding)
+                vector_ids.append(vector_id)
+            if new_chunks:
+                self.vector_store_service.store_vectors(new_chunks, new_embeddings, new_ids)
+            stats.busy_seconds += time.perf_counter() - t0
+            stats.items += len(batch)
+
+            processed = len(chunks) + len(self._removed_chunks)
+            logger.info(f"Ingested {processed}/{self._chunks_seen} chunks seen so far")
+            if self.progress_callback:
+                self.progress_callback("Storing vectors", processed, self._chunks_seen)
+
+        current_ids = set(vector_ids)
+        removed = [vid for vid in dict.fromkeys(previous['chunk_ids'])
+                   if vid not in current_ids] if previous else []
+        if removed:
+            self.vector_store_service.delete_vectors(removed)
+        if book_id:
+            self.manifest_store.save(book_id, vector_ids, **manifest_extra)
+
+        position_to_id = dict(zip(positions, vector_ids))
+        dedup_stats = None
+        if self.deduplicate:
+            dedup_stats = dedup_savings(self._chunks_seen, self._removed_chunks)
+            log_dedup_savings(dedup_stats)
+
+        rag_logger.info(
+            f"\nIncremental Ingest:\n"
+            f"Book: {book_id or 'n/a'}\n"
+            f"Previous version: {'yes' if previous else 'no'}\n"
+            f"Added: {added}, removed: {len(removed)}, unchanged: {unchanged}\n"
+            f"{'-'*50}"
+        )
+        return {
+            'book_id': book_id,
+            'chunks': chunks,
+            'embeddings': embeddings,
+            'chunk_ids': vector_ids,
+            'chunk_positions': positions,
+            'added': added,
+            'removed': len(removed),
+            'unchanged': unchanged,
+            # Duplicate positions refer to the chunk stream before deduplication; the
+            # detector numbers every chunk it sees, so its canonical indices are positions too
+            'duplicates': {position_to_id[canonical]: dups for canonical, dups in self._duplicates.items()},
+            'dedup_stats': dedup_stats
+        }
+
+    def _report(self, total_seconds: float, chunk_count: int) -> Dict[str, Dict[str, Any]]:
+        stage_stats = {name: stats.to_dict() for name, stats in self._stats.items()}
+        for name, stats in self._stats.items():
+            self.metrics.set_gauge(f'ingest_{name}_items_per_second', stats.throughput)
+        self.metrics.set_gauge('ingest_total_seconds', total_seconds)
+
+        logger.info(f"Streaming ingest finished: {chunk_count} chunks in {total_seconds:.2f}s")
+        rag_logger.info(
+            f"\nStreaming Ingest:\n"
+            f"Chunks: {chunk_count}\n"
+            + "\n".join(
+                f"{name}: {s['items']} items, {s['busy_seconds']}s busy, {s['items_per_second']}/s"
+                for name, s in stage_stats.items()
+            )
+            + f"\nTotal: {total_seconds:.2f}s\n{'-'*50}"
+        )
+        return stage_stats
@@ -0,0 +1,88 @@
+import os
+import re
+import json
+import time
+from typing import Any, Dict, List, Optional
+from src.config import MANIFEST_DIR
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+
+def make_book_id(name: str) -> str:
+    """Derive a stable book ID from a file name or title (e.g. 'My Book v2.pdf' -> 'my_book_v2')."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return re.sub(r'[^a-z0-9]+', '_', stem.lower()).strip('_') or 'book'
+
+
+def owner_book_id(owner: str, book_id: str) -> str:
+    """
+    Storage-level ID of a user's book, for its manifest and vector IDs (e.g. 'alice', 'notes' -> 'alice__notes').
+
+    Users name books by file, so the same book_id of different owners must not share stored vectors.
+    """
+    return f"{make_book_id(owner)}__{book_id}"
+
+
+class ManifestStore:
+    """Stores the chunk IDs of the last ingested version of each book as JSON files."""
+
+    def __init__(self, manifest_dir: str = MANIFEST_DIR):
+        self.manifest_dir = manifest_dir
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    def _get_path(self, book_id: str) -> str:
+        return os.path.join(self.manifest_dir, f"{book_id}.json")
+
+    def get(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored manifest for a book, or None if the book was never ingested."""
+        path = self._get_path(book_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading manifest for {book_id}: {str(e)}")
+            return None
+
+    def save(self, book_id: str, chunk_ids: List[str], **extra: Any) -> None:
+        """Store the chunk IDs of the current version of a book, with optional extra fields."""
+        manifest = {
+            **extra,
+            'book_id': book_id,
+            'chunk_ids': chunk_ids,
+            'updated_at': time.time()
+        }
+        path = self._get_path(book_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)  # Atomic: readers never see a partial manifest
+        logger.info(f"Manifest saved for {book_id}: {len(chunk_ids)} chunks")
+
+    def delete(self, book_id: str) -> bool:
+        """Remove the manifest of a book."""
+        path = self._get_path(book_id)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+
+def diff_chunk_ids(old_ids: List[str], new_ids: List[str]) -> Dict[str, List[str]]:
+    """
+    Compare two versions of a book by chunk IDs.
+
+    Returns:
+        Dict with 'added' (new IDs to embed and upsert), 'removed' (IDs to delete)
+        and 'unchanged' IDs, each in first-seen order.
+    """
+    old_set = set(old_ids)
+    new_set = set(new_ids)
+    return {
+        'added': list(dict.fromkeys(i for i in new_ids if i not in old_set)),
+        'removed': list(dict.fromkeys(i for i in old_ids if i not in new_set)),
+        'unchanged': list(dict.fromkeys(i for i in new_ids if i in old_set))
+    }
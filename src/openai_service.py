@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
-from openai import OpenAI, RateLimitError, APIError, APITimeoutError, APIConnectionError
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APIError, APITimeoutError, APIConnectionError
 from openai.types.chat import ChatCompletion
-from src.config import OPENAI_API_KEY, GPT_MODEL, MAX_TOKENS
-from typing import List, Union
+from src.config import OPENAI_API_KEY, OPENAI_BASE_URL, GPT_MODEL, MAX_TOKENS
+from typing import AsyncIterator, List, Optional, Union
 import httpx
 from src.embedding import EmbeddingService
 from src.utils.logger import get_main_logger, get_rag_logger
@@ -17,14 +17,16 @@ class BaseOpenAIService(ABC):
     Defines the interface for generating answers and creating embeddings.
     """
 
-    def __init__(self, api_key: str = OPENAI_API_KEY):
+    def __init__(self, api_key: str = OPENAI_API_KEY, base_url: Optional[str] = OPENAI_BASE_URL):
         """
-        Initializes the OpenAI client with the provided API key.
+        Initializes the OpenAI clients (sync and async) with the provided API key.
 
         Args:
             api_key (str): The API key for OpenAI.
+            base_url (Optional[str]): OpenAI-compatible API URL (None: the OpenAI API).
         """
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url)
 
     @abstractmethod
     def generate_answer(self, query: str, context: str) -> str:
@@ -85,14 +87,15 @@ class OpenAIService(BaseOpenAIService):
     Implementation of the OpenAI service that generates answers and creates embeddings.
     """
 
-    def __init__(self, api_key: str = OPENAI_API_KEY):
+    def __init__(self, api_key: str = OPENAI_API_KEY, base_url: Optional[str] = OPENAI_BASE_URL):
         """
         Initializes the OpenAI service with the provided API key.
 
         Args:
             api_key (str): The API key for OpenAI.
+            base_url (Optional[str]): OpenAI-compatible API URL (None: the OpenAI API).
         """
-        super().__init__(api_key)
+        super().__init__(api_key, base_url)
         self.embedding_service = None  # Will be injected
 
     def set_embedding_service(self, embedding_service: EmbeddingService):
@@ -104,16 +107,16 @@ class OpenAIService(BaseOpenAIService):
         """
         self.embedding_service = embedding_service
 
-    def generate_answer(self, query: str, context: str) -> str:
+    def _build_messages(self, query: str, context: str) -> List[dict]:
         """
-        Generate an answer based on the provided query and context.
+        Build the chat messages for a question and its context.
 
         Args:
             query (str): The question to be answered.
             context (str): The context from which to extract information.
 
         Returns:
-            str: The generated answer.
+            List[dict]: System and user messages.
         """
         system_prompt = (
             "You are an AI assistant specialized in accurately extracting information from the provided text. "
@@ -129,10 +132,6 @@ class OpenAIService(BaseOpenAIService):
             f"Question:\n{query}\n\n"
             "Please provide an answer based on the above context."
         )
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
         
         logger.info(f"Generating answer for query: {query}")
         rag_logger.info(
@@ -141,7 +140,38 @@ class OpenAIService(BaseOpenAIService):
             f"Context length: {len(context)} chars\n"
             f"{'-'*50}"
         )
-        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _log_answer(self, answer: str) -> None:
+        rag_logger.info(
+            f"\nGenerated Answer:\n"
+            f"Answer length: {len(answer)} chars\n"
+            f"Model: {GPT_MODEL}\n"
+            f"{'-'*50}"
+        )
+
+    def _error_answer(self, e: Exception) -> str:
+        error = self._handle_openai_error(e)
+        error_msg = f"Error in generate_answer: {str(error)}"
+        logger.error(error_msg)
+        rag_logger.error(f"\nOpenAI Error:\n{error_msg}\n{'-'*50}")
+        return f"Sorry, I encountered an error while generating the answer: {str(error)}"
+
+    def generate_answer(self, query: str, context: str) -> str:
+        """
+        Generate an answer based on the provided query and context.
+
+        Args:
+            query (str): The question to be answered.
+            context (str): The context from which to extract information.
+
+        Returns:
+            str: The generated answer.
+        """
+        messages = self._build_messages(query, context)
         try:
             # Call the OpenAI API to generate a chat completion
             response = self.client.chat.completions.create(
@@ -150,22 +180,84 @@ class OpenAIService(BaseOpenAIService):
                 max_tokens=MAX_TOKENS
             )
             answer = response.choices[0].message.content
-            
-            rag_logger.info(
-                f"\nGenerated Answer:\n"
-                f"Answer length: {len(answer)} chars\n"
-                f"Model: {GPT_MODEL}\n"
-                f"{'-'*50}"
+            self._log_answer(answer)
+            return answer
+        except Exception as e:
+            # Handle any exceptions that occur during the API call
+            return self._error_answer(e)
+
+    async def agenerate_answer(self, query: str, context: str, raise_errors: bool = False) -> str:
+        """
+        Generate an answer like generate_answer, without blocking the event loop.
+
+        Args:
+            query (str): The question to be answered.
+            context (str): The context from which to extract information.
+            raise_errors (bool): Raise API errors (handled by _handle_openai_error)
+                instead of returning an apology as the answer.
+
+        Returns:
+            str: The generated answer.
+        """
+        messages = self._build_messages(query, context)
+        try:
+            # Call the OpenAI API through the async client
+            response = await self.async_client.chat.completions.create(
+                model=GPT_MODEL,
+                messages=messages,
+                max_tokens=MAX_TOKENS
             )
-            
+            answer = response.choices[0].message.content
+            self._log_answer(answer)
             return answer
         except Exception as e:
             # Handle any exceptions that occur during the API call
+            if raise_errors:
+                error = self._handle_openai_error(e)
+                logger.error(f"Error in agenerate_answer: {str(error)}")
+                rag_logger.error(f"\nOpenAI Error:\nError in agenerate_answer: {str(error)}\n{'-'*50}")
+                raise error from e
+            return self._error_answer(e)
+
+    async def astream_answer(self, query: str, context: str) -> AsyncIterator[str]:
+        """
+        Generate an answer and yield its text pieces as the model produces them.
+
+        Args:
+            query (str): The question to be answered.
+            context (str): The context from which to extract information.
+
+        Yields:
+            str: Pieces of the answer (roughly one token each).
+
+        Raises:
+            Exception: API errors, handled by _handle_openai_error; the caller
+            decides how to report an error in the middle of a stream.
+        """
+        messages = self._build_messages(query, context)
+        answer_length = 0
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=GPT_MODEL,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    answer_length += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
             error = self._handle_openai_error(e)
-            error_msg = f"Error in generate_answer: {str(error)}"
-            logger.error(error_msg)
-            rag_logger.error(f"\nOpenAI Error:\n{error_msg}\n{'-'*50}")
-            return f"Sorry, I encountered an error while generating the answer: {str(error)}"
+            logger.error(f"Error in astream_answer: {str(error)}")
+            rag_logger.error(f"\nOpenAI Error:\nError in astream_answer: {str(error)}\n{'-'*50}")
+            raise error from e
+        rag_logger.info(
+            f"\nGenerated Answer (stream):\n"
+            f"Answer length: {answer_length} chars\n"
+            f"Model: {GPT_MODEL}\n"
+            f"{'-'*50}"
+        )
 
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
@@ -28,6 +28,11 @@ class VectorStore(ABC):
         """Search for similar vectors."""
         pass
 
+    @abstractmethod
+    def delete_vectors(self, ids: List[str]) -> None:
+        """Delete vectors by ID."""
+        pass
+
     @abstractmethod
     def clear(self) -> None:
         """Clear all stored vectors."""
@@ -158,6 +163,26 @@ class PineconeManager(VectorStore):
             logger.error(f"Error searching vectors: {str(e)}")
             raise
 
+    def delete_vectors(self, ids: List[str]) -> None:
+        """Delete vectors from Pinecone by ID."""
+        if not ids:
+            return
+        if not self.initialized:
+            self._init()
+
+        if not self.is_available():
+            raise ValueError("Pinecone index not initialized")
+
+        try:
+            self.index.delete(ids=ids)
+            logger.info(f"Successfully deleted {len(ids)} vectors")
+            rag_logger.info(f"\nVector Update:\nDeleted vectors: {len(ids)}\n{'-'*50}")
+        except Exception as e:
+            error_msg = f"Error deleting vectors: {str(e)}"
+            logger.error(error_msg)
+            rag_logger.error(f"\nDelete Error:\n{error_msg}\n{'-'*50}")
+            raise
+
     def clear(self) -> None:
         """Clear all vectors from the index."""
         if self.is_available():
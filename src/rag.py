@@ -23,7 +23,10 @@ The main function, rag_query, orchestrates the process from relevant chunk retri
 """
 
 import re
-from typing import List, Dict, Any
+import time
+import asyncio
+from concurrent.futures import Executor
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
@@ -33,7 +36,10 @@ from src.book_data_interface import BookDataInterface
 from src.search import CosineSearch, get_search_strategy
 from src.utils.error_handler import handle_rag_error
 from src.embedding import EmbeddingService
-from src.config import TOP_K_CHUNKS
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.config import TOP_K_CHUNKS, BATCH_ANSWER_CONCURRENCY, CONTEXT_COMPRESSION_ENABLED
+from src.context_builder import Context, build_context
+from src.context_compression import ContextCompressor
 
 # Initialize main and RAG-specific loggers
 logger = get_main_logger()
@@ -50,8 +56,11 @@ def rag_query(query: str, book_data: BookDataInterface, openai_service: OpenAISe
         # Retrieve relevant chunks based on the query
         relevant_chunks = search_strategy.search(query, top_k=TOP_K_CHUNKS)
         
-        # Format the context from the relevant chunks
-        context = format_context(relevant_chunks)
+        # Keep only the sentences that matter for the query (if enabled)
+        relevant_chunks = compress(query, relevant_chunks, embedding_service)
+        
+        # Build the context from the relevant chunks within the token budget
+        context = build_context(relevant_chunks, positions=book_data.get_chunk_positions()).text
         
         # Generate an answer using the OpenAI service
         answer = openai_service.generate_answer(query, context)
@@ -70,6 +79,219 @@ def rag_query(query: str, book_data: BookDataInterface, openai_service: OpenAISe
         logger.error(f"Error in rag_query: {str(e)}")
         return f"Sorry, I encountered an error while processing your request: {str(e)}"
 
+def retrieve(query_embedding: List[float], book_data: BookDataInterface,
+             embedding_service: EmbeddingService, top_k: int = TOP_K_CHUNKS) -> List[Dict[str, Any]]:
+    """Score the book chunks against a query embedding (CPU-bound, no API calls)."""
+    return CosineSearch(book_data, embedding_service).rank(query_embedding, top_k)
+
+def compress(query: str, results: List[Dict[str, Any]], embedding_service: EmbeddingService,
+             query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    """
+    Reduce the found chunks to the sentences that matter for the query
+    (CONTEXT_COMPRESSION_ENABLED); the results are returned as they are otherwise.
+    Sentence embeddings may be created, so this blocks (run it in an executor from async code).
+    """
+    if not CONTEXT_COMPRESSION_ENABLED or not results:
+        return results
+    return ContextCompressor(embedding_service).compress(query, results, query_embedding).results
+
+def retrieve_context(query: str, query_embedding: List[float], book_data: BookDataInterface,
+                     embedding_service: EmbeddingService,
+                     relevant_chunks: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Context]:
+    """
+    Retrieve (unless relevant_chunks are given), compress and build the context for a query.
+
+    Scoring and token counting are CPU-bound: async code runs this in the retrieval executor.
+    """
+    if relevant_chunks is None:
+        relevant_chunks = retrieve(query_embedding, book_data, embedding_service, TOP_K_CHUNKS)
+    relevant_chunks = compress(query, relevant_chunks, embedding_service, query_embedding)
+    return relevant_chunks, build_context(relevant_chunks, positions=book_data.get_chunk_positions())
+
+async def arag_query(query: str, book_data: BookDataInterface, openai_service: OpenAIService,
+                     embedding_service: EmbeddingService, executor: Optional[Executor] = None) -> str:
+    """
+    Process query using RAG approach without blocking the event loop.
+
+    The query is embedded and the answer generated through the async OpenAI
+    client; chunk scoring runs in the given executor (the default one if None).
+    """
+    try:
+        # Create the query embedding
+        query_embedding = (await embedding_service.acreate_embeddings([query]))[0]
+        
+        # Retrieve relevant chunks and build the context within the token budget in a worker thread
+        relevant_chunks, context = await asyncio.get_running_loop().run_in_executor(
+            executor, retrieve_context, query, query_embedding, book_data, embedding_service
+        )
+        
+        # Generate an answer using the async OpenAI client
+        answer = await openai_service.agenerate_answer(query, context.text)
+        
+        # Log the result of the RAG query
+        rag_logger.info(
+            f"\nQuery: {query}\n"
+            f"Context chunks: {len(relevant_chunks)}\n"
+            f"Answer: {answer}\n"
+            f"{'='*50}"
+        )
+        
+        return answer
+    except Exception as e:
+        # Log any errors that occur during the query processing
+        logger.error(f"Error in arag_query: {str(e)}")
+        return f"Sorry, I encountered an error while processing your request: {str(e)}"
+
+async def astream_rag_query(query: str, book_data: BookDataInterface, openai_service: OpenAIService,
+                             embedding_service: EmbeddingService, executor: Optional[Executor] = None,
+                             metrics: MetricsCollector = default_metrics) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process query using RAG approach, streaming the answer as it is generated.
+
+    Yields events in order:
+        {'type': 'metadata', 'chunks': [...], 'retrieval_seconds': ...} once retrieval is done
+        {'type': 'token', 'content': ...} for every piece of the answer
+        {'type': 'done', 'ttft_seconds': ..., 'tokens': ..., 'tokens_per_second': ...}
+    or {'type': 'error', 'message': ...} if something fails.
+
+    Time to first token (from the start of the query) and generation speed are
+    recorded as the answer_ttft_seconds and answer_tokens_per_second metrics.
+    """
+    start = time.perf_counter()
+    try:
+        # Create the query embedding; retrieve relevant chunks and build the context in a worker thread
+        query_embedding = (await embedding_service.acreate_embeddings([query]))[0]
+        relevant_chunks, context = await asyncio.get_running_loop().run_in_executor(
+            executor, retrieve_context, query, query_embedding, book_data, embedding_service
+        )
+        retrieval_seconds = time.perf_counter() - start
+        yield {
+            'type': 'metadata',
+            'chunks': [{'score': r['score'], 'preview': r['chunk'][:200]} for r in relevant_chunks],
+            'retrieval_seconds': round(retrieval_seconds, 3),
+            'context_tokens': context.tokens,
+            'context_tokens_saved': context.tokens_saved
+        }
+
+        # Forward the answer as it is generated
+        first_token_at = None
+        tokens = 0
+        answer = []
+        async for piece in openai_service.astream_answer(query, context.text):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            tokens += 1  # Stream deltas are (about) one token each
+            answer.append(piece)
+            yield {'type': 'token', 'content': piece}
+
+        end = time.perf_counter()
+        ttft = (first_token_at or end) - start
+        generation_seconds = end - (first_token_at or end)
+        tokens_per_second = tokens / generation_seconds if generation_seconds > 0 else 0.0
+        metrics.observe_value("answer_ttft_seconds", ttft)
+        metrics.observe_value("answer_tokens_per_second", tokens_per_second)
+
+        rag_logger.info(
+            f"\nQuery (stream): {query}\n"
+            f"Context chunks: {len(relevant_chunks)}\n"
+            f"Retrieval: {retrieval_seconds:.3f}s\n"
+            f"Time to first token: {ttft:.3f}s\n"
+            f"Tokens: {tokens} ({tokens_per_second:.1f}/s)\n"
+            f"Answer: {''.join(answer)}\n"
+            f"{'='*50}"
+        )
+        yield {
+            'type': 'done',
+            'ttft_seconds': round(ttft, 3),
+            'tokens': tokens,
+            'tokens_per_second': round(tokens_per_second, 1),
+            'total_seconds': round(end - start, 3)
+        }
+    except Exception as e:
+        # Log the error and report it as the last event of the stream
+        logger.error(f"Error in astream_rag_query: {str(e)}")
+        yield {'type': 'error', 'message': f"Sorry, I encountered an error while processing your request: {str(e)}"}
+
+def retrieve_many(query_embeddings: List[List[float]], book_data: BookDataInterface,
+                  embedding_service: EmbeddingService, top_k: int = TOP_K_CHUNKS) -> List[List[Dict[str, Any]]]:
+    """Score the book chunks against several query embeddings in one matrix product."""
+    return CosineSearch(book_data, embedding_service).rank_many(query_embeddings, top_k)
+
+async def abatch_rag_query(queries: List[str], book_data: BookDataInterface, openai_service: OpenAIService,
+                           embedding_service: EmbeddingService, executor: Optional[Executor] = None,
+                           concurrency: int = BATCH_ANSWER_CONCURRENCY) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answer several questions about a book, yielding each answer as soon as it is ready.
+
+    All questions are embedded in one request and scored in one matrix product;
+    the answers are then generated concurrently, at most `concurrency` at once,
+    so the batch takes about as long as its slowest answer.
+
+    Yields:
+        {'type': 'answer', 'index': ..., 'question': ..., 'answer': ..., 'seconds': ...} per question,
+        in completion order ('error' is set instead of a normal answer if its generation failed)
+        {'type': 'done', 'count': ..., 'embedding_seconds': ..., 'retrieval_seconds': ..., 'total_seconds': ...}
+    or a single {'type': 'error', 'message': ...} if embedding or retrieval fails.
+    """
+    start = time.perf_counter()
+    try:
+        query_embeddings = await embedding_service.acreate_embeddings(queries)
+        embedding_seconds = time.perf_counter() - start
+        loop = asyncio.get_running_loop()
+        relevant_chunks = await loop.run_in_executor(
+            executor, retrieve_many, query_embeddings, book_data, embedding_service, TOP_K_CHUNKS
+        )
+        retrieval_seconds = time.perf_counter() - start - embedding_seconds
+    except Exception as e:
+        logger.error(f"Error in abatch_rag_query: {str(e)}")
+        yield {'type': 'error', 'message': f"Sorry, I encountered an error while processing your request: {str(e)}"}
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(index: int) -> Dict[str, Any]:
+        async with semaphore:
+            answer_start = time.perf_counter()
+            result = {'type': 'answer', 'index': index, 'question': queries[index]}
+            try:
+                _, context = await asyncio.get_running_loop().run_in_executor(
+                    executor, retrieve_context, queries[index], query_embeddings[index], book_data,
+                    embedding_service, relevant_chunks[index]
+                )
+                result['answer'] = await openai_service.agenerate_answer(
+                    queries[index], context.text, raise_errors=True
+                )
+            except Exception as e:
+                logger.error(f"Error answering batch question {index}: {str(e)}")
+                result['error'] = str(e)
+            result['seconds'] = round(time.perf_counter() - answer_start, 3)
+            return result
+
+    tasks = [asyncio.ensure_future(answer(i)) for i in range(len(queries))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:  # The client went away: stop generating the rest
+            task.cancel()
+
+    total_seconds = time.perf_counter() - start
+    rag_logger.info(
+        f"\nBatch Query:\n"
+        f"Questions: {len(queries)}\n"
+        f"Embedding: {embedding_seconds:.3f}s\n"
+        f"Retrieval: {retrieval_seconds:.3f}s\n"
+        f"Total: {total_seconds:.3f}s\n"
+        f"{'='*50}"
+    )
+    yield {
+        'type': 'done',
+        'count': len(queries),
+        'embedding_seconds': round(embedding_seconds, 3),
+        'retrieval_seconds': round(retrieval_seconds, 3),
+        'total_seconds': round(total_seconds, 3)
+    }
+
 @handle_rag_error
 def evaluate_answer_quality(generated_answer: str, reference_answer: str) -> float:
     """
@@ -101,6 +323,6 @@ def get_answer_from_system(query: str, book_data: BookDataInterface, openai_serv
     """Retrieve an answer from the RAG system based on the provided query."""
     return rag_query(query, book_data, openai_service)
 
-def format_context(chunks: List[str]) -> str:
-    """Format the found chunks into context for the query."""
-    return "\n\n".join(f"[{i+1}] {chunk}" for i, chunk in enumerate(chunks))
+def format_context(chunks: List[Dict[str, Any]]) -> str:
+    """Format the found chunks into context for the query (see build_context for the token-budgeted version)."""
+    return build_context(chunks).text
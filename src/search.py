@@ -4,9 +4,9 @@ from rank_bm25 import BM25Okapi
 from src.embedding import EmbeddingService, cosine_similarity
 from nltk.corpus import wordnet
 from nltk import word_tokenize, pos_tag
-from nltk.stem import WordNetLemmatizer
 from src.utils.logger import get_main_logger, get_rag_logger
 from src.data_source import DataSource
+from src.services.nltk_resources import ensure_nltk_resources, get_lemmatizer
 import nltk
 from src.utils.error_handler import handle_rag_error, RAGError
 from src.config import EMBEDDING_DIMENSION, TOP_K_CHUNKS
@@ -29,7 +29,10 @@ class BaseSearch:
         self.embeddings = data_source.get_embeddings()  # Retrieve embeddings from data source
         
         # Check if all embeddings have the correct dimension
-        if any(len(emb) != EMBEDDING_DIMENSION for emb in self.embeddings):
+        if isinstance(self.embeddings, np.ndarray):  # Memory-mapped index: one shape check, no row scan
+            if len(self.embeddings) and self.embeddings.shape[1] != EMBEDDING_DIMENSION:
+                raise ValueError("Some embeddings have incorrect dimension")
+        elif any(len(emb) != EMBEDDING_DIMENSION for emb in self.embeddings):
             raise ValueError("Some embeddings have incorrect dimension")
 
     @handle_rag_error
@@ -48,24 +51,22 @@ class BaseSearch:
         
         # Get indices of the top K scores
         top_indices = np.argsort(scores)[-top_k:][::-1]
-        return [{'chunk': self.chunks[i], 'score': float(scores[i])} for i in top_indices]
+        return [{'chunk': self.chunks[i], 'score': float(scores[i]), 'index': int(i)} for i in top_indices]
 
 # Hybrid search strategy combining BM25 and embedding-based search
 class HybridSearch(BaseSearch):
     @handle_rag_error
     def __init__(self, data_source: DataSource):
         super().__init__(data_source)  # Initialize base class
-        # Download necessary NLTK resources quietly
-        nltk.download('wordnet', quiet=True)
-        nltk.download('averaged_perceptron_tagger', quiet=True)
-        nltk.download('punkt', quiet=True)
+        # Resolve NLTK resources once per process (no-op after the first search)
+        ensure_nltk_resources('tokenizer', 'tagger', 'wordnet')
         
         # Initialize BM25 with tokenized chunks
         tokenized_chunks = [chunk.split() for chunk in self.chunks]
         self.bm25 = BM25Okapi(tokenized_chunks)
         
-        # Initialize lemmatizer for word normalization
-        self.lemmatizer = WordNetLemmatizer()
+        # Shared lemmatizer for word normalization
+        self.lemmatizer = get_lemmatizer()
         
         # Set embedding weight for combining scores
         self.embedding_weight = 0.5  # You can adjust this value as needed
@@ -189,7 +190,7 @@ class HybridSearch(BaseSearch):
     def _get_top_chunks(self, scores: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
         # Get indices of the top K scores
         top_indices = np.argsort(scores)[-top_k:][::-1]
-        return [{'chunk': self.chunks[i], 'score': float(scores[i])} for i in top_indices]
+        return [{'chunk': self.chunks[i], 'score': float(scores[i]), 'index': int(i)} for i in top_indices]
 
 class CosineSearch(BaseSearch):
     """Search implementation using cosine similarity between embeddings."""
@@ -209,14 +210,8 @@ class CosineSearch(BaseSearch):
         try:
             # Create embedding for the query
             query_embedding = self.embedding_service.create_embeddings([query])[0]
-            # Calculate cosine similarity scores for each chunk
-            scores = np.array([
-                cosine_similarity(query_embedding, chunk_embedding) 
-                for chunk_embedding in self.embeddings
-            ])
-            
-            # Get the top chunks based on scores
-            results = self._get_top_chunks(scores, top_k)
+            # Score the chunks and get the top ones
+            results = self.rank(query_embedding, top_k)
             
             # Log search results
             rag_logger.info(
@@ -236,6 +231,38 @@ class CosineSearch(BaseSearch):
             rag_logger.error(f"\nSearch Error:\n{error_msg}\n{'-'*50}")
             raise RAGError(error_msg)
 
+    def rank(self, query_embedding: List[float], top_k: int = TOP_K_CHUNKS) -> List[Dict[str, Any]]:
+        """
+        Return the top chunks for an already created query embedding.
+
+        This is the CPU-bound part of the search (no API calls), so the async
+        RAG path runs it in a thread pool.
+        """
+        if not len(self.embeddings):
+            return []
+        # One row per chunk; arrays (books keep theirs as one, memory-mapped float32 indexes) are used without a copy
+        matrix = self.embeddings if isinstance(self.embeddings, np.ndarray) else np.asarray(self.embeddings, dtype=np.float64)
+        query = np.asarray(query_embedding, dtype=matrix.dtype)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        # Cosine similarity of every chunk at once; zero vectors score 0.0 like cosine_similarity
+        scores = np.divide(matrix @ query, norms, out=np.zeros(len(matrix)), where=norms != 0)
+        return self._get_top_chunks(scores, top_k)
+
+    def rank_many(self, query_embeddings: List[List[float]], top_k: int = TOP_K_CHUNKS) -> List[List[Dict[str, Any]]]:
+        """
+        Top chunks for several query embeddings at once (see rank).
+
+        All queries are scored in one matrix product, chunks x queries, instead
+        of one pass over the chunks per query.
+        """
+        if not len(self.embeddings):
+            return [[] for _ in query_embeddings]
+        matrix = self.embeddings if isinstance(self.embeddings, np.ndarray) else np.asarray(self.embeddings, dtype=np.float64)
+        queries = np.asarray(query_embeddings, dtype=matrix.dtype)  # One row per query
+        norms = np.outer(np.linalg.norm(matrix, axis=1), np.linalg.norm(queries, axis=1))
+        scores = np.divide(matrix @ queries.T, norms, out=np.zeros(norms.shape), where=norms != 0)
+        return [self._get_top_chunks(scores[:, i], top_k) for i in range(len(queries))]
+
 @handle_rag_error
 def get_search_strategy(strategy: str, data_source: DataSource) -> BaseSearch:
     """
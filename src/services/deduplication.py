@@ -0,0 +1,151 @@
+import zlib
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+import numpy as np
+from src.config import (
+    DEDUP_THRESHOLD, MINHASH_NUM_PERM, MINHASH_BANDS, MINHASH_SHINGLE_SIZE,
+    EMBEDDING_MODEL, PINECONE_BATCH_SIZE
+)
+from src.utils.logger import get_main_logger, get_rag_logger
+from src.utils.tokens import count_tokens_batch
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class NearDuplicateDetector:
+    """
+    Near-duplicate detection for text chunks with MinHash signatures and LSH banding.
+
+    Signatures are computed with vectorized NumPy hashing over word shingles.
+    Chunks sharing an LSH bucket are compared by estimated Jaccard similarity;
+    a chunk at or above the threshold collapses onto the first similar chunk seen.
+    """
+
+    def __init__(self,
+                 threshold: float = DEDUP_THRESHOLD,
+                 num_perm: int = MINHASH_NUM_PERM,
+                 bands: int = MINHASH_BANDS,
+                 shingle_size: int = MINHASH_SHINGLE_SIZE,
+                 seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Random hash functions h(x) = (a * x + b) mod p, one per permutation
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        if len(words) <= self.shingle_size:
+            shingles = [' '.join(words)]
+        else:
+            shingles = (' '.join(words[i:i + self.shingle_size])
+                        for i in range(len(words) - self.shingle_size + 1))
+        return np.unique(np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64))
+
+    def signature(self, text: str) -> np.ndarray:
+        """Compute the MinHash signature of a text (one value per permutation)."""
+        hashes = self._shingle_hashes(text)
+        # (num_perm x num_shingles) matrix of permuted hashes, minimum per permutation
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return np.bitwise_and(permuted, _MAX_HASH).min(axis=1)
+
+    def add(self, text: str) -> Optional[int]:
+        """
+        Register a chunk.
+
+        Returns:
+            Index of the canonical chunk it duplicates, or None if the chunk is new.
+            Indices follow the order in which chunks were added.
+        """
+        sig = self.signature(text)
+        index = len(self._signatures)
+        band_keys = [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in sorted(candidates):
+            similarity = float(np.mean(self._signatures[candidate] == sig))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+
+        self._signatures.append(sig)
+        if best is not None:
+            return best
+
+        # Only canonical chunks are indexed, so duplicates always resolve to them
+        for band, key in enumerate(band_keys):
+            self._buckets[band][key].append(index)
+        return None
+
+    def deduplicate(self, chunks: List[str]) -> Dict[str, Any]:
+        """
+        Collapse near-duplicate chunks onto canonical ones.
+
+        Returns:
+            Dict with 'chunks' (canonical chunks in original order), 'canonical_indices'
+            (their positions in the input), 'references' (canonical position -> duplicate
+            positions) and 'stats' (savings report).
+        """
+        canonical_indices = []
+        references: Dict[int, List[int]] = defaultdict(list)
+        for i, chunk in enumerate(chunks):
+            canonical = self.add(chunk)
+            if canonical is None:
+                canonical_indices.append(i)
+            else:
+                references[canonical].append(i)
+
+        duplicates = [i for dups in references.values() for i in dups]
+        stats = dedup_savings(len(chunks), [chunks[i] for i in duplicates])
+        log_dedup_savings(stats)
+        return {
+            'chunks': [chunks[i] for i in canonical_indices],
+            'canonical_indices': canonical_indices,
+            'references': dict(references),
+            'stats': stats
+        }
+
+
+def dedup_savings(total_chunks: int, removed_chunks: List[str], batch_size: int = PINECONE_BATCH_SIZE) -> Dict[str, int]:
+    """Report what removing duplicate chunks saves in embedding calls, vectors and tokens."""
+    kept = total_chunks - len(removed_chunks)
+    batches = lambda n: -(-n // batch_size)  # Ceiling division
+    return {
+        'total_chunks': total_chunks,
+        'duplicates_removed': len(removed_chunks),
+        'embedding_inputs_saved': len(removed_chunks),
+        'embedding_requests_saved': batches(total_chunks) - batches(kept),
+        'vectors_saved': len(removed_chunks),
+        'tokens_saved': sum(count_tokens_batch(removed_chunks, EMBEDDING_MODEL))
+    }
+
+
+def log_dedup_savings(stats: Dict[str, int]) -> None:
+    logger.info(f"Near-duplicate chunks removed: {stats['duplicates_removed']}/{stats['total_chunks']}")
+    rag_logger.info(
+        f"\nDeduplication:\n"
+        f"Chunks: {stats['total_chunks']}\n"
+        f"Duplicates removed: {stats['duplicates_removed']}\n"
+        f"Embedding inputs saved: {stats['embedding_inputs_saved']} "
+        f"({stats['embedding_requests_saved']} requests)\n"
+        f"Vectors saved: {stats['vectors_saved']}\n"
+        f"Tokens saved: {stats['tokens_saved']}\n"
+        f"{'-'*50}"
+    )
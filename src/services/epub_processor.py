@@ -1,34 +1,69 @@
-import epub2txt
 import logging
-from typing import Optional
+from typing import Generator, Tuple
+import ebooklib
+from ebooklib import epub
+from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
 
 class EPUBProcessor:
     """Процессор для извлечения текста из EPUB файлов"""
-    
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
     def process_epub(self, file_path: str) -> str:
         """
         Извлекает текст из EPUB файла
-        
+
         Args:
             file_path (str): Путь к EPUB файлу
-            
+
         Returns:
             str: Извлеченный текст
-            
+
+        Raises:
+            ValueError: Если произошла ошибка при обработке файла
+        """
+        text = "\n".join(chapter_text for _, chapter_text in self.iter_chapters(file_path))
+        self.logger.info(f"Successfully extracted {len(text)} characters")
+        return text
+
+    def iter_chapters(self, file_path: str) -> Generator[Tuple[str, str], None, None]:
+        """
+        Извлекает текст из EPUB файла по главам, в порядке spine
+
+        Текст каждой главы извлекается только когда до неё доходит очередь,
+        поэтому весь текст книги не держится в памяти.
+
+        Args:
+            file_path (str): Путь к EPUB файлу
+
+        Yields:
+            Tuple[str, str]: Имя файла главы внутри EPUB и её текст
+
         Raises:
             ValueError: Если произошла ошибка при обработке файла
         """
         try:
             self.logger.info(f"Processing EPUB file: {file_path}")
-            text = epub2txt.epub2txt(file_path)
-            self.logger.info(f"Successfully extracted {len(text)} characters")
-            return text
-            
+            # NCX не нужен для извлечения текста, а без него часть файлов не открывается
+            book = epub.read_epub(file_path, options={'ignore_ncx': True})
+            for item_id, _ in book.spine:
+                item = book.get_item_with_id(item_id)
+                # Оглавление (nav) только повторяет заголовки глав
+                if item is None or item.get_type() != ebooklib.ITEM_DOCUMENT or isinstance(item, epub.EpubNav):
+                    continue
+                yield item.get_name(), self._html_to_text(item.get_content())
+
         except Exception as e:
             self.logger.error(f"Failed to process EPUB file: {str(e)}")
             raise ValueError(f"Error processing EPUB file: {str(e)}")
+
+    @staticmethod
+    def _html_to_text(content: bytes) -> str:
+        """Текст тела XHTML документа без пустых строк"""
+        soup = BeautifulSoup(content, 'html.parser')
+        root = soup.body or soup
+        lines = (line.strip() for line in root.get_text('\n').splitlines())
+        return "\n".join(line for line in lines if line)
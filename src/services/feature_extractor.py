@@ -0,0 +1,318 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import threading
+import time
+from src.config import (
+    FEATURE_EXTRACTOR, SPACY_MODEL, SPACY_BATCH_SIZE, SPACY_N_PROCESS, FEATURE_BATCH_SIZE
+)
+from src.services.text_processor import (
+    extract_dates,
+    extract_named_entities,
+    extract_key_phrases,
+    _extract_phrases_from_tagged
+)
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+# spaCy entity labels mapped to the labels produced by NLTK's ne_chunk,
+# so both engines emit entities in the same "text (LABEL)" vocabulary.
+SPACY_TO_NLTK_LABELS = {
+    'PERSON': 'PERSON',
+    'ORG': 'ORGANIZATION',
+    'GPE': 'GPE',
+    'LOC': 'LOCATION',
+    'FAC': 'FACILITY',
+    'NORP': 'GPE',
+}
+
+# Pipeline components that are not needed for tagging and NER
+SPACY_DISABLED_COMPONENTS = ['parser', 'lemmatizer', 'textcat', 'senter']
+
+
+class FeatureExtractor(ABC):
+    """Interface for engines extracting dates, named entities and key phrases from chunks."""
+
+    name: str = ""
+
+    @abstractmethod
+    def extract(self, chunks: List[str]) -> Dict[str, List[str]]:
+        """
+        Extract features from a list of text chunks.
+
+        Returns:
+            Dict with 'dates', 'entities' and 'key_phrases' lists (deduplicated).
+        """
+        pass
+
+    def iter_extract(self, chunks: List[str], batch_size: int) -> Iterator[Tuple[int, Dict[str, List[str]]]]:
+        """
+        Extract features of all chunks, yielding (chunks done, their features) every batch_size chunks.
+
+        Engines with a per-call setup cost override this to process all chunks in one pass.
+        """
+        for i in range(0, len(chunks), batch_size):
+            batch = chunks[i:i + batch_size]
+            yield len(batch), self.extract(batch)
+
+
+class NLTKFeatureExtractor(FeatureExtractor):
+    """Feature extraction with NLTK, one chunk at a time (default engine)."""
+
+    name = "nltk"
+
+    def extract(self, chunks: List[str]) -> Dict[str, List[str]]:
+        return {
+            'dates': extract_dates(chunks),
+            'entities': extract_named_entities(chunks),
+            'key_phrases': extract_key_phrases(chunks)
+        }
+
+
+class SpacyFeatureExtractor(FeatureExtractor):
+    """
+    Feature extraction with spaCy using batched nlp.pipe.
+
+    Only the tagger and NER components run. Key phrases are selected with the
+    same Penn Treebank grammar as text_processor, applied to spaCy's fine-grained
+    tags, and entity labels are mapped to NLTK's label set, so the output matches
+    the NLTK engine's format.
+    """
+
+    name = "spacy"
+
+    def __init__(self,
+                 model: str = SPACY_MODEL,
+                 batch_size: int = SPACY_BATCH_SIZE,
+                 n_process: int = SPACY_N_PROCESS):
+        self.model = model
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self._nlp = None  # Loaded on first use
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            import spacy  # Imported lazily: spaCy is only required for this engine
+            self._nlp = spacy.load(self.model, disable=SPACY_DISABLED_COMPONENTS)
+            logger.info(f"spaCy model loaded: {self.model}, pipeline: {self._nlp.pipe_names}")
+        return self._nlp
+
+    def extract(self, chunks: List[str]) -> Dict[str, List[str]]:
+        entities = set()
+        key_phrases = set()
+
+        docs = self.nlp.pipe(chunks, batch_size=self.batch_size, n_process=self.n_process)
+        for doc in docs:
+            entities.update(self._entities_from_doc(doc))
+            key_phrases.update(self._phrases_from_doc(doc))
+
+        rag_logger.info(
+            f"\nspaCy Feature Extraction:\n"
+            f"Chunks: {len(chunks)}\n"
+            f"Batch size: {self.batch_size}, processes: {self.n_process}\n"
+            f"{'-'*50}"
+        )
+        return {
+            'dates': extract_dates(chunks),
+            'entities': list(entities),
+            'key_phrases': list(key_phrases)
+        }
+
+    def iter_extract(self, chunks: List[str], batch_size: int) -> Iterator[Tuple[int, Dict[str, List[str]]]]:
+        """
+        All chunks go through one nlp.pipe, so spaCy batches them by its own batch_size
+        and a multi-process pipe (n_process > 1) starts its workers once per book.
+        """
+        docs = self.nlp.pipe(chunks, batch_size=self.batch_size, n_process=self.n_process)
+        entities: List[str] = []
+        key_phrases: List[str] = []
+        start = 0
+        for done, doc in enumerate(docs, 1):
+            entities.extend(self._entities_from_doc(doc))
+            key_phrases.extend(self._phrases_from_doc(doc))
+            if done - start == batch_size or done == len(chunks):
+                yield done - start, {
+                    'dates': extract_dates(chunks[start:done]),
+                    'entities': entities,
+                    'key_phrases': key_phrases
+                }
+                start, entities, key_phrases = done, [], []
+
+        rag_logger.info(
+            f"\nspaCy Feature Extraction:\n"
+            f"Chunks: {len(chunks)}\n"
+            f"Batch size: {self.batch_size}, processes: {self.n_process}\n"
+            f"{'-'*50}"
+        )
+
+    @staticmethod
+    def _entities_from_doc(doc) -> List[str]:
+        entities = []
+        for ent in doc.ents:
+            label = SPACY_TO_NLTK_LABELS.get(ent.label_)
+            if label:
+                entities.append(f"{ent.text} ({label})")
+        return entities
+
+    @staticmethod
+    def _phrases_from_doc(doc) -> List[str]:
+        tagged = [(token.text, token.tag_) for token in doc if not token.is_space]
+        try:
+            return _extract_phrases_from_tagged(tagged)
+        except Exception as e:
+            logger.error(f"Error extracting phrases with spaCy tags: {str(e)}")
+            return []
+
+
+def get_feature_extractor(engine: Optional[str] = None) -> FeatureExtractor:
+    """
+    Get feature extraction engine by name.
+
+    Available engines:
+    - nltk: NLTK ne_chunk and RegexpParser, chunk by chunk
+    - spacy: batched spaCy nlp.pipe with unneeded components disabled
+
+    Falls back to NLTK if the engine is unknown.
+    """
+    engines = {
+        "nltk": NLTKFeatureExtractor,
+        "spacy": SpacyFeatureExtractor,
+    }
+
+    engine = engine or FEATURE_EXTRACTOR
+    if engine not in engines:
+        logger.warning(f"Unknown feature extractor: {engine}, using nltk")
+        engine = "nltk"
+
+    return engines[engine]()
+
+
+class FeatureExtractionStage:
+    """
+    Feature extraction running as a background stage of a processed book.
+
+    Chunks are processed in a daemon thread and results are published every
+    batch_size chunks, so they grow incrementally: readers can either block
+    until the stage completes or take the partial features gathered so far.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self,
+                 chunks: List[str],
+                 extractor: Optional[FeatureExtractor] = None,
+                 batch_size: int = FEATURE_BATCH_SIZE):
+        self.chunks = chunks
+        self.extractor = extractor or get_feature_extractor()
+        self.batch_size = batch_size
+        self.status = self.PENDING
+        self.processed = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._features = {'dates': set(), 'entities': set(), 'key_phrases': set()}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def completed(cls,
+                  dates: Optional[List[str]] = None,
+                  entities: Optional[List[str]] = None,
+                  key_phrases: Optional[List[str]] = None) -> 'FeatureExtractionStage':
+        """Create an already finished stage from known features (e.g. loaded from disk)."""
+        stage = cls(chunks=[], extractor=NLTKFeatureExtractor())
+        stage._merge({
+            'dates': dates or [],
+            'entities': entities or [],
+            'key_phrases': key_phrases or []
+        })
+        stage.status = cls.COMPLETED
+        stage._done.set()
+        return stage
+
+    def start(self) -> 'FeatureExtractionStage':
+        """Start extraction in a background thread."""
+        if self._thread is None and not self._done.is_set():
+            self._thread = threading.Thread(target=self.run, name="feature-extraction", daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self) -> None:
+        """Extract features for all chunks in the calling thread."""
+        self.status = self.RUNNING
+        self.started_at = time.time()
+        logger.info(f"Feature extraction started for {len(self.chunks)} chunks ({self.extractor.name} engine)")
+        try:
+            for count, features in self.extractor.iter_extract(self.chunks, self.batch_size):
+                self._merge(features)
+                self.processed += count
+            self.status = self.COMPLETED
+        except Exception as e:
+            self.error = str(e)
+            self.status = self.FAILED
+            logger.error(f"Feature extraction failed: {str(e)}", exc_info=True)
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+        rag_logger.info(
+            f"\nFeature Extraction:\n"
+            f"Status: {self.status}\n"
+            f"Chunks: {self.processed}/{len(self.chunks)}\n"
+            f"Dates: {len(self._features['dates'])}\n"
+            f"Entities: {len(self._features['entities'])}\n"
+            f"Key phrases: {len(self._features['key_phrases'])}\n"
+            f"Duration: {self.finished_at - self.started_at:.2f}s\n"
+            f"{'-'*50}"
+        )
+
+    def _merge(self, features: Dict[str, List[str]]) -> None:
+        with self._lock:
+            for key, values in features.items():
+                self._features[key].update(values)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the stage to finish. Returns True if it has finished."""
+        return self._done.wait(timeout)
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def get(self, key: str, block: bool = True, timeout: Optional[float] = None) -> List[str]:
+        """
+        Get extracted values for 'dates', 'entities' or 'key_phrases'.
+
+        Args:
+            key: Feature name
+            block: Wait for the stage to complete; otherwise return partial results
+            timeout: Maximum time to wait when blocking
+
+        Returns:
+            List of values extracted so far
+        """
+        if block:
+            self.wait(timeout)
+        with self._lock:
+            return list(self._features[key])
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return the stage status, progress and timing."""
+        total = len(self.chunks)
+        duration = None
+        if self.started_at is not None:
+            duration = (self.finished_at or time.time()) - self.started_at
+        return {
+            'status': self.status,
+            'engine': self.extractor.name,
+            'processed': self.processed,
+            'total': total,
+            'progress': (self.processed / total) * 100 if total > 0 else 100.0,
+            'duration': duration,
+            'error': self.error
+        }
@@ -1,6 +1,13 @@
 # src/file_processor.py
 import os
-from typing import Optional
+import codecs
+import functools
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Generator, List, Tuple
 import pypdf
 from docx import Document
 from odf import text, teletype
@@ -8,14 +15,66 @@ from odf.opendocument import load
 from src.utils.logger import get_main_logger, get_rag_logger
 from src.utils.error_handler import FileProcessingError, handle_rag_error
 from src.services.epub_processor import EPUBProcessor
+from src.services.text_processor import process_large_file
+from src.config import PDF_PARALLEL_MIN_PAGES, PDF_PAGES_PER_TASK, PDF_EXTRACT_WORKERS
 
 # Initialize loggers for main application and RAG processing
 logger = get_main_logger()
 rag_logger = get_rag_logger()
 
+
+@dataclass
+class TextSegment:
+    """A piece of extracted text with its location in the source file."""
+    text: str
+    location: str  # e.g. 'page 12', 'chapter_3.xhtml', 'chars 0-1000000'
+
+
+@functools.lru_cache(maxsize=4)
+def _open_pdf(file_path: str, signature: Tuple[int, int]) -> pypdf.PdfReader:
+    """
+    Open a PDF once per worker process; tasks for the same file reuse the reader.
+
+    The file's (size, mtime) signature is part of the cache key, so a file
+    replaced at the same path is opened again by the long-lived workers.
+    """
+    return pypdf.PdfReader(file_path)
+
+
+def _extract_pdf_pages(file_path: str, signature: Tuple[int, int], start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF (runs in worker processes)."""
+    reader = _open_pdf(file_path, signature)
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_workers = 0
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The process pool for PDF extraction, shared by all files and threads.
+
+    Workers are spawned rather than forked: ingest runs in a process with
+    other threads (jobs, retrieval, storage), and a forked child could
+    inherit a lock one of them holds, e.g. a logging handler lock.
+    The pool grows if a caller asks for more workers than it has.
+    """
+    global _pdf_pool, _pdf_pool_workers
+    with _pdf_pool_lock:
+        if _pdf_pool is None or workers > _pdf_pool_workers:
+            if _pdf_pool is not None:
+                _pdf_pool.shutdown(wait=False)  # Ranges already submitted to it still complete
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pdf_pool_workers = workers
+        return _pdf_pool
+
+
 class FileProcessor:
-    def __init__(self):
+    def __init__(self, pdf_workers: int = PDF_EXTRACT_WORKERS):
         self.epub_processor = EPUBProcessor()
+        self.pdf_workers = pdf_workers  # Worker processes for large PDFs (1 = extract in this process)
         self.supported_formats = {
             '.txt': self._process_txt,
             '.pdf': self._process_pdf,
@@ -46,6 +105,55 @@ class FileProcessor:
             )
         return processor(file_path)
 
+    def iter_segments(self, file_path: str) -> Generator[TextSegment, None, None]:
+        """
+        Yield the text content of a file in segments with their source locations.
+
+        Text files are read block by block, PDFs page by page and EPUBs chapter by
+        chapter; other formats are yielded as one segment.
+        """
+        _, ext = os.path.splitext(file_path)
+        ext = ext.lower()
+        if ext == '.txt':
+            offset = 0
+            for block in process_large_file(file_path, encoding=self._detect_encoding(file_path)):
+                yield TextSegment(block, f"chars {offset}-{offset + len(block)}")
+                offset += len(block)
+        elif ext == '.pdf':
+            yield from self._iter_pdf_pages(file_path)
+        elif ext == '.epub':
+            for name, chapter_text in self.epub_processor.iter_chapters(file_path):
+                yield TextSegment(chapter_text, name)
+        else:
+            yield TextSegment(self.process_file(file_path), os.path.basename(file_path))
+
+    def iter_text(self, file_path: str) -> Generator[str, None, None]:
+        """
+        Yield the text content of a file in segments, for streaming ingest.
+
+        Segment locations are not passed on: chunks do not carry per-chunk
+        metadata yet (see iter_segments for the locations).
+        """
+        is_txt = file_path.lower().endswith('.txt')
+        for segment in self.iter_segments(file_path):
+            # Text file blocks may cut a word in half; pages and chapters end at a word boundary
+            yield segment.text if is_txt else segment.text + '\n'
+
+    def _detect_encoding(self, file_path: str, block_size: int = 1000000) -> str:
+        """Find the first encoding that decodes the whole file, reading it block by block."""
+        encodings = ['utf-8', 'latin-1', 'cp1251', 'ascii']  # Same order as _process_txt
+        for encoding in encodings:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                with open(file_path, 'rb') as f:
+                    while block := f.read(block_size):
+                        decoder.decode(block)
+                    decoder.decode(b'', final=True)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError(f"Could not decode file with any of: {encodings}")
+
     def _process_txt(self, file_path: str) -> str:
         """Process a .txt file and return its content as a string."""
         encodings = ['utf-8', 'latin-1', 'cp1251', 'ascii']  # List of encodings to try
@@ -61,10 +169,53 @@ class FileProcessor:
 
     def _process_pdf(self, file_path: str) -> str:
         """Process a .pdf file and return its text content."""
-        with open(file_path, 'rb') as file:
-            reader = pypdf.PdfReader(file)  # Read the PDF file
-            # Extract text from each page and join them into a single string
-            return ' '.join(page.extract_text() for page in reader.pages)
+        # Extract text from each page and join them into a single string
+        return ' '.join(segment.text for segment in self._iter_pdf_pages(file_path))
+
+    def _iter_pdf_pages(self, file_path: str,
+                        workers: Optional[int] = None,
+                        min_parallel_pages: int = PDF_PARALLEL_MIN_PAGES,
+                        pages_per_task: int = PDF_PAGES_PER_TASK) -> Generator[TextSegment, None, None]:
+        """
+        Yield the text of a PDF page by page, in page order.
+
+        Large files are split into page ranges extracted by a process pool. Only a
+        bounded number of ranges is in flight, so extracted text does not pile up
+        ahead of a slow consumer.
+        """
+        workers = workers if workers is not None else self.pdf_workers
+        reader = pypdf.PdfReader(file_path)
+        page_count = len(reader.pages)
+        if workers <= 1 or page_count < min_parallel_pages:
+            for i, page in enumerate(reader.pages):
+                yield TextSegment(page.extract_text(), f"page {i + 1}")
+            return
+
+        logger.info(f"Extracting {page_count} PDF pages with {workers} worker processes")
+        stat = os.stat(file_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        starts = iter(range(0, page_count, pages_per_task))
+        executor = _get_pdf_pool(workers)
+        pending = deque()
+        try:
+            def submit_next() -> None:
+                start = next(starts, None)
+                if start is not None:
+                    end = min(start + pages_per_task, page_count)
+                    pending.append((start, executor.submit(_extract_pdf_pages, file_path, signature, start, end)))
+
+            for _ in range(workers * 2):
+                submit_next()
+            while pending:
+                start, future = pending.popleft()
+                pages = future.result()
+                submit_next()
+                for i, page_text in enumerate(pages):
+                    yield TextSegment(page_text, f"page {start + i + 1}")
+        finally:
+            # Also runs when the consumer stops early: drop ranges that have not started
+            for _, future in pending:
+                future.cancel()
 
     def _process_docx(self, file_path: str) -> str:
         """Process a .docx file and return its text content."""
@@ -1,25 +1,35 @@
 import firebase_admin
 from firebase_admin import credentials, storage
 import os
+import asyncio
+from src.config import STORAGE_CHUNK_SIZE
 from src.utils.logger import get_main_logger
 
 logger = get_main_logger()
 
 class FirebaseStorageService:
-    def __init__(self):
+    name = 'firebase'
+
+    def __init__(self, chunk_size: int = STORAGE_CHUNK_SIZE):
         if not firebase_admin._apps:
             cred = credentials.Certificate(os.getenv('FIREBASE_CREDENTIALS_PATH'))
             firebase_admin.initialize_app(cred, {
                 'storageBucket': os.getenv('FIREBASE_STORAGE_BUCKET')
             })
         self.bucket = storage.bucket()
+        self.chunk_size = chunk_size
         
-    async def upload_file(self, file_path: str, user: str) -> str:
-        """Загружает файл в Firebase Storage и возвращает URL"""
+    def upload(self, file_path: str, user: str) -> str:
+        """
+        Загружает файл в Firebase Storage и возвращает URL (блокирующий вызов, для рабочих потоков).
+
+        С заданным chunk_size файл передается resumable-загрузкой частями: сбой сети
+        повторяет только текущую часть, а не весь файл.
+        """
         try:
             file_name = os.path.basename(file_path)
             blob_path = f"uploads/{user}/{file_name}"
-            blob = self.bucket.blob(blob_path)
+            blob = self.bucket.blob(blob_path, chunk_size=self.chunk_size)
             
             logger.info("Starting Firebase upload", extra={
                 "user": user,
@@ -43,3 +53,7 @@ class FirebaseStorageService:
                 "error": str(e)
             })
             raise
+
+    async def upload_file(self, file_path: str, user: str) -> str:
+        """Загружает файл в Firebase Storage в потоке, не блокируя event loop, и возвращает URL"""
+        return await asyncio.to_thread(self.upload, file_path, user)
@@ -0,0 +1,170 @@
+"""
+Lazy, process-wide loader for NLTK resources.
+
+Resources are resolved (and, if allowed, downloaded) once per process on first
+use instead of at import time or on every search. In the Docker image the data
+is bundled at build time:
+
+    python -m src.services.nltk_resources --download-dir /app/nltk_data
+
+and NLTK_DATA points at that directory, with NLTK_AUTO_DOWNLOAD=false.
+"""
+import argparse
+import functools
+import threading
+import time
+from typing import Dict, List, Optional
+import nltk
+from src.config import NLTK_DATA_DIR, NLTK_AUTO_DOWNLOAD
+from src.utils.logger import get_main_logger, get_rag_logger
+from src.utils.metrics import MetricsCollector, default_metrics
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+# Logical resources mapped to the NLTK data paths they need (with category prefix).
+# The download package name is the last path component.
+NLTK_RESOURCES: Dict[str, List[str]] = {
+    'tokenizer': ['tokenizers/punkt_tab'],
+    'tagger': ['taggers/averaged_perceptron_tagger_eng'],
+    'chunker': ['chunkers/maxent_ne_chunker_tab', 'corpora/words'],
+    'wordnet': ['corpora/wordnet'],
+}
+
+_loaded: Dict[str, float] = {}  # Resource name -> load time in seconds
+_failed: Dict[str, LookupError] = {}  # Resource name -> resolution error (not retried)
+_lock = threading.Lock()
+
+
+def _resolve(path: str, download: bool, download_dir: Optional[str]) -> None:
+    """Find an NLTK data path, downloading its package if allowed."""
+    try:
+        nltk.data.find(path)
+        return
+    except LookupError:
+        if not download:
+            raise LookupError(
+                f"NLTK resource '{path}' not found and downloads are disabled. "
+                f"Bundle it with: python -m src.services.nltk_resources --download-dir <dir>"
+            )
+
+    package = path.rsplit('/', 1)[-1]
+    logger.info(f"Downloading NLTK package: {package}")
+    if not nltk.download(package, download_dir=download_dir, quiet=True):
+        raise LookupError(f"Failed to download NLTK package: {package}")
+    nltk.data.find(path)
+
+
+def _warm_up(name: str) -> None:
+    """Load a resource into memory so the first real call does not pay for it."""
+    if name == 'tokenizer':
+        nltk.word_tokenize("Warm up.")
+    elif name == 'tagger':
+        nltk.pos_tag(["warm", "up"])
+    elif name == 'chunker':
+        get_ne_chunker()
+    elif name == 'wordnet':
+        from nltk.corpus import wordnet
+        wordnet.ensure_loaded()
+
+
+def ensure_nltk_resources(*names: str,
+                          download: bool = NLTK_AUTO_DOWNLOAD,
+                          download_dir: Optional[str] = NLTK_DATA_DIR) -> None:
+    """
+    Make sure the named resources are available and loaded.
+
+    Each resource is resolved once per process; later calls return immediately.
+
+    Args:
+        names: Resource names from NLTK_RESOURCES (all resources if empty)
+        download: Download missing packages instead of raising LookupError
+        download_dir: Target directory for downloads (NLTK default if None)
+    """
+    names = names or tuple(NLTK_RESOURCES)
+    if all(name in _loaded for name in names):
+        return
+
+    with _lock:
+        for name in names:
+            if name in _loaded:
+                continue
+            if name in _failed:
+                raise _failed[name]
+            if name not in NLTK_RESOURCES:
+                raise ValueError(f"Unknown NLTK resource: {name}")
+
+            start = time.perf_counter()
+            try:
+                for path in NLTK_RESOURCES[name]:
+                    _resolve(path, download, download_dir)
+            except LookupError as e:
+                # Remember the failure so callers do not retry downloads chunk after chunk
+                _failed[name] = e
+                logger.error(f"NLTK resource '{name}' unavailable: {str(e)}")
+                raise
+            _warm_up(name)
+            _loaded[name] = time.perf_counter() - start
+            logger.info(f"NLTK resource '{name}' loaded in {_loaded[name]:.3f}s")
+
+
+def get_load_times() -> Dict[str, float]:
+    """Return load time in seconds for each resource loaded so far."""
+    return dict(_loaded)
+
+
+@functools.lru_cache(maxsize=None)
+def get_ne_chunker():
+    """Return a shared named entity chunker (nltk.ne_chunk rebuilds it on every call)."""
+    from nltk.chunk import ne_chunker
+    return ne_chunker()
+
+
+@functools.lru_cache(maxsize=None)
+def get_lemmatizer():
+    """Return a shared WordNet lemmatizer."""
+    from nltk.stem import WordNetLemmatizer
+    ensure_nltk_resources('wordnet')
+    return WordNetLemmatizer()
+
+
+def preload_nltk_resources(metrics: Optional[MetricsCollector] = None) -> Dict[str, float]:
+    """
+    Load all NLTK resources and record their load time as startup metrics.
+
+    Intended for application startup, so the first query does not pay for loading.
+    """
+    metrics = metrics or default_metrics
+    start = time.perf_counter()
+    ensure_nltk_resources()
+    total = time.perf_counter() - start
+
+    load_times = get_load_times()
+    metrics.set_gauge('startup_nltk_load_seconds', total)
+    for name, duration in load_times.items():
+        metrics.set_gauge(f'startup_nltk_{name}_load_seconds', duration)
+
+    rag_logger.info(
+        f"\nNLTK Resources:\n"
+        + "\n".join(f"{name}: {duration:.3f}s" for name, duration in load_times.items())
+        + f"\nTotal: {total:.3f}s\n{'-'*50}"
+    )
+    return load_times
+
+
+def download_all(download_dir: Optional[str] = None) -> None:
+    """Download every NLTK package used by the application (for offline bundling)."""
+    for paths in NLTK_RESOURCES.values():
+        for path in paths:
+            package = path.rsplit('/', 1)[-1]
+            if not nltk.download(package, download_dir=download_dir, quiet=True):
+                raise RuntimeError(f"Failed to download NLTK package: {package}")
+            print(f"Downloaded {package}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bundle NLTK data used by RAG Book Assistant")
+    parser.add_argument("--download-dir", default=NLTK_DATA_DIR,
+                        help="Directory to download NLTK data into (defaults to NLTK_DATA)")
+    args = parser.parse_args()
+    download_all(args.download_dir)
@@ -0,0 +1,136 @@
+import os
+import time
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Protocol
+from src.config import (
+    STORAGE_BACKEND, STORAGE_LOCAL_DIR, STORAGE_UPLOAD_WORKERS, STORAGE_CHUNK_SIZE
+)
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+
+class StorageBackend(Protocol):
+    """Where uploaded files are kept; upload() blocks and returns the file's URL."""
+    name: str
+
+    def upload(self, file_path: str, user: str) -> str:
+        ...
+
+
+class LocalStorageBackend:
+    """
+    Stores uploaded files under a local directory (uploads/<user>/<file name>).
+
+    Files are copied in chunks to a .part file that replaces the target once
+    complete, so readers never see a partial file. A copy interrupted by a
+    crash resumes from the .part file if the source has not changed since.
+    """
+    name = 'local'
+
+    def __init__(self, root: str = STORAGE_LOCAL_DIR, chunk_size: int = STORAGE_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        os.makedirs(root, exist_ok=True)
+
+    def upload(self, file_path: str, user: str) -> str:
+        target = os.path.join(self.root, 'uploads', user, os.path.basename(file_path))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        source_stat = os.stat(file_path)
+        # The source size and mtime in the name: a changed source does not resume an old copy
+        part_path = f"{target}.{source_stat.st_size}-{source_stat.st_mtime_ns}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset > source_stat.st_size:
+            offset = 0
+        if offset:
+            logger.info(f"Resuming storage copy of {file_path} at {offset} bytes")
+
+        with open(file_path, 'rb') as src, open(part_path, 'r+b' if offset else 'wb') as dst:
+            src.seek(offset)
+            dst.seek(offset)
+            while chunk := src.read(self.chunk_size):
+                dst.write(chunk)
+            dst.truncate()
+        os.replace(part_path, target)
+        return f"file://{os.path.abspath(target)}"
+
+
+class StorageService:
+    """
+    Uploads files to a storage backend in a background thread pool.
+
+    submit() returns a Future at once, so the upload runs in parallel with
+    book ingest instead of delaying it. Upload times and failures are recorded
+    as the storage_upload_seconds, storage_uploads and storage_upload_errors metrics.
+    """
+
+    def __init__(self, backend: StorageBackend, max_workers: int = STORAGE_UPLOAD_WORKERS,
+                 metrics: MetricsCollector = default_metrics):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.metrics = metrics
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def submit(self, file_path: str, user: str) -> Future:
+        """Start uploading a file; the future's result is its URL."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="storage")
+        return self._executor.submit(self._upload, file_path, user)
+
+    async def upload_file(self, file_path: str, user: str) -> str:
+        """Upload a file without blocking the event loop and return its URL."""
+        return await asyncio.wrap_future(self.submit(file_path, user))
+
+    def _upload(self, file_path: str, user: str) -> str:
+        start = time.perf_counter()
+        try:
+            url = self.backend.upload(file_path, user)
+        except Exception as e:
+            self.metrics.increment_counter("storage_upload_errors")
+            logger.warning(f"Storage upload ({self.name}) of {file_path} failed: {str(e)}")
+            raise
+        duration = time.perf_counter() - start
+        self.metrics.increment_counter("storage_uploads")
+        self.metrics.observe_value("storage_upload_seconds", duration)
+        rag_logger.info(
+            f"\nStorage Upload:\n"
+            f"Backend: {self.name}\n"
+            f"File: {os.path.basename(file_path)}\n"
+            f"Size: {os.path.getsize(file_path) / 1024 / 1024:.1f} MB\n"
+            f"Time: {duration:.3f}s\n"
+            f"{'-'*50}"
+        )
+        return url
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool; with wait, running and queued uploads are finished first."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def create_storage_service(backend: str = STORAGE_BACKEND) -> Optional[StorageService]:
+    """The storage service for the configured backend, or None if uploads are not stored."""
+    if backend == 'auto':
+        credentials_path = os.getenv('FIREBASE_CREDENTIALS_PATH')
+        backend = 'firebase' if credentials_path and os.path.exists(credentials_path) else 'none'
+    if backend == 'local':
+        return StorageService(LocalStorageBackend(STORAGE_LOCAL_DIR))
+    if backend == 'firebase':
+        try:
+            from src.services.firebase_storage import FirebaseStorageService
+            service = StorageService(FirebaseStorageService())
+            logger.info("Firebase storage service initialized successfully")
+            return service
+        except Exception as e:
+            logger.warning(f"Failed to initialize Firebase storage: {e}")
+            return None
+    logger.warning("No storage backend configured, running without file storage")
+    return None
@@ -1,10 +1,18 @@
 import re
-from typing import List, Dict, Any, Union, Generator
-from src.config import CHUNK_SIZE, OVERLAP
+import zlib
+import hashlib
+from typing import List, Dict, Any, Union, Generator, Tuple, Iterable
+from collections import Counter
+import numpy as np
+from src.config import (
+    CHUNK_SIZE, OVERLAP, CHUNKING_STRATEGY,
+    CDC_MIN_CHUNK_SIZE, CDC_MAX_CHUNK_SIZE, CDC_WINDOW
+)
 import nltk
-from nltk import ne_chunk, pos_tag, word_tokenize
+from nltk import pos_tag, word_tokenize
 from nltk.tree import Tree
 from src.utils.logger import get_main_logger, get_rag_logger
+from src.services.nltk_resources import ensure_nltk_resources, get_ne_chunker
 from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from functools import partial
@@ -14,29 +22,10 @@ import asyncio
 logger = get_main_logger()
 rag_logger = get_rag_logger()
 
-def initialize_nltk():
-    """Initialize NLTK resources."""
-    try:
-        nltk.data.find('tokenizers/punkt')
-        nltk.data.find('averaged_perceptron_tagger')
-        nltk.data.find('maxent_ne_chunker')
-        nltk.data.find('words')
-        nltk.data.find('corpora/stopwords')
-        nltk.data.find('corpora/wordnet')
-    except LookupError:
-        logger.info("Downloading necessary NLTK data...")
-        nltk.download('punkt', quiet=True)
-        nltk.download('averaged_perceptron_tagger', quiet=True)
-        nltk.download('maxent_ne_chunker', quiet=True)
-        nltk.download('words', quiet=True)
-
-# Инициализируем NLTK при импорте модуля
-initialize_nltk()
-
-def process_large_file(file_path: str, chunk_size: int = 1000000) -> Generator[str, None, None]:
+def process_large_file(file_path: str, chunk_size: int = 1000000, encoding: str = 'utf-8') -> Generator[str, None, None]:
     """Process a large file in chunks of specified size."""
     logger.info(f"Processing large file: {file_path}")
-    with open(file_path, 'r', encoding='utf-8') as file:
+    with open(file_path, 'r', encoding=encoding) as file:
         while True:
             chunk = file.read(chunk_size)  # Read a chunk of the file
             if not chunk:  # If no more content, exit the loop
@@ -92,12 +81,13 @@ def extract_key_phrases(text: Union[str, List[str]]) -> List[str]:
 def _extract_entities_from_text(text: str) -> List[str]:
     """Helper function to extract entities from a single text string."""
     try:
+        ensure_nltk_resources('tokenizer', 'tagger', 'chunker')
         # Токенизация и POS-тегирование
         tokens = word_tokenize(text)
         tagged = pos_tag(tokens)
         
-        # Извлечение именованных сущностей
-        chunks = ne_chunk(tagged)
+        # Извлечение именованных сущностей (чанкер загружается один раз на процесс)
+        chunks = get_ne_chunker().parse(tagged)
         
         entities = []
         for chunk in chunks:
@@ -116,36 +106,39 @@ def _extract_entities_from_text(text: str) -> List[str]:
 def _extract_phrases_from_text(text: str) -> List[str]:
     """Helper function to extract phrases from a single text string."""
     try:
+        ensure_nltk_resources('tokenizer', 'tagger')
         # Токенизация и POS-тегирование
         tokens = word_tokenize(text)
         tagged = pos_tag(tokens)
-        
-        # Определяем грамматику для извлечения фраз
-        grammar = r"""
-            PHRASE: {<JJ.*>*<NN.*>+}          # Прилагательные + существительные
-                   {<NN.*><IN><NN.*>}         # Существительное + предлог + существительное
-                   {<VB.*><NN.*>+}            # Глагол + существительные
-        """
-        
-        # Создаем парсер и извлекаем фразы
-        chunk_parser = nltk.RegexpParser(grammar)
-        tree = chunk_parser.parse(tagged)
-        
-        phrases = []
-        for subtree in tree.subtrees(filter=lambda t: t.label() == 'PHRASE'):
-            phrase = ' '.join([word for word, tag in subtree.leaves()])
-            if len(phrase.split()) > 1:  # Только фразы из нескольких слов
-                phrases.append(phrase.lower())
-        
-        # Подсчитываем частоту фраз и берем топ-10
-        from collections import Counter
-        phrase_counts = Counter(phrases)
-        return [phrase for phrase, count in phrase_counts.most_common(10)]
+        return _extract_phrases_from_tagged(tagged)
         
     except Exception as e:
         logger.error(f"Error extracting phrases: {str(e)}")
         return []
 
+# Грамматика для извлечения фраз (теги Penn Treebank)
+PHRASE_GRAMMAR = r"""
+    PHRASE: {<JJ.*>*<NN.*>+}          # Прилагательные + существительные
+           {<NN.*><IN><NN.*>}         # Существительное + предлог + существительное
+           {<VB.*><NN.*>+}            # Глагол + существительные
+"""
+
+def _extract_phrases_from_tagged(tagged: List[Tuple[str, str]]) -> List[str]:
+    """Extract the top-10 multi-word phrases from (token, Penn tag) pairs."""
+    # Создаем парсер и извлекаем фразы
+    chunk_parser = nltk.RegexpParser(PHRASE_GRAMMAR)
+    tree = chunk_parser.parse(tagged)
+    
+    phrases = []
+    for subtree in tree.subtrees(filter=lambda t: t.label() == 'PHRASE'):
+        phrase = ' '.join([word for word, tag in subtree.leaves()])
+        if len(phrase.split()) > 1:  # Только фразы из нескольких слов
+            phrases.append(phrase.lower())
+    
+    # Подсчитываем частоту фраз и берем топ-10
+    phrase_counts = Counter(phrases)
+    return [phrase for phrase, count in phrase_counts.most_common(10)]
+
 def load_and_preprocess_text(input_data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
     """Load and preprocess text data."""
     try:
@@ -164,7 +157,7 @@ def load_and_preprocess_text(input_data: Union[str, Dict[str, Any]]) -> Dict[str
         if not text:
             raise ValueError("Empty text content")  # Validate non-empty content
             
-        chunks = split_into_chunks(text)  # Split text into chunks
+        chunks = split_text(text)  # Split text into chunks using the configured strategy
         
         processed_data = {
             'text': text,
@@ -214,6 +207,149 @@ def split_into_chunks(text: Union[str, Dict[str, Any]], chunk_size: int = CHUNK_
     
     return chunks  # Return list of chunks
 
+def split_text(text: str, strategy: str = CHUNKING_STRATEGY) -> List[str]:
+    """Split text into chunks with the configured strategy ('content_defined' or 'fixed')."""
+    if strategy == "content_defined":
+        return split_into_content_defined_chunks(text)
+    return split_into_chunks(text)
+
+def find_content_defined_boundaries(words: List[str],
+                                    chunk_size: int = CHUNK_SIZE,
+                                    min_size: int = CDC_MIN_CHUNK_SIZE,
+                                    max_size: int = CDC_MAX_CHUNK_SIZE,
+                                    window: int = CDC_WINDOW) -> List[int]:
+    """
+    Find chunk end positions (exclusive word indices) from a rolling hash of the words.
+
+    A boundary is placed after a word when the hash of the last `window` words hits
+    a fixed residue, which happens on average every (chunk_size - min_size) words past
+    min_size. Boundaries depend only on nearby content, so inserting or deleting words
+    moves only the boundaries around the edit. Chunks are forced to end at max_size.
+    """
+    n = len(words)
+    if n == 0:
+        return []
+
+    # Stable per-word hashes (Python's hash() is salted per process)
+    word_hashes = np.fromiter((zlib.crc32(w.encode('utf-8')) for w in words), dtype=np.uint64, count=n)
+
+    # Polynomial rolling hash over the window, computed for all positions at once
+    rolling = np.zeros(n, dtype=np.uint64)
+    multiplier = 1
+    for k in range(min(window, n)):
+        rolling[k:] += word_hashes[:n - k] * np.uint64(multiplier)  # Wraps modulo 2**64
+        multiplier = (multiplier * 1000003) % 2**64
+
+    divisor = max(chunk_size - min_size, 1)
+    candidates = np.flatnonzero((rolling >> np.uint64(16)) % np.uint64(divisor) == 0) + 1
+
+    boundaries = []
+    start = 0
+    for end in candidates:
+        while end - start > max_size:
+            start += max_size
+            boundaries.append(start)
+        if end - start >= min_size:
+            boundaries.append(int(end))
+            start = int(end)
+    while n - start > max_size:
+        start += max_size
+        boundaries.append(start)
+    if not boundaries or boundaries[-1] != n:
+        boundaries.append(n)
+    return boundaries
+
+def split_into_content_defined_chunks(text: Union[str, Dict[str, Any]],
+                                      chunk_size: int = CHUNK_SIZE,
+                                      overlap: int = OVERLAP,
+                                      min_size: int = CDC_MIN_CHUNK_SIZE,
+                                      max_size: int = CDC_MAX_CHUNK_SIZE,
+                                      window: int = CDC_WINDOW) -> List[str]:
+    """
+    Split text into chunks with content-defined boundaries.
+
+    Each chunk is prefixed with the last `overlap` words of the previous one, like
+    split_into_chunks, so an edit changes at most the chunk containing it and the next.
+    """
+    if isinstance(text, dict):
+        text = text.get('text', '')
+
+    words = text.split()
+    boundaries = find_content_defined_boundaries(words, chunk_size, min_size, max_size, window)
+
+    chunks = []
+    start = 0
+    for end in boundaries:
+        chunks.append(' '.join(words[max(start - overlap, 0):end]))
+        start = end
+
+    logger.info(f"Created {len(chunks)} content-defined chunks from {len(words)} words")
+    return chunks
+
+def iter_text_chunks(segments: Iterable[str],
+                     strategy: str = CHUNKING_STRATEGY,
+                     chunk_size: int = CHUNK_SIZE,
+                     overlap: int = OVERLAP,
+                     min_size: int = CDC_MIN_CHUNK_SIZE,
+                     max_size: int = CDC_MAX_CHUNK_SIZE,
+                     window: int = CDC_WINDOW) -> Generator[str, None, None]:
+    """
+    Chunk a stream of text segments (file blocks, pages, chapters) as they arrive.
+
+    Yields the same chunks as split_text on the concatenated text while holding only
+    a few chunks worth of words. Segments may split a word; the partial word is
+    carried over to the next segment.
+    """
+    buffer: List[str] = []  # Words not yet emitted
+    prefix: List[str] = []  # Overlap words preceding the buffer (content-defined strategy)
+    partial = ''  # Trailing word fragment of the previous segment
+    step = chunk_size - overlap
+    flush_size = 4 * max_size if strategy == "content_defined" else chunk_size
+
+    def emit_content_defined(final: bool):
+        nonlocal buffer, prefix
+        boundaries = find_content_defined_boundaries(buffer, chunk_size, min_size, max_size, window)
+        if not final:
+            # The last boundary may move once more words arrive; earlier ones are final
+            boundaries = boundaries[:-1]
+        words = prefix + buffer
+        offset = len(prefix)
+        start = 0
+        for end in boundaries:
+            yield ' '.join(words[max(offset + start - overlap, 0):offset + end])
+            start = end
+        if boundaries:
+            prefix = words[max(offset + start - overlap, 0):offset + start]
+            buffer = buffer[start:]
+
+    for segment in segments:
+        text = partial + segment
+        words = text.split()
+        partial = words.pop() if words and not text[-1].isspace() else ''
+        buffer.extend(words)
+
+        if len(buffer) < flush_size:
+            continue
+        if strategy == "content_defined":
+            yield from emit_content_defined(final=False)
+        else:
+            while len(buffer) >= chunk_size:
+                yield ' '.join(buffer[:chunk_size])
+                buffer = buffer[step:]
+
+    if partial:
+        buffer.append(partial)
+    if strategy == "content_defined":
+        if buffer:
+            yield from emit_content_defined(final=True)
+    else:
+        for i in range(0, len(buffer), step):
+            yield ' '.join(buffer[i:i + chunk_size])
+
+def chunk_id(chunk: str) -> str:
+    """Return a stable content hash identifying a chunk."""
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+
 def read_file_content(file_path: str) -> str:
     """Read entire file content and return as string."""
     logger.info(f"Reading file: {file_path}")  # Log file reading
@@ -230,6 +366,7 @@ def analyze_chunks(text_or_dict, chunk_size=500, overlap=50, progress_callback=N
     """
     chunks = split_into_chunks(text_or_dict, chunk_size, overlap)
     total_chunks = len(chunks)
+    ensure_nltk_resources('tokenizer', 'tagger', 'chunker')
     
     def analyze_single_chunk(chunk_data):
         i, chunk = chunk_data
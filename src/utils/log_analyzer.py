@@ -1,23 +1,45 @@
 from typing import List, Dict
 import json
-import datetime
+from datetime import datetime
+from src.utils.log_reader import LogIndex
+
+# Levels reported by get_errors_by_period, as JSONFormatter writes them
+ERROR_LEVELS = ('ERROR', 'CRITICAL')
+ERROR_MARKERS = tuple(f'"level": "{level}"'.encode() for level in ERROR_LEVELS)
 
 class LogAnalyzer:
     def __init__(self, log_file: str):
         self.log_file = log_file
+        self.index = LogIndex(log_file)  # Time-to-offset index in <log_file>.idx
         
     def get_errors_by_period(self, start_time: datetime, end_time: datetime) -> List[Dict]:
+        """
+        Error entries logged between start_time and end_time.
+
+        The index gives the offset to start reading at, and reading stops at the
+        first entry after end_time, so only the requested range is read. Lines
+        without an error level are skipped before being parsed.
+        """
+        self.index.update()
         errors = []
-        with open(self.log_file) as f:
+        with open(self.log_file, 'rb') as f:
+            f.seek(self.index.offset_for(start_time))
             for line in f:
                 try:
+                    if not any(marker in line for marker in ERROR_MARKERS):
+                        # Only the timestamp is needed to know when to stop
+                        if line.startswith(b'{"timestamp": "'):
+                            if datetime.fromisoformat(line[15:41].split(b'"')[0].decode()) > end_time:
+                                break
+                        continue
                     log_entry = json.loads(line)
                     log_time = datetime.fromisoformat(log_entry['timestamp'])
                     
+                    if log_time > end_time:
+                        break
                     if (log_time >= start_time and 
-                        log_time <= end_time and 
-                        log_entry['level'] in ['ERROR', 'CRITICAL']):
+                        log_entry['level'] in ERROR_LEVELS):
                         errors.append(log_entry)
-                except:
+                except (ValueError, KeyError):
                     continue
-        return errors
\ No newline at end of file
+        return errors
@@ -0,0 +1,145 @@
+import os
+import json
+import asyncio
+import bisect
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from src.config import LOG_TAIL_BLOCK_SIZE, LOG_INDEX_INTERVAL, LOG_FOLLOW_POLL_INTERVAL
+
+
+def tail_lines(path: str, lines: int, block_size: int = LOG_TAIL_BLOCK_SIZE) -> List[str]:
+    """
+    Last `lines` lines of a file, read backwards in blocks from its end.
+
+    Only the blocks holding those lines are read, whatever the file size.
+    """
+    if lines <= 0:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        # One newline more than lines is needed to know the first wanted line is complete
+        while position > 0 and data.count(b'\n') <= lines:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    result = data.decode('utf-8', errors='replace').splitlines(keepends=True)
+    return result[-lines:]
+
+
+async def follow(path: str, poll_interval: float = LOG_FOLLOW_POLL_INTERVAL,
+                 from_end: bool = True) -> AsyncIterator[str]:
+    """
+    Yield lines appended to a file, like `tail -f`, until the consumer stops.
+
+    Polls the file size; if the file is truncated or replaced (log rotation) it
+    is read again from its start. A line is yielded once its newline is written.
+    """
+    offset = os.path.getsize(path) if from_end and os.path.exists(path) else 0
+    inode = os.stat(path).st_ino if os.path.exists(path) else None
+    partial = b''
+    while True:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            await asyncio.sleep(poll_interval)
+            continue
+        if stat.st_ino != inode or stat.st_size < offset:
+            inode, offset, partial = stat.st_ino, 0, b''
+        if stat.st_size > offset:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = await asyncio.to_thread(f.read, stat.st_size - offset)
+            offset += len(data)
+            *complete, partial = (partial + data).split(b'\n')
+            for line in complete:
+                yield line.decode('utf-8', errors='replace')
+        else:
+            await asyncio.sleep(poll_interval)
+
+
+def line_time(line: bytes) -> Optional[datetime]:
+    """Timestamp of a JSON log line (see JSONFormatter), or None if it has none."""
+    try:
+        return datetime.fromisoformat(json.loads(line)['timestamp'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class LogIndex:
+    """
+    Sparse time-to-offset index of a JSON log, kept in a sidecar file (<log>.idx).
+
+    About every `interval` bytes the offset of the next line start and that
+    line's timestamp are recorded, so a time range can be found by a binary
+    search and a seek instead of parsing the log from its start. update() only
+    visits the checkpoints appended since the last call (one short read each);
+    a truncated or replaced log is indexed again.
+    """
+
+    def __init__(self, log_path: str, interval: int = LOG_INDEX_INTERVAL):
+        self.log_path = log_path
+        self.index_path = f"{log_path}.idx"
+        self.interval = interval
+        self.inode: Optional[int] = None
+        self.indexed_size = 0  # Log bytes covered by the checkpoints
+        self.times: List[float] = []  # Checkpoint timestamps (POSIX seconds), ascending
+        self.offsets: List[int] = []
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, 'r') as f:
+                header = f.readline().split()
+                entries = [line.split() for line in f if line.strip()]
+        except (FileNotFoundError, ValueError):
+            return
+        if len(header) != 3 or header[0] != 'v1':
+            return  # Unknown format: rebuilt on update
+        self.inode, self.indexed_size = int(header[1]), int(header[2])
+        self.times = [float(t) for t, _ in entries]
+        self.offsets = [int(o) for _, o in entries]
+
+    def _reset(self, inode: int) -> None:
+        self.inode, self.indexed_size, self.times, self.offsets = inode, 0, [], []
+
+    def update(self) -> None:
+        """Add checkpoints for the part of the log written since the last update."""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self.inode or stat.st_size < self.indexed_size:
+            self._reset(stat.st_ino)
+        if self.offsets and self.offsets[-1] + self.interval >= stat.st_size:
+            return  # No new checkpoint yet
+
+        with open(self.log_path, 'rb') as f:
+            position = self.offsets[-1] + self.interval if self.offsets else 0
+            while position < stat.st_size:
+                f.seek(position)
+                if position > 0:
+                    f.readline()  # Skip to the start of the next line
+                offset = f.tell()
+                timestamp = line_time(f.readline())
+                if timestamp is not None and (not self.times or timestamp.timestamp() >= self.times[-1]):
+                    self.times.append(timestamp.timestamp())
+                    self.offsets.append(offset)
+                position = max(offset, position) + self.interval
+        self.indexed_size = stat.st_size
+        self._save()
+
+    def _save(self) -> None:
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(f"v1 {self.inode} {self.indexed_size}\n")
+            f.writelines(f"{t} {o}\n" for t, o in zip(self.times, self.offsets))
+        os.replace(tmp_path, self.index_path)
+
+    def offset_for(self, start_time: datetime) -> int:
+        """Offset of a line start at or before the first line logged at start_time."""
+        # One checkpoint back: lines of concurrent writers may be slightly out of order
+        i = bisect.bisect_left(self.times, start_time.timestamp()) - 2
+        return self.offsets[i] if i >= 0 else 0
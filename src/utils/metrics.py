@@ -110,4 +110,7 @@ class MetricsCollector:
         self.histograms.clear()
         self.start_times.clear()
         logger.info("All metrics reset")
-        rag_logger.info("\nMetrics Reset:\nStatus: Completed\n" + "-"*50)
\ No newline at end of file
+        rag_logger.info("\nMetrics Reset:\nStatus: Completed\n" + "-"*50)
+
+# Create default metrics instance shared across the application
+default_metrics = MetricsCollector()
@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Optional
+from src.utils.logger import get_main_logger
+
+logger = get_main_logger()
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter for API requests and tokens per minute.
+
+    Both limits are token buckets refilled continuously; acquire() blocks until the
+    request and its tokens fit, so one limiter can be shared by every thread that
+    calls the same API.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0  # Total time callers spent blocked
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _wait_time(self, tokens: int) -> float:
+        """Seconds until one request with the given tokens fits (0 if it fits now)."""
+        wait = 0.0
+        if self.requests_per_minute and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            # A request larger than the whole bucket is let through once the bucket is full
+            needed = min(tokens, self.tokens_per_minute)
+            if self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block until a request with the given number of tokens is allowed.
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    waited = time.monotonic() - start
+                    self.waited_seconds += waited
+                    return waited
+            time.sleep(wait)
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.utils.logger import get_main_logger
+
+logger = get_main_logger()
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight await the same future and receive its result (or exception). The
+    call is shielded, so a caller that goes away does not cancel it for the
+    others. Nothing is cached once the call finishes.
+
+    Metrics: <name>_calls (calls made) and <name>_coalesced (callers that joined one).
+    """
+
+    def __init__(self, name: str, metrics: MetricsCollector = default_metrics):
+        self.name = name
+        self.metrics = metrics
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.metrics.increment_counter(f"{self.name}_coalesced")
+            logger.debug(f"{self.name}: joined in-flight call for {key}")
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        self.metrics.increment_counter(f"{self.name}_calls")
+        return await asyncio.shield(future)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+
+def normalize_question(question: str) -> str:
+    """Question text as compared for coalescing: case, spacing and final punctuation ignored."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def question_key(question: str, book_data: Any, strategy: str) -> tuple:
+    """Coalescing key of a question: the book (by content hash when known), question and strategy."""
+    book_key = book_data.get_metadata().get('content_hash') or id(book_data)
+    return book_key, normalize_question(question), strategy
@@ -0,0 +1,37 @@
+import functools
+from typing import List
+from src.utils.logger import get_main_logger
+
+logger = get_main_logger()
+
+CHARS_PER_TOKEN = 4  # Rough estimate used when the tokenizer cannot be loaded
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """Return the tiktoken encoding for a model, or None if it cannot be loaded (e.g. offline)."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable for {model}, estimating tokens: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count tokens of a text with the tokenizer of the given model."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts: List[str], model: str) -> List[int]:
+    """Count tokens of several texts at once."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [-(-len(text) // CHARS_PER_TOKEN) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
@@ -25,7 +25,8 @@ class VectorStoreService:
                            chunks: List[str], 
                            embeddings: List[List[float]], 
                            start_idx: int, 
-                           batch_size: int) -> List[Dict[str, Any]]:
+                           batch_size: int,
+                           ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Create a batch of vectors for Pinecone.
 
@@ -34,6 +35,7 @@ class VectorStoreService:
             embeddings: List of embeddings corresponding to the chunks.
             start_idx: Starting index for the current batch.
             batch_size: Number of vectors to include in the batch.
+            ids: Optional vector IDs (e.g. content hashes); positional IDs are used if omitted.
 
         Returns:
             A list of dictionaries representing the vector batch.
@@ -41,21 +43,22 @@ class VectorStoreService:
         end_idx = min(start_idx + batch_size, len(chunks))  # Calculate the end index for the batch
         return [
             {
-                'id': str(idx + start_idx),  # Unique ID for the vector
+                'id': ids[idx] if ids else str(idx),  # Unique ID for the vector
                 'values': embeddings[idx],  # Embedding values
                 'metadata': {'text': chunks[idx]}  # Metadata containing the original text chunk
             }
-            for idx in range(end_idx - start_idx)  # Create the vector batch
+            for idx in range(start_idx, end_idx)  # Create the vector batch
         ]
 
     @handle_rag_error
-    def store_vectors(self, chunks: List[str], embeddings: List[List[float]]) -> None:
+    def store_vectors(self, chunks: List[str], embeddings: List[List[float]], ids: Optional[List[str]] = None) -> None:
         """
         Store vectors in batches with optimal size.
 
         Args:
             chunks: List of text chunks to be stored.
             embeddings: List of embeddings corresponding to the chunks.
+            ids: Optional vector IDs corresponding to the chunks.
 
         Raises:
             ValueError: If the lengths of chunks and embeddings do not match.
@@ -76,7 +79,8 @@ class VectorStoreService:
                     chunks, 
                     embeddings, 
                     batch_start, 
-                    self.max_batch_size
+                    self.max_batch_size,
+                    ids
                 )  # Create a batch of vectors
                 
                 self.vector_store.upsert_vectors(vectors)  # Store the vectors in Pinecone
@@ -100,3 +104,17 @@ class VectorStoreService:
         success_msg = f"Successfully stored all {total_vectors} vectors"
         logger.info(success_msg)  # Log success message
         rag_logger.info(f"\n{success_msg}\n{'-'*50}")
+
+    @handle_rag_error
+    def delete_vectors(self, ids: List[str]) -> None:
+        """
+        Delete vectors by ID in batches.
+
+        Args:
+            ids: IDs of the vectors to delete.
+        """
+        for batch_start in range(0, len(ids), self.max_batch_size):
+            self.vector_store.delete_vectors(ids[batch_start:batch_start + self.max_batch_size])
+        if ids:
+            logger.info(f"Deleted {len(ids)} vectors")
+            rag_logger.info(f"\nVector Deletion:\nDeleted vectors: {len(ids)}\n{'-'*50}")
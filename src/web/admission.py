@@ -0,0 +1,199 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from src.config import ADMISSION_RETRY_AFTER
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.utils.logger import get_main_logger
+
+logger = get_main_logger()
+
+
+class Overloaded(Exception):
+    """A request refused by admission control; carries the HTTP status and Retry-After seconds."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue, for one class of traffic.
+
+    Up to max_concurrent requests run at once; up to max_queue more wait for a
+    slot, each for at most queue_timeout seconds, which bounds the latency an
+    admitted request can add by queueing. Beyond that requests fail fast:
+    429 when the queue is full, 503 when the wait times out or the backlog
+    (e.g. queued ingest jobs) is at max_backlog. Retry-After is estimated from
+    the measured service time and the queue length.
+
+    Metrics: admission_<name>_queue_seconds, admission_<name>_service_seconds,
+    admission_<name>_{admitted,rejected,timed_out} and the
+    admission_<name>_{active,waiting} gauges.
+    """
+
+    def __init__(self,
+                 name: str,
+                 max_concurrent: int,
+                 max_queue: int,
+                 queue_timeout: float,
+                 backlog: Optional[Callable[[], int]] = None,
+                 max_backlog: Optional[int] = None,
+                 metrics: MetricsCollector = default_metrics):
+        """
+        Args:
+            name: Traffic class in metric names and logs (e.g. 'query', 'ingest')
+            max_concurrent: Requests served at the same time
+            max_queue: Requests waiting for a slot
+            queue_timeout: Seconds a request may wait for a slot
+            backlog: Current amount of queued downstream work, checked on admission
+            max_backlog: Backlog at which new requests are refused
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backlog = backlog
+        self.max_backlog = max_backlog
+        self.metrics = metrics
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time: Optional[float] = None  # Moving average of the seconds a slot is held
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead served at the measured rate."""
+        if self._service_time is None:
+            return ADMISSION_RETRY_AFTER
+        return max(1, math.ceil(self._service_time * (self.waiting + 1) / self.max_concurrent))
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot; returns the seconds spent queueing.
+
+        Raises:
+            Overloaded: The queue is full, the wait timed out or the backlog is too large
+        """
+        if self.backlog is not None and self.max_backlog is not None and self.backlog() >= self.max_backlog:
+            self._reject("rejected", status.HTTP_503_SERVICE_UNAVAILABLE, f"Too many pending {self.name} jobs")
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self._admitted(0.0)
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            self._reject("rejected", status.HTTP_429_TOO_MANY_REQUESTS, f"Too many {self.name} requests")
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # The slot was handed over just as the wait ended: pass it on
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            self._update_gauges()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject("timed_out", status.HTTP_503_SERVICE_UNAVAILABLE,
+                         f"{self.name.capitalize()} queue wait exceeded {self.queue_timeout:g}s")
+        queued = time.perf_counter() - start
+        self._admitted(queued)
+        return queued
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the longest waiting request if there is one."""
+        if service_seconds is not None:
+            self.metrics.observe_value(f"admission_{self.name}_service_seconds", service_seconds)
+            self._service_time = service_seconds if self._service_time is None \
+                else 0.8 * self._service_time + 0.2 * service_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # The slot passes on: active stays the same
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'service_seconds': self._service_time
+        }
+
+    def _admitted(self, queued: float) -> None:
+        self.metrics.increment_counter(f"admission_{self.name}_admitted")
+        self.metrics.observe_value(f"admission_{self.name}_queue_seconds", queued)
+        self._update_gauges()
+
+    def _reject(self, outcome: str, status_code: int, detail: str) -> None:
+        self.metrics.increment_counter(f"admission_{self.name}_{outcome}")
+        retry_after = self.retry_after()
+        logger.warning(f"{detail}: refused with {status_code}, retry after {retry_after}s "
+                       f"(active {self.active}, waiting {self.waiting})")
+        raise Overloaded(status_code, detail, retry_after)
+
+    def _update_gauges(self) -> None:
+        self.metrics.set_gauge(f"admission_{self.name}_active", self.active)
+        self.metrics.set_gauge(f"admission_{self.name}_waiting", self.waiting)
+
+
+class AdmissionMiddleware:
+    """
+    Applies admission limiters by path prefix, before the request body is read.
+
+    The slot is held until the response is fully sent, streamed responses
+    (SSE) included. Refused requests get a JSON error with Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp, limiters: Iterable[Tuple[str, AdmissionLimiter]]):
+        """
+        Args:
+            limiters: (path prefix, limiter) pairs; the first matching prefix applies
+        """
+        self.app = app
+        self.limiters = list(limiters)
+
+    def _limiter_for(self, path: str) -> Optional[AdmissionLimiter]:
+        for prefix, limiter in self.limiters:
+            if path.startswith(prefix):
+                return limiter
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = self._limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
@@ -2,43 +2,73 @@ from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Form
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 import os
 import uvicorn
+from typing import List, Optional
+from pydantic import BaseModel, Field
 from src.cli import BookAssistant
 from src.utils.logger import get_main_logger, get_rag_logger
 from src.services.file_processor import FileProcessor
 from src.web.websocket import WebSocketManager
 from fastapi import WebSocket,WebSocketDisconnect, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from .auth.middleware import AuthMiddleware
-import aiofiles
-from src.services.firebase_storage import FirebaseStorageService
+from .auth.middleware import AuthMiddleware, verify_password
+from .auth.dependencies import USERS, get_current_user
+from .uploads import save_upload, make_upload_path, remove_upload, ContentLengthLimitMiddleware
+from .jobs import JobManager
+from .admission import AdmissionLimiter, AdmissionMiddleware
+from .sse import sse_response
+from .book_registry import BookRegistry
+from .book_catalog import BookCatalog
+from .routes.logs import router as logs_router
+from src.book_library import library_key
+from src.manifest_store import make_book_id, owner_book_id
+from src.services.storage import StorageService, create_storage_service
 import secrets
+import base64
+import asyncio
+from contextlib import asynccontextmanager
+from src.services.nltk_resources import preload_nltk_resources
+from src.config import (
+    JOB_STATE_DIR, SESSION_SECRET_KEY, BATCH_MAX_QUESTIONS, QUERY_MAX_CONCURRENT, QUERY_MAX_QUEUE, QUERY_QUEUE_TIMEOUT,
+    INGEST_MAX_CONCURRENT, INGEST_MAX_QUEUE, INGEST_QUEUE_TIMEOUT, INGEST_MAX_PENDING_JOBS
+)
 
 # Initialize loggers
 logger = get_main_logger()
 rag_logger = get_rag_logger()
 
-# Initialize Firebase storage service if credentials are available
-storage_service = None
-credentials_path = os.getenv('FIREBASE_CREDENTIALS_PATH')
-if credentials_path and os.path.exists(credentials_path):
+# Хранилище загруженных файлов (Firebase, локальная папка или без него, см. STORAGE_BACKEND)
+storage_service = create_storage_service()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load NLTK resources before serving, so the first query does not pay for it
     try:
-        storage_service = FirebaseStorageService()
-        logger.info("Firebase storage service initialized successfully")
+        await asyncio.to_thread(preload_nltk_resources)
     except Exception as e:
-        logger.warning(f"Failed to initialize Firebase storage: {e}")
-else:
-    logger.warning("Firebase credentials not found, running without Firebase storage")
+        logger.warning(f"NLTK resources not preloaded: {e}")
+    # Прогресс из рабочих потоков передается в WebSocket-каналы через этот event loop
+    ws_manager.bind_loop(asyncio.get_running_loop())
+    # Книги, загруженные через другие воркеры, регистрируются из общего каталога
+    if book_catalog is not None:
+        await asyncio.to_thread(book_catalog.watch, register_catalog_books)
+    yield
+    if book_catalog is not None:
+        book_catalog.stop()
+    job_manager.shutdown()
+    if storage_service is not None:
+        storage_service.shutdown(wait=False)
 
 # Initialize FastAPI app
-app = FastAPI(title="Book Assistant API")
+app = FastAPI(title="Book Assistant API", lifespan=lifespan)
 app.auth_required = True  # Флаг для управления аутентификацией
 
+app.include_router(logs_router)  # /logs/{main|rag}: хвост лога и follow через SSE
+
 # Configure static files and templates
 app.mount("/static", StaticFiles(directory="src/web/static"), name="static")
 templates = Jinja2Templates(directory="src/web/templates")
@@ -51,26 +81,32 @@ UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'doc', 'docx', 'odt', 'epub'}
 
-# Configure authentication
-security = HTTPBasic()
-USERS = {
-    'admin': os.environ.get('ADMIN_PASSWORD', 'admin1q2w3e'),
-    'tester1': os.environ.get('TESTER_PASSWORD', '41dsf3qw7sDa')
-}
-
 # Initialize services
-assistant = BookAssistant(progress_callback=ws_manager.emit_progress)
+# Прогресс загрузки идет через фоновые задания (см. publish_job_progress), а не через общий callback
+assistant = BookAssistant(progress_callback=None)
 file_processor = FileProcessor()
-book_data = None
-
-async def get_current_user(credentials: HTTPBasicCredentials = Depends(security)):
-    if credentials.username in USERS and USERS[credentials.username] == credentials.password:
-        return credentials.username
-    raise HTTPException(
-        status_code=401,
-        detail="Invalid credentials",
-        headers={"WWW-Authenticate": "Basic"},
-    )
+def publish_job_progress(job):
+    """Прогресс задания в каналы задания и его владельца (вызывается из рабочего потока)"""
+    channels = [f"job:{job.id}"] + ([f"user:{job.info['user']}"] if job.info.get('user') else [])
+    ws_manager.progress_callback(*channels)(job.progress['status'], job.progress['current'], job.progress['total'])
+
+# Пул потоков для обработки загруженных книг вне event loop; состояние заданий видно всем воркерам
+job_manager = JobManager(on_progress=publish_job_progress, state_dir=JOB_STATE_DIR or None)
+# Отдельные лимиты для вопросов и загрузок: поток загрузок не отнимает слоты у интерактивных вопросов
+query_limiter = AdmissionLimiter("query", QUERY_MAX_CONCURRENT, QUERY_MAX_QUEUE, QUERY_QUEUE_TIMEOUT)
+ingest_limiter = AdmissionLimiter(
+    "ingest", INGEST_MAX_CONCURRENT, INGEST_MAX_QUEUE, INGEST_QUEUE_TIMEOUT,
+    backlog=lambda: job_manager.pending("ingest"), max_backlog=INGEST_MAX_PENDING_JOBS
+)
+# Загруженные книги всех пользователей; давно не использованные выгружаются и подгружаются из библиотеки
+book_registry = BookRegistry(assistant.library, assistant.embedding_service)
+# Общий каталог книг для нескольких воркеров (нужна библиотека: из нее книги подгружаются)
+book_catalog = BookCatalog() if assistant.library is not None else None
+
+def register_catalog_books(entries):
+    """Регистрирует новые книги каталога (вызывается из потока наблюдения)"""
+    for entry in entries:
+        book_registry.register(entry['owner'], entry['book_id'], entry['snapshot_key'], entry.get('updated_at'))
 
 def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -96,9 +132,9 @@ def get_storage_service():
 async def upload_file(
     file: UploadFile = File(...),
     user: str = Depends(get_current_user),
-    storage_service: FirebaseStorageService = Depends(get_storage_service)
+    storage_service: Optional[StorageService] = Depends(get_storage_service)
 ):
-    temp_files = []
+    file_path = None
     try:
         logger.info("Upload started", extra={
             "user": user,
@@ -118,103 +154,222 @@ async def upload_file(
                 detail=f"Invalid file type. Allowed extensions: {', '.join(ALLOWED_EXTENSIONS)}"
             )
         
-        # Сохраняем временный файл
-        filename = file.filename
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        temp_files.append(file_path)
+        # Сохраняем файл в отдельную папку загрузки: одинаковые имена у разных загрузок не перезаписывают друг друга
+        file_path = make_upload_path(UPLOAD_FOLDER, file.filename)
+        filename = os.path.basename(file_path)
         
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+        # Пишем файл на диск кусками, считая SHA-256 по ходу (без копии всего файла в памяти)
+        file_size, content_hash = await save_upload(file, file_path)
             
         logger.info("File saved", extra={
             "user": user,
             "file_location": file_path,
-            "file_size": len(content)
+            "file_size": file_size,
+            "content_hash": content_hash
         })
         
-        # Upload to Firebase only if storage service is available
-        storage_url = None
-        if storage_service:
+        # Загрузка в хранилище идет в фоновом потоке параллельно с обработкой книги
+        storage_upload = storage_service.submit(file_path, user) if storage_service else None
+        
+        # Обработка книги в фоновом задании: ответ возвращается сразу, статус - в /jobs/{id}
+        # book_id - имя книги для пользователя; манифест и ID векторов - свои у каждого владельца
+        book_id = make_book_id(filename)
+        def ingest_book(progress):
             try:
-                storage_url = await storage_service.upload_file(file_path, user)
+                progress("Processing book", 0, 1)
+                book_data = assistant.load_and_process_book(
+                    file_path, book_id=owner_book_id(user, book_id), content_hash=content_hash, progress_callback=progress
+                )
             except Exception as e:
-                logger.warning(f"Firebase upload failed: {e}")
-                # Continue without Firebase storage
-        
-        # Обработка книги
-        try:
-            book_data = assistant.load_and_process_book(file_path)
-            app.state.book_data = book_data
-            
-            response_data = {
-                "status": "success",
-                "message": "File processed successfully",
-                "chunks_count": len(book_data.get_chunks())
+                logger.error("Book processing error", extra={
+                    "user": user,
+                    "error": str(e)
+                })
+                raise
+            finally:
+                remove_upload(file_path, storage_upload)
+            snapshot_key = library_key(content_hash) if assistant.library is not None else None
+            book_registry.put(user, book_id, book_data, snapshot_key)
+            if book_catalog is not None:
+                # В каталог - только после записи снимка в библиотеку, иначе другие воркеры не смогут его загрузить
+                assistant.library.when_saved(
+                    snapshot_key, lambda key: book_catalog.publish(user, book_id, key)
+                )
+            return {
+                "book_id": book_id,
+                "chunks_count": len(book_data.get_chunks()),
+                "content_hash": content_hash,
+                "library": "hit" if book_data.get_metadata().get('library_hit') else "miss"
             }
-            if storage_url:
-                response_data["storage_url"] = storage_url
-                
-            return JSONResponse(response_data)
-            
-        except Exception as e:
-            logger.error("Book processing error", extra={
-                "user": user,
-                "error": str(e)
-            })
-            app.state.book_data = None
-            raise
+
+        job = job_manager.submit(ingest_book, kind="ingest", filename=filename, user=user)
+        if storage_upload is not None:
+            # Ссылка на файл в хранилище появляется в статусе задания, когда загрузка завершится
+            storage_upload.add_done_callback(lambda upload: record_storage_upload(job, upload))
+        response_data = {
+            "status": "accepted",
+            "message": "File uploaded, processing started",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}",
+            "book_id": book_id,
+            "content_hash": content_hash
+        }
+        if storage_upload is not None:
+            response_data["storage"] = storage_service.name
+        return JSONResponse(response_data, status_code=202)
             
     except Exception as e:
         # В случае ошибки тоже удаляем временный файл
-        if temp_files and os.path.exists(temp_files[0]):
-            os.remove(temp_files[0])
+        if file_path is not None:
+            remove_upload(file_path)
             logger.info("Temporary file removed after error", extra={
-                "file_location": temp_files[0]
+                "file_location": file_path
             })
         raise
 
+def record_storage_upload(job, upload):
+    """Результат загрузки в хранилище - в info задания (вызывается из потока загрузки)"""
+    if upload.cancelled():
+        return
+    if upload.exception() is None:
+        job.info["storage_url"] = upload.result()
+    else:
+        job.info["storage_error"] = str(upload.exception())
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, user: str = Depends(get_current_user)):
+    """Статус фонового задания пользователя: состояние, прогресс, время в очереди и выполнения, результат или ошибка"""
+    job = job_manager.get(job_id)
+    if job is None or job.info.get('user') != user:
+        # Чужое задание не отличается от несуществующего
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(job.to_dict())
+
+async def get_book(user: str, book_id: Optional[str]):
+    """Книга пользователя из реестра (последняя использованная, если book_id не указан)"""
+    try:
+        # Выгруженная книга подгружается с диска, поэтому не в event loop
+        return await asyncio.to_thread(book_registry.get, user, book_id)
+    except KeyError as e:
+        logger.error(f"Book not available: {e.args[0]}")
+        raise HTTPException(
+            status_code=404 if book_id else 400,
+            detail=e.args[0]
+        )
+
 @app.get("/ask")
 async def ask_question(
     question: str,
+    book_id: Optional[str] = None,
     user: str = Depends(get_current_user)
 ):
-    # Получаем book_data из состояния приложения
-    book_data = getattr(app.state, 'book_data', None)
-    
-    if not book_data:
-        logger.error("No book data loaded")
-        raise HTTPException(
-            status_code=400,
-            detail="No book data loaded"
-        )
+    book_data = await get_book(user, book_id)
     
     try:
         logger.info(f"Processing question: {question}")
-        answer = assistant.answer_question(question, book_data)
+        answer = await assistant.answer_question_async(question, book_data)
         return {"answer": answer}
         
     except Exception as e:
         logger.error(f"Error processing question: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ask/stream")
+async def ask_question_stream(
+    question: str,
+    book_id: Optional[str] = None,
+    user: str = Depends(get_current_user)
+):
+    """
+    Ответ на вопрос потоком Server-Sent Events: сначала metadata (найденные фрагменты),
+    затем token по мере генерации и done со статистикой (или error)
+    """
+    book_data = await get_book(user, book_id)
+    
+    logger.info(f"Processing question (stream): {question}")
+    return sse_response(assistant.stream_answer(question, book_data))
+
+class BatchQuestions(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUESTIONS)
+    book_id: Optional[str] = None
+    stream: bool = False  # true: ответы потоком SSE по мере готовности
+
+@app.post("/ask/batch")
+async def ask_batch(batch: BatchQuestions, user: str = Depends(get_current_user)):
+    """
+    Ответы на список вопросов по книге: все вопросы векторизуются одним запросом,
+    поиск - одним матричным произведением, ответы генерируются параллельно.
+    С stream=true ответы приходят событиями answer по мере готовности, затем done
+    """
+    book_data = await get_book(user, batch.book_id)
+    
+    logger.info(f"Processing batch of {len(batch.questions)} questions")
+    events = assistant.answer_batch(batch.questions, book_data)
+    if batch.stream:
+        return sse_response(events)
+    
+    answers = [None] * len(batch.questions)
+    async for event in events:
+        if event['type'] == 'error':
+            raise HTTPException(status_code=500, detail=event['message'])
+        if event['type'] == 'answer':
+            answers[event.pop('index')] = {k: v for k, v in event.items() if k != 'type'}
+        elif event['type'] == 'done':
+            stats = {k: v for k, v in event.items() if k != 'type'}
+    return {"answers": answers, "stats": stats}
+
+@app.get("/books")
+async def list_books(user: str = Depends(get_current_user)):
+    """Книги пользователя в реестре, последние использованные первыми"""
+    return JSONResponse({"books": book_registry.list(user)})
+
 @app.get("/check_book_loaded")
 async def check_book_loaded(user: str = Depends(get_current_user)):
-    book_data = getattr(app.state, 'book_data', None)
-    return JSONResponse({'book_loaded': book_data is not None})
+    books = book_registry.list(user)
+    response_data = {'book_loaded': bool(books)}
+    if books:
+        response_data['book_id'] = books[0]['book_id']
+        if books[0]['loaded']:
+            response_data['features'] = book_registry.get(user, books[0]['book_id']).get_feature_status()
+    return JSONResponse(response_data)
+
+def websocket_user(websocket: WebSocket) -> Optional[str]:
+    """Пользователь WebSocket-соединения: из сессии или заголовка Basic auth"""
+    if "session" in websocket.scope and websocket.session.get("user"):
+        return websocket.session["user"]
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("basic "):
+        try:
+            username, _, password = base64.b64decode(authorization[6:]).decode().partition(":")
+        except Exception:
+            return None
+        if verify_password(USERS, username, password):
+            return username
+    return None
 
 # WebSocket endpoint
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await ws_manager.connect(websocket)  # Используем WebSocketManager
+async def websocket_endpoint(websocket: WebSocket, job_id: Optional[str] = None):
+    # Канал задания (?job_id=...) или канал пользователя; без пользователя - общий канал
+    user = websocket_user(websocket)
+    if job_id:
+        # Прогресс задания - только его владельцу
+        job = await asyncio.to_thread(job_manager.get, job_id) if user else None
+        if job is None or job.info.get('user') != user:
+            await websocket.close(code=1008)  # Policy violation: до accept клиент получает 403
+            return
+        channel = f"job:{job_id}"
+    else:
+        channel = f"user:{user}" if user else "broadcast"
+    await ws_manager.connect(websocket, channel)  # Используем WebSocketManager
     try:
         while True:
             data = await websocket.receive_text()
     except WebSocketDisconnect:
-        await ws_manager.disconnect(websocket)
+        await ws_manager.disconnect(websocket, channel)
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
-        await ws_manager.disconnect(websocket)
+        await ws_manager.disconnect(websocket, channel)
 
 @app.get("/login")
 async def login_page(request: Request):
@@ -226,7 +381,7 @@ async def login(
     username: str = Form(...),
     password: str = Form(...)
 ):
-    if username in USERS and USERS[username] == password:
+    if verify_password(USERS, username, password):
         # Устанавливаем сессию
         request.session["user"] = username
         return RedirectResponse(url="/", status_code=302)
@@ -237,10 +392,34 @@ async def login(
         status_code=401
     )
 
+# Ограничение нагрузки: лишние запросы ждут в ограниченной очереди, затем 429/503 с Retry-After
+# (добавляется первым, т.е. выполняется последним: место в очереди получают только запросы,
+# прошедшие проверку размера, CORS и аутентификацию)
+app.add_middleware(AdmissionMiddleware, limiters=[("/ask", query_limiter), ("/upload", ingest_limiter)])
+
+# Добавляем middleware аутентификации с публичными путями
+# (добавляется до SessionMiddleware, чтобы выполняться после него и видеть сессию)
+app.add_middleware(
+    AuthMiddleware,
+    public_paths=[
+        "/login",
+        "/static",
+        "/docs",
+        "/openapi.json",
+        "/health",
+        "/",  # Временно оставляем корневой путь публичным (только сам корень)
+        "/ws"  # WebSocket тоже публичный
+    ],
+    users=USERS
+)
+
 # Добавляем сессии (пере auth middleware!)
+# Ключ общий для всех воркеров, иначе сессия с одного воркера не принимается другим
+if not SESSION_SECRET_KEY:
+    logger.warning("SESSION_SECRET_KEY is not set: sessions are only valid in this worker process")
 app.add_middleware(
     SessionMiddleware,
-    secret_key=secrets.token_urlsafe(32),  # Генерируем случайный ключ
+    secret_key=SESSION_SECRET_KEY or secrets.token_urlsafe(32),  # Без ключа в конфигурации - случайный
     session_cookie="book_assistant_session"
 )
 
@@ -253,19 +432,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Добавляем middleware аутентификации с публичными путями
-app.add_middleware(
-    AuthMiddleware,
-    public_paths=[
-        "/login",
-        "/static",
-        "/docs",
-        "/openapi.json",
-        "/health",
-        "/",  # Временно оставляем корневой путь публичным
-        "/ws"  # WebSocket тоже публичный
-    ]
-)
+# Отклоняем слишком большие загрузки до чтения тела запроса
+app.add_middleware(ContentLengthLimitMiddleware, paths=["/upload"])
+
 
 @app.get("/")
 async def home():
@@ -1,14 +1,27 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+import os
 from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from .middleware import verify_password
 
-oauth2_scheme = OAuth2PasswordBearer(
-    tokenUrl="token",
-    auto_error=False
-)
+security = HTTPBasic(auto_error=False)
+USERS = {
+    'admin': os.environ.get('ADMIN_PASSWORD', 'admin1q2w3e'),
+    'tester1': os.environ.get('TESTER_PASSWORD', '41dsf3qw7sDa')
+}
 
-async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)):
-    if not token:
-        return None
-    # Здесь логика проверки токена
-    return token 
\ No newline at end of file
+async def get_current_user(
+    request: Request,
+    credentials: Optional[HTTPBasicCredentials] = Depends(security)
+) -> str:
+    """Пользователь запроса: из сессии (после /login) или проверенного заголовка Basic auth"""
+    session = request.scope.get("session")
+    if session and session.get("user"):
+        return session["user"]
+    if credentials is not None and verify_password(USERS, credentials.username, credentials.password):
+        return credentials.username
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid credentials",
+        headers={"WWW-Authenticate": "Basic"},
+    )
@@ -1,55 +1,127 @@
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
-from scipy import stats
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import List, Optional
+import base64
+import binascii
+import hashlib
+import hmac
 import logging
+from functools import lru_cache
+from typing import Callable, Iterable, List, Mapping, Optional
 from starlette import status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
-class AuthMiddleware(BaseHTTPMiddleware):
+CREDENTIAL_CACHE_SIZE = 1024  # Authorization headers whose check result is kept
+
+
+def verify_password(users: Mapping[str, str], username: str, password: str) -> bool:
+    """
+    Check a username and password in constant time.
+
+    Unknown users are compared against a dummy password, so the time taken
+    does not tell whether a username exists.
+    """
+    expected = users.get(username)
+    # Digests have a fixed length, so the comparison time does not depend on the password either
+    matches = hmac.compare_digest(
+        hashlib.sha256((expected or "").encode()).digest(), hashlib.sha256(password.encode()).digest()
+    )
+    return matches and expected is not None
+
+
+class PublicPathMatcher:
+    """
+    Precomputed matcher of public paths.
+
+    A path is public if it equals an entry or starts with it. The root '/'
+    only matches itself: as a prefix it would make every path public.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        paths = list(paths)
+        self.exact = frozenset(paths)
+        self.prefixes = tuple(path for path in paths if path != "/")
+
+    def __call__(self, path: str) -> bool:
+        return path in self.exact or path.startswith(self.prefixes)
+
+
+class AuthMiddleware:
+    """
+    Pure ASGI authentication middleware.
+
+    Requests to public paths pass through. Other HTTP requests need a session
+    user (set by SessionMiddleware, which must run before this middleware), a
+    valid Basic authorization or a Bearer token accepted by token_verifier.
+    Any other scheme, and Bearer tokens without a verifier, get 401.
+    Basic credentials are verified in constant time and the result is cached
+    per header value, so repeated requests do not decode and compare them
+    again. WebSocket connections authenticate in their endpoint.
+    """
+
     def __init__(
-        self, 
-        app,
+        self,
+        app: ASGIApp,
         public_paths: Optional[List[str]] = None,
+        users: Optional[Mapping[str, str]] = None,
+        token_verifier: Optional[Callable[[str], bool]] = None,
         debug: bool = False
     ):
-        super().__init__(app)
+        """
+        Args:
+            public_paths: Paths (and path prefixes) open without authentication
+            users: Username -> password for Basic authorization (None: Basic is refused)
+            token_verifier: Checks a Bearer token (None: Bearer is refused)
+        """
+        self.app = app
         self.public_paths = public_paths or []
+        self.is_public = PublicPathMatcher(self.public_paths)
+        self.users = users
+        self.token_verifier = token_verifier
         self.debug = debug
-        
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        
-        # Проверяем публичные пути
-        if self._is_public_path(path):
-            if self.debug:
-                logger.debug(f"Public path accessed: {path}")
-            return await call_next(request)
-            
-        # Проверяем токен
-        token = request.headers.get('Authorization')
-        if not token and not self._check_session(request):
+        self._check_basic = lru_cache(maxsize=CREDENTIAL_CACHE_SIZE)(self._verify_basic)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.is_public(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._authenticated(scope):
             if self.debug:
-                logger.debug(f"Authentication required for path: {path}")
-            return self._handle_unauthorized()
-            
-        return await call_next(request)
-    
-    def _is_public_path(self, path: str) -> bool:
-        return any(
-            path.startswith(public_path) 
-            for public_path in self.public_paths
-        )
-    
-    def _check_session(self, request: Request) -> bool:
-        # Проверка сессии если используется
-        return bool(request.session.get("user")) if hasattr(request, "session") else False
-    
+                logger.debug(f"Authentication required for path: {scope['path']}")
+            await self._handle_unauthorized()(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    def _authenticated(self, scope: Scope) -> bool:
+        session = scope.get("session")
+        if session and session.get("user"):
+            return True
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                return self._check_authorization(value)
+        return False
+
+    def _check_authorization(self, value: bytes) -> bool:
+        scheme, _, credentials = value.partition(b" ")
+        scheme = scheme.lower()
+        if scheme == b"basic" and self.users is not None:
+            return self._check_basic(credentials)
+        if scheme == b"bearer" and self.token_verifier is not None and credentials:
+            return self.token_verifier(credentials.decode("latin-1"))
+        return False
+
+    def _verify_basic(self, credentials: bytes) -> bool:
+        try:
+            username, _, password = base64.b64decode(credentials, validate=True).decode().partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            return False
+        return verify_password(self.users, username, password)
+
     def _handle_unauthorized(self):
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
             content={"detail": "Not authenticated"},
-            headers={"WWW-Authenticate": "Bearer"}
+            headers={"WWW-Authenticate": "Basic" if self.users is not None or self.token_verifier is None else "Bearer"}
         )
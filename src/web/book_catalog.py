@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.config import BOOK_CATALOG_DIR, CATALOG_POLL_INTERVAL
+from src.utils.logger import get_main_logger
+
+logger = get_main_logger()
+
+CatalogListener = Callable[[List[Dict[str, Any]]], None]
+
+
+class BookCatalog:
+    """
+    Ingested books of all users, shared on disk by the workers of the app.
+
+    The worker that ingests a book publishes one small JSON entry for it
+    (owner, book ID, library snapshot key). Every worker watches the catalog
+    directory and registers entries it has not seen yet, so a book uploaded
+    through one worker can be asked about through any other; its data is
+    loaded from the library (memory-mapped index) on first use.
+
+    Entries are replaced atomically, each write gives the file a new inode, so
+    the watcher finds changes by comparing (inode, mtime) of the entry files.
+    """
+
+    def __init__(self, catalog_dir: str = BOOK_CATALOG_DIR, poll_interval: float = CATALOG_POLL_INTERVAL):
+        self.catalog_dir = catalog_dir
+        self.poll_interval = poll_interval
+        os.makedirs(catalog_dir, exist_ok=True)
+        self._seen: Dict[str, Tuple[int, int]] = {}  # Entry file -> (inode, mtime) when last read
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _entry_path(self, owner: str, book_id: str) -> str:
+        name = hashlib.sha256(f"{owner}\0{book_id}".encode('utf-8')).hexdigest()
+        return os.path.join(self.catalog_dir, f"{name}.json")
+
+    def publish(self, owner: str, book_id: str, snapshot_key: str) -> None:
+        """Add or replace the entry of a book whose library snapshot is stored."""
+        entry = {'owner': owner, 'book_id': book_id, 'snapshot_key': snapshot_key, 'updated_at': time.time()}
+        path = self._entry_path(owner, book_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Book {book_id} of {owner} published to the catalog")
+
+    def remove(self, owner: str, book_id: str) -> bool:
+        path = self._entry_path(owner, book_id)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """All entries, oldest first."""
+        return self._sorted([entry for entry in map(self._read, self._entry_files()) if entry is not None])
+
+    def changes(self) -> List[Dict[str, Any]]:
+        """Entries added or replaced since the previous call (all entries on the first call), oldest first."""
+        changed = []
+        current = {}
+        for path in self._entry_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Removed meanwhile
+            signature = (stat.st_ino, stat.st_mtime_ns)
+            current[path] = signature
+            if self._seen.get(path) != signature:
+                entry = self._read(path)
+                if entry is not None:
+                    changed.append(entry)
+        self._seen = current
+        return self._sorted(changed)
+
+    def watch(self, listener: CatalogListener) -> None:
+        """
+        Report the current entries to listener, then keep reporting changed
+        entries from a background thread until stop().
+        """
+        self._notify(listener)
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, args=(listener,), name="book-catalog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.poll_interval + 1)
+
+    def _poll(self, listener: CatalogListener) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self._notify(listener)
+
+    def _notify(self, listener: CatalogListener) -> None:
+        try:
+            changed = self.changes()
+            if changed:
+                listener(changed)
+        except Exception as e:
+            logger.error(f"Error processing book catalog changes: {str(e)}")
+
+    def _entry_files(self) -> List[str]:
+        with os.scandir(self.catalog_dir) as it:
+            return [entry.path for entry in it if entry.name.endswith('.json')]
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading catalog entry {path}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _sorted(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return sorted(entries, key=lambda entry: entry.get('updated_at', 0))
@@ -0,0 +1,242 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.config import BOOK_REGISTRY_MEMORY_MB
+from src.book_data_interface import BookDataInterface
+from src.book_library import BookLibrary
+from src.embedding import EmbeddingService
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+FLOAT_OBJECT_SIZE = sys.getsizeof(0.0)  # A Python float inside an embedding list
+
+
+def book_memory_size(book_data: BookDataInterface) -> int:
+    """Measured memory footprint of a book's chunks and embeddings (unless memory-mapped), in bytes."""
+    size = sum(sys.getsizeof(chunk) for chunk in book_data.get_chunks())
+    embeddings = book_data.get_embeddings()
+    if isinstance(embeddings, np.memmap):
+        return size  # Mapped index: pages belong to the shared OS page cache, not to this process
+    if isinstance(embeddings, np.ndarray):
+        return size + embeddings.nbytes
+    size += sys.getsizeof(embeddings)
+    for embedding in embeddings:
+        if isinstance(embedding, np.ndarray):
+            size += embedding.nbytes
+        else:
+            size += sys.getsizeof(embedding) + FLOAT_OBJECT_SIZE * len(embedding)
+    return size
+
+
+@dataclass
+class RegistryEntry:
+    """A book known to the registry; book_data is None while it is evicted."""
+    owner: str
+    book_id: str
+    snapshot_key: Optional[str] = None
+    book_data: Optional[BookDataInterface] = None
+    size: int = 0
+    last_used: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'book_id': self.book_id,
+            'loaded': self.book_data is not None,
+            'size_bytes': self.size,
+            'last_used': self.last_used
+        }
+
+
+class BookRegistry:
+    """
+    Loaded books of all users, keyed by (owner, book ID), within a memory budget.
+
+    When the loaded books exceed the budget, the least recently used ones are
+    evicted from memory. Their library snapshot (see BookLibrary) is kept, so an
+    evicted book is reloaded on its next use.
+    """
+
+    def __init__(self,
+                 library: Optional[BookLibrary],
+                 embedding_service: Optional[EmbeddingService] = None,
+                 memory_budget: int = BOOK_REGISTRY_MEMORY_MB * 1024 * 1024,
+                 metrics: MetricsCollector = default_metrics):
+        """
+        Args:
+            library: Where evicted books are reloaded from (None: evicted books are dropped)
+            embedding_service: Attached to reloaded books
+            memory_budget: Bytes of chunks and embeddings kept loaded
+        """
+        self.library = library
+        self.embedding_service = embedding_service
+        self.memory_budget = memory_budget
+        self.metrics = metrics
+        self._entries: "OrderedDict[Tuple[str, str], RegistryEntry]" = OrderedDict()  # Least recently used first
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def put(self, owner: str, book_id: str, book_data: BookDataInterface, snapshot_key: Optional[str] = None) -> None:
+        """Register a processed book (replacing an earlier version with the same ID)."""
+        size = book_memory_size(book_data)
+        with self._lock:
+            old = self._entries.pop((owner, book_id), None)
+            if old is not None and old.book_data is not None:
+                self._loaded_bytes -= old.size
+            self._entries[(owner, book_id)] = RegistryEntry(owner, book_id, snapshot_key, book_data, size)
+            self._loaded_bytes += size
+            evicted = self._evict(keep=(owner, book_id))
+            self._update_gauges()
+        self._persist(evicted)
+        logger.info(f"Book {book_id} of {owner} registered ({size / 1024 / 1024:.1f} MB)")
+
+    def register(self, owner: str, book_id: str, snapshot_key: str, updated_at: Optional[float] = None) -> bool:
+        """
+        Make a book persisted by another worker known here without loading it.
+
+        It is loaded from its snapshot on first use. A newer snapshot replaces the
+        known one (and unloads its stale data). Returns whether anything changed.
+        """
+        with self._lock:
+            entry = self._entries.get((owner, book_id))
+            if entry is not None and entry.snapshot_key == snapshot_key:
+                return False
+            if entry is not None and entry.book_data is not None:
+                self._loaded_bytes -= entry.size
+            last_used = updated_at if updated_at is not None else time.time()
+            self._entries[(owner, book_id)] = RegistryEntry(owner, book_id, snapshot_key, last_used=last_used)
+            self._entries.move_to_end((owner, book_id))
+            self._update_gauges()
+        logger.info(f"Book {book_id} of {owner} registered from the catalog ({snapshot_key})")
+        return True
+
+    def get(self, owner: str, book_id: Optional[str] = None) -> BookDataInterface:
+        """
+        Return a book, reloading it from its snapshot if it was evicted.
+
+        Without book_id the owner's most recently used book is returned.
+
+        Raises:
+            KeyError: The owner has no such book, or it cannot be reloaded
+        """
+        with self._lock:
+            key = (owner, book_id) if book_id else self._latest_key(owner)
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                raise KeyError(f"Book {book_id} not found" if book_id else "No book data loaded")
+            self._touch(key, entry)
+            if entry.book_data is not None:
+                self.metrics.increment_counter("registry_hits")
+                return entry.book_data
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Loading happens outside the registry lock; concurrent requests for the book wait for one load
+        with load_lock:
+            book_data = entry.book_data
+            if book_data is None:
+                book_data = self._reload(key, entry)
+        return book_data
+
+    def list(self, owner: str) -> List[Dict[str, Any]]:
+        """The owner's books, most recently used first."""
+        with self._lock:
+            return [entry.to_dict() for (o, _), entry in reversed(self._entries.items()) if o == owner]
+
+    def remove(self, owner: str, book_id: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop((owner, book_id), None)
+            if entry is not None and entry.book_data is not None:
+                self._loaded_bytes -= entry.size
+            self._load_locks.pop((owner, book_id), None)
+            self._update_gauges()
+        return entry is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'books': len(self._entries),
+                'loaded_books': sum(1 for entry in self._entries.values() if entry.book_data is not None),
+                'loaded_bytes': self._loaded_bytes,
+                'memory_budget': self.memory_budget
+            }
+
+    def _latest_key(self, owner: str) -> Optional[Tuple[str, str]]:
+        for key in reversed(self._entries):
+            if key[0] == owner:
+                return key
+        return None
+
+    def _touch(self, key: Tuple[str, str], entry: RegistryEntry) -> None:
+        entry.last_used = time.time()
+        self._entries.move_to_end(key)
+
+    def _reload(self, key: Tuple[str, str], entry: RegistryEntry) -> BookDataInterface:
+        """Load an evicted book from the library (called with its load lock held)."""
+        start = time.perf_counter()
+        book_data = self.library.get(entry.snapshot_key, self.embedding_service) \
+            if self.library is not None and entry.snapshot_key else None
+        if book_data is None:
+            with self._lock:
+                if self._entries.get(key) is entry:  # Not replaced by a put() meanwhile
+                    del self._entries[key]
+            raise KeyError(f"Book {entry.book_id} was evicted and its snapshot is not available")
+
+        size = book_memory_size(book_data)
+        evicted = []
+        with self._lock:
+            entry.book_data, entry.size = book_data, size
+            if self._entries.get(key) is entry:  # A replaced entry is no longer counted
+                self._loaded_bytes += size
+                evicted = self._evict(keep=key)
+                self._update_gauges()
+        self._persist(evicted)
+        self.metrics.increment_counter("registry_reloads")
+        rag_logger.info(
+            f"\nBook Registry:\n"
+            f"Reloaded: {entry.book_id} ({entry.owner})\n"
+            f"Size: {size / 1024 / 1024:.1f} MB\n"
+            f"Load time: {time.perf_counter() - start:.3f}s\n"
+            f"{'-'*50}"
+        )
+        return book_data
+
+    def _evict(self, keep: Tuple[str, str]) -> List[Tuple[RegistryEntry, BookDataInterface]]:
+        """
+        Unload least recently used books until the budget is met (called with the lock held).
+
+        Returns the evicted books to persist with _persist() once the lock is released.
+        """
+        evicted = []
+        for key, entry in list(self._entries.items()):
+            if self._loaded_bytes <= self.memory_budget:
+                break
+            if key == keep or entry.book_data is None:
+                continue
+            book_data, entry.book_data = entry.book_data, None
+            self._loaded_bytes -= entry.size
+            self.metrics.increment_counter("registry_evictions")
+
+            if self.library is None or not entry.snapshot_key:
+                del self._entries[key]  # Nothing to reload it from
+                logger.warning(f"Book {entry.book_id} of {entry.owner} evicted without a snapshot")
+                continue
+            evicted.append((entry, book_data))
+            logger.info(f"Book {entry.book_id} of {entry.owner} evicted ({entry.size / 1024 / 1024:.1f} MB)")
+        return evicted
+
+    def _persist(self, evicted: List[Tuple[RegistryEntry, BookDataInterface]]) -> None:
+        """Save snapshots of evicted books missing from the library (disk I/O, outside the registry lock)."""
+        for entry, book_data in evicted:
+            if self.library.get_entry(entry.snapshot_key) is None:
+                self.library.put(entry.snapshot_key, book_data, wait=False)  # Persist before it can be reloaded
+
+    def _update_gauges(self) -> None:
+        self.metrics.set_gauge("registry_loaded_bytes", self._loaded_bytes)
+        self.metrics.set_gauge("registry_loaded_books", sum(1 for e in self._entries.values() if e.book_data is not None))
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from src.config import INGEST_JOB_WORKERS, JOB_HISTORY_LIMIT
+from src.utils.metrics import MetricsCollector, default_metrics
+from src.utils.logger import get_main_logger, get_rag_logger
+
+logger = get_main_logger()
+rag_logger = get_rag_logger()
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+ProgressCallback = Callable[[str, int, int], None]
+
+
+@dataclass
+class Job:
+    """State of one background job, as reported by /jobs/{id}."""
+    id: str
+    kind: str
+    info: Dict[str, Any] = field(default_factory=dict)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Dict[str, Any] = field(default_factory=lambda: {'status': 'Queued', 'current': 0, 'total': 0, 'progress': 0.0})
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        """Seconds spent waiting for a worker and running (so far, if not finished)."""
+        now = time.time()
+        queued_until = self.started_at or (self.finished_at or now)
+        return {
+            'queued_seconds': round(queued_until - self.created_at, 3),
+            'run_seconds': round((self.finished_at or now) - self.started_at, 3) if self.started_at else None
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'info': self.info,
+            'progress': dict(self.progress),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'timings': self.timings(),
+            'result': self.result,
+            'error': self.error
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Job':
+        return cls(id=data['job_id'], **{name: data[name] for name in (
+            'kind', 'info', 'status', 'created_at', 'started_at', 'finished_at', 'progress', 'result', 'error')})
+
+
+class JobManager:
+    """
+    Runs long tasks (book ingest) in a worker thread pool, off the event loop.
+
+    submit() returns at once with a Job whose status, progress, timings and
+    result or error are updated by the worker. Finished jobs are kept for
+    lookup up to history_limit, oldest dropped first.
+
+    With a state_dir, job states are also written there (on status changes and
+    at most once a second on progress), so any worker of the app sharing the
+    directory can report a job that runs in another one.
+    """
+
+    def __init__(self,
+                 max_workers: int = INGEST_JOB_WORKERS,
+                 history_limit: int = JOB_HISTORY_LIMIT,
+                 metrics: MetricsCollector = default_metrics,
+                 on_progress: Optional[Callable[[Job], None]] = None,
+                 state_dir: Optional[str] = None):
+        """
+        Args:
+            max_workers: Jobs running at the same time
+            history_limit: Jobs kept for lookup
+            metrics: Collector for job counts and timings
+            on_progress: Called (in the worker thread) with the job after each progress update
+            state_dir: Directory of job states shared between processes (None: kept in memory only)
+        """
+        self.max_workers = max_workers
+        self.history_limit = history_limit
+        self.metrics = metrics
+        self.on_progress = on_progress
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.state_dir = state_dir
+        self._saved_at: Dict[str, float] = {}  # Job ID -> time its state was last written
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created on first use, so a manager that was shut down can be started again
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor
+
+    def submit(self, fn: Callable[[ProgressCallback], Optional[Dict[str, Any]]],
+               kind: str = 'ingest', **info: Any) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            fn: Work to run in a worker thread; called with a progress callback
+                (status, current, total) and returns the job result
+            kind: Job type shown in the status
+            **info: Extra fields shown in the status (e.g. the file name)
+        """
+        job = Job(id=uuid.uuid4().hex, kind=kind, info=info)
+        with self._lock:
+            executor = self._get_executor()
+            self._jobs[job.id] = job
+            self._prune()
+        self._save(job)
+        executor.submit(self._run, job, fn)
+        self.metrics.increment_counter(f"jobs_{kind}_submitted")
+        logger.info(f"Job {job.id} ({kind}) queued: {info}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job of this process, or else one from the shared state directory."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.state_dir:
+            job = self._load(job_id)
+        return job
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending(self, kind: Optional[str] = None) -> int:
+        """Jobs of this process (of one kind, if given) that are queued or running."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done and (kind is None or job.kind == kind))
+
+    def update_progress(self, job: Job, status: str, current: int, total: int) -> None:
+        """Record the progress of a running job."""
+        job.progress = {
+            'status': status,
+            'current': current,
+            'total': total,
+            'progress': round(current / total * 100, 1) if total > 0 else 0.0
+        }
+        if time.time() - self._saved_at.get(job.id, 0) >= 1:
+            self._save(job)
+        if self.on_progress:
+            try:
+                self.on_progress(job)
+            except Exception as e:
+                logger.warning(f"Job progress listener failed: {str(e)}")
+
+    def _run(self, job: Job, fn: Callable[[ProgressCallback], Optional[Dict[str, Any]]]) -> None:
+        job.started_at = time.time()
+        job.status = RUNNING
+        self._save(job)
+        self.metrics.observe_value(f"jobs_{job.kind}_queue_seconds", job.started_at - job.created_at)
+        try:
+            result = fn(lambda status, current, total: self.update_progress(job, status, current, total))
+            job.result = result
+            self.update_progress(job, 'Completed', 1, 1)
+            status = COMPLETED
+        except Exception as e:
+            job.error = str(e)
+            status = FAILED
+            logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}", exc_info=True)
+        job.finished_at = time.time()
+        self._save(job, status=status)  # Saved first: once done here, other workers see it done too
+        job.status = status  # Set last: a job seen as done has all its fields
+        self._saved_at.pop(job.id, None)
+
+        timings = job.timings()
+        self.metrics.increment_counter(f"jobs_{job.kind}_{job.status}")
+        self.metrics.observe_value(f"jobs_{job.kind}_run_seconds", timings['run_seconds'])
+        rag_logger.info(
+            f"\nBackground Job:\n"
+            f"ID: {job.id}\n"
+            f"Kind: {job.kind}\n"
+            f"Status: {job.status}\n"
+            f"Queued: {timings['queued_seconds']:.3f}s\n"
+            f"Run: {timings['run_seconds']:.3f}s\n"
+            f"{'-'*50}"
+        )
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _save(self, job: Job, status: Optional[str] = None) -> None:
+        """Write the job state (with the given status, if any) to the shared directory (if any); errors only logged."""
+        if not self.state_dir:
+            return
+        self._saved_at[job.id] = time.time()
+        path = self._state_path(job.id)
+        state = job.to_dict()
+        if status is not None:
+            state['status'] = status
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Error saving state of job {job.id}: {str(e)}")
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        if not all(c in '0123456789abcdef' for c in job_id):
+            return None  # Not a job ID (and not a path)
+        try:
+            with open(self._state_path(job_id), 'r') as f:
+                return Job.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Error loading state of job {job_id}: {str(e)}")
+            return None
+
+    def _prune(self) -> None:
+        """Drop the oldest finished jobs beyond the history limit (called with the lock held)."""
+        excess = len(self._jobs) - self.history_limit
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:max(excess, 0)]:
+            del self._jobs[job_id]
+            if self.state_dir:
+                try:
+                    os.remove(self._state_path(job_id))
+                except OSError:
+                    pass
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the workers; queued jobs that have not started are cancelled."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
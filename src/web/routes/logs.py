@@ -1,10 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends
 from src.utils.logger import LoggerManager
+from src.utils.log_reader import tail_lines, follow
 from src.web.auth.dependencies import get_current_user
+from src.web.sse import sse_response
+from src.config import LOG_TAIL_MAX_LINES
 import os
 
 router = APIRouter()
 
+LOG_FILES = {'main': 'app.log', 'rag': 'rag_results.log'}
+
+def get_log_path(log_type: str) -> str:
+    if log_type not in LOG_FILES:
+        raise HTTPException(status_code=404, detail=f"Unknown log type: {log_type}")
+    return os.path.join('logs', LOG_FILES[log_type])
+
 @router.get("/logs/{log_type}")
 async def get_logs(
     log_type: str, 
@@ -12,20 +22,37 @@ async def get_logs(
     user: str = Depends(get_current_user)
 ):
     """
-    Получить последние строки логов.
+    Получить последние строки логов (файл читается с конца блоками, а не целиком).
     log_type: 'main' или 'rag'
     lines: количество последних строк
     """
+    log_path = get_log_path(log_type)
     try:
-        log_file = 'app.log' if log_type == 'main' else 'rag_results.log'
-        log_path = os.path.join('logs', log_file)
-        
         if not os.path.exists(log_path):
             return {"logs": []}
             
-        with open(log_path, 'r') as f:
-            all_lines = f.readlines()
-            return {"logs": all_lines[-lines:]}
+        return {"logs": tail_lines(log_path, min(lines, LOG_TAIL_MAX_LINES))}
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/logs/{log_type}/follow")
+async def follow_logs(
+    log_type: str,
+    lines: int = 0,
+    user: str = Depends(get_current_user)
+):
+    """
+    Новые строки лога потоком Server-Sent Events (как tail -f), событие line на строку.
+    lines: сколько последних строк отправить перед новыми
+    """
+    log_path = get_log_path(log_type)
+    
+    async def events():
+        if lines > 0 and os.path.exists(log_path):
+            for line in tail_lines(log_path, min(lines, LOG_TAIL_MAX_LINES)):
+                yield {"type": "line", "line": line.rstrip('\n')}
+        async for line in follow(log_path):
+            yield {"type": "line", "line": line}
+    
+    return sse_response(events())
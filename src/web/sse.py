@@ -0,0 +1,20 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+from starlette.responses import StreamingResponse
+
+# Headers that keep proxies (nginx) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Stream event dicts as SSE; each dict's 'type' becomes the event name."""
+    async def body():
+        async for event in events:
+            yield format_sse(event, event.get('type'))
+    return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -142,6 +142,21 @@ document.addEventListener('DOMContentLoaded', function() {
     // Инициализация WebSocket
     connectWebSocket();
 
+    async function waitForJob(statusUrl, interval = 1000) {
+        while (true) {
+            const response = await fetch(statusUrl);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const job = await response.json();
+            if (job.status === 'completed' || job.status === 'failed') {
+                return job;
+            }
+            progressLabel.textContent = job.progress.status;
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
+    }
+
     // Обработка формы загрузки
     uploadForm.addEventListener('submit', async function(e) {
         e.preventDefault();
@@ -172,12 +187,24 @@ document.addEventListener('DOMContentLoaded', function() {
                 body: formData
             });
             
+            if (response.status === 429 || response.status === 503) {
+                // Сервер перегружен: сообщаем, через сколько повторить
+                const retryAfter = response.headers.get('Retry-After');
+                throw new Error(`Server is busy, please retry in ${retryAfter || 'a few'} seconds`);
+            }
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
             const result = await response.json();
             uploadStatus.textContent = result.message;
+
+            // Книга обрабатывается в фоне: опрашиваем статус задания
+            const job = await waitForJob(result.status_url);
+            if (job.status === 'failed') {
+                throw new Error(job.error);
+            }
+            uploadStatus.textContent = `Book processed: ${job.result.chunks_count} chunks`;
             
         } catch (error) {
             uploadStatus.textContent = `Error: ${error.message}`;
@@ -197,25 +224,30 @@ document.addEventListener('DOMContentLoaded', function() {
         answerStatus.textContent = 'Thinking...';
         copyButton.style.display = 'none';
         
-        try {
-            const response = await fetch(`/ask?question=${encodeURIComponent(question)}`, {
-                method: 'GET'
-            });
-            
-            const result = await response.json();
-            
-            if (response.ok) {
-                currentAnswer = result.answer;
-                answerStatus.innerHTML = marked.parse(result.answer);
-                copyButton.style.display = 'block';
-            } else {
-                answerStatus.textContent = `Error: ${result.detail || 'Failed to get answer'}`;
-                copyButton.style.display = 'none';
-            }
-        } catch (error) {
-            answerStatus.textContent = `Error: ${error.message}`;
+        // Ответ приходит потоком (SSE): текст отображается по мере генерации
+        currentAnswer = '';
+        const source = new EventSource(`/ask/stream?question=${encodeURIComponent(question)}`);
+
+        source.addEventListener('metadata', () => {
+            answerStatus.textContent = 'Generating answer...';
+        });
+
+        source.addEventListener('token', (event) => {
+            currentAnswer += JSON.parse(event.data).content;
+            answerStatus.innerHTML = marked.parse(currentAnswer);
+        });
+
+        source.addEventListener('done', () => {
+            source.close();
+            copyButton.style.display = 'block';
+        });
+
+        source.addEventListener('error', (event) => {
+            source.close();
+            const message = event.data ? JSON.parse(event.data).message : 'Failed to get answer';
+            answerStatus.textContent = `Error: ${message}`;
             copyButton.style.display = 'none';
-        }
+        });
     });
 
     // При отображении ответа
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import shutil
+import uuid
+from concurrent.futures import Future
+from typing import Iterable, Optional, Tuple
+import aiofiles
+from fastapi import UploadFile, HTTPException
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.config import MAX_CONTENT_LENGTH, UPLOAD_CHUNK_SIZE
+from src.utils.logger import get_main_logger
+
+logger = get_main_logger()
+
+
+def make_upload_path(upload_root: str, filename: str) -> str:
+    """
+    Path for an uploaded file in a directory of its own (<root>/<random id>/<name>).
+
+    Uploads with the same file name do not overwrite each other while their
+    ingest jobs read them; only the base name of the client's file name is used.
+    """
+    upload_dir = os.path.join(upload_root, uuid.uuid4().hex)
+    os.makedirs(upload_dir)
+    return os.path.join(upload_dir, os.path.basename(filename))
+
+
+def remove_upload(file_path: str, storage_upload: Optional[Future] = None) -> None:
+    """Remove an upload's directory, once its storage upload (if any) no longer reads the file."""
+    def remove(_=None):
+        shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+    if storage_upload is None:
+        remove()
+    else:
+        storage_upload.add_done_callback(remove)  # Runs at once if the upload is already done
+
+
+async def save_upload(file: UploadFile,
+                      file_path: str,
+                      max_size: int = MAX_CONTENT_LENGTH,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[int, str]:
+    """
+    Copy an uploaded file to disk in fixed-size chunks, hashing it on the way.
+
+    Only one chunk is held in memory at a time, whatever the file size.
+
+    Returns:
+        (size in bytes, SHA-256 hex digest of the content)
+
+    Raises:
+        HTTPException: 413 as soon as the content exceeds max_size
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    async with aiofiles.open(file_path, 'wb') as out_file:
+        while chunk := await file.read(chunk_size):
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File too large. Maximum size: {max_size} bytes"
+                )
+            sha256.update(chunk)
+            await out_file.write(chunk)
+    return size, sha256.hexdigest()
+
+
+class BodyTooLarge(HTTPException):
+    """Raised while receiving a request body that goes past the size limit."""
+
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size: {max_size} bytes"
+        )
+
+
+class ContentLengthLimitMiddleware:
+    """
+    Enforces the size limit of request bodies on the given paths.
+
+    A declared Content-Length over the limit is refused before the body is read.
+    Other bodies (chunked uploads, or a wrong Content-Length) are counted as they
+    are received: the first message past the limit raises BodyTooLarge (413),
+    which stops the multipart parser before the rest is received or spooled to disk.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_CONTENT_LENGTH, paths: Iterable[str] = ("/upload",)):
+        self.app = app
+        self.max_size = max_size
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_size:
+                logger.warning(f"Request to {scope['path']} rejected: {int(value)} bytes > {self.max_size}")
+                await self._reject(scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    logger.warning(f"Request to {scope['path']} rejected after {received} bytes > {self.max_size}")
+                    raise BodyTooLarge(self.max_size)
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except BodyTooLarge:
+            # Normally turned into a 413 response by the app's exception handling; this covers apps without it
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": f"File too large. Maximum size: {self.max_size} bytes"}
+        )
+        await response(scope, receive, send)
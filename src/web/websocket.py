@@ -1,26 +1,60 @@
 from fastapi import WebSocket
+import asyncio
 import logging
-from typing import List, Dict, Any
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+from src.config import WS_SEND_TIMEOUT, WS_PROGRESS_MAX_RATE
+
 
 class WebSocketManager:
-    def __init__(self, timeout: int = 300):
-        self.active_connections: List[WebSocket] = []
+    """
+    Progress channels over WebSocket.
+
+    Sockets subscribe to a channel (e.g. 'job:<id>' or 'user:<name>'). Events
+    go to the sockets of one channel (or all, without a channel) concurrently,
+    each send bounded by send_timeout, so one slow client cannot hold up the
+    others. Progress events of a channel are throttled to max_rate per second:
+    intermediate updates are coalesced and only the latest one is sent.
+
+    publish() may be called from any thread (ingest workers); it hands the event
+    to the event loop bound with bind_loop() and never blocks the caller.
+    """
+
+    def __init__(self, timeout: int = 300, send_timeout: float = WS_SEND_TIMEOUT,
+                 max_rate: float = WS_PROGRESS_MAX_RATE):
+        self.active_connections: Dict[str, List[WebSocket]] = {}
         self.logger = logging.getLogger(__name__)
         self.timeout = timeout
+        self.send_timeout = send_timeout
+        self.min_interval = 1 / max_rate if max_rate > 0 else 0.0
+        self._last_sent: Dict[str, float] = {}  # Channel -> time of the last progress event
+        self._pending: Dict[str, Dict[str, Any]] = {}  # Channel -> latest throttled progress event
+        self._scheduled: Set[str] = set()  # Channels with a delayed flush
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()  # Keeps publish() tasks referenced until they finish
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, client_id: str = "broadcast"):
         await websocket.accept()
-        self.active_connections.append(websocket)
-        self.logger.info(f"New WebSocket connection. Active connections: {len(self.active_connections)}")
+        self.active_connections.setdefault(client_id, []).append(websocket)
+        self.logger.info(f"New WebSocket connection on {client_id}. Active connections: {self.connection_count()}")
 
-    async def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            self.logger.info(f"WebSocket disconnected. Remaining connections: {len(self.active_connections)}")
+    async def disconnect(self, websocket: WebSocket, client_id: Optional[str] = None):
+        channels = [client_id] if client_id is not None else list(self.active_connections)
+        for channel in channels:
+            connections = self.active_connections.get(channel, [])
+            if websocket in connections:
+                connections.remove(websocket)
+                if not connections:
+                    del self.active_connections[channel]
+                self.logger.info(f"WebSocket disconnected from {channel}. Remaining connections: {self.connection_count()}")
 
-    async def emit_progress(self, status: str = "", current: int = 0, total: int = 100):
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.active_connections.values())
+
+    async def emit_progress(self, status: str = "", current: int = 0, total: int = 100,
+                            client_id: Optional[str] = None):
         """
-        Отправляет обновление прогресса через WebSocket
+        Отправляет обновление прогресса через WebSocket (в канал client_id или всем)
         """
         data = {
             "type": "progress",
@@ -29,10 +63,80 @@ class WebSocketManager:
             "current": current,
             "total": total
         }
-        
-        for connection in self.active_connections:
+        await self.send(data, client_id)
+
+    async def send(self, data: Dict[str, Any], client_id: Optional[str] = None):
+        """Send one event to a channel (all channels if None) concurrently, with per-send timeouts."""
+        targets = [
+            (channel, connection)
+            for channel, connections in self.active_connections.items()
+            if client_id is None or channel == client_id
+            for connection in list(connections)
+        ]
+        if not targets:
+            return
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send_json(data), self.send_timeout) for _, connection in targets),
+            return_exceptions=True
+        )
+        for (channel, connection), result in zip(targets, results):
+            if isinstance(result, asyncio.TimeoutError):
+                # A slow client misses this event but stays connected
+                self.logger.warning(f"WebSocket send on {channel} timed out after {self.send_timeout}s")
+            elif isinstance(result, Exception):
+                self.logger.error(f"Error sending WebSocket message: {str(result)}")
+                await self.disconnect(connection, channel)
+
+    async def emit_throttled(self, channel: str, status: str, current: int, total: int):
+        """
+        Emit progress to a channel at most max_rate times per second.
+
+        Updates arriving faster replace the pending one, which is sent once the
+        interval has passed, so the latest (and the final) update is never lost.
+        """
+        self._pending[channel] = {"status": status, "current": current, "total": total}
+        if channel in self._scheduled:
+            return  # The scheduled flush will send this update
+        wait = self._last_sent.get(channel, float('-inf')) + self.min_interval - time.monotonic()
+        if wait > 0:
+            self._scheduled.add(channel)
             try:
-                await connection.send_json(data)
-            except Exception as e:
-                self.logger.error(f"Error sending WebSocket message: {str(e)}")
-                await self.disconnect(connection)
\ No newline at end of file
+                await asyncio.sleep(wait)
+            finally:
+                self._scheduled.discard(channel)
+        await self._flush(channel)
+
+    async def _flush(self, channel: str):
+        event = self._pending.pop(channel, None)
+        if event is None:
+            return
+        if event["current"] >= event["total"]:
+            self._last_sent.pop(channel, None)  # The channel is finished
+        else:
+            self._last_sent[channel] = time.monotonic()
+        await self.emit_progress(**event, client_id=channel)
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Set the event loop that publish() hands events to (call at application startup)."""
+        self._loop = loop
+
+    def publish(self, channel: str, status: str, current: int, total: int):
+        """Thread-safe, non-blocking progress report for a channel (see emit_throttled)."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        def schedule():
+            task = loop.create_task(self.emit_throttled(channel, status, current, total))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        try:
+            loop.call_soon_threadsafe(schedule)
+        except RuntimeError:
+            pass  # The loop was closed in the meantime (shutdown)
+
+    def progress_callback(self, *channels: str) -> Callable[[str, int, int], None]:
+        """A thread-safe (status, current, total) callback publishing to the given channels."""
+        def callback(status: str, current: int, total: int):
+            for channel in channels:
+                self.publish(channel, status, current, total)
+        return callback
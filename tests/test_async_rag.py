@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+import numpy as np
+import pytest
+from src.config import EMBEDDING_DIMENSION
+from src.embedding import EmbeddingService, cosine_similarity
+from src import rag
+from src.rag import arag_query, astream_rag_query, abatch_rag_query, retrieve
+from src.openai_service import OpenAIService
+from src.utils.metrics import MetricsCollector
+from src.web.sse import format_sse
+from src.search import CosineSearch
+from tests.utils.mock_factory import DictCache, make_book
+
+
+def test_rank_matches_pairwise_cosine():
+    book = make_book()
+    query = np.random.default_rng(1).normal(size=EMBEDDING_DIMENSION).tolist()
+    results = CosineSearch(book, Mock()).rank(query, top_k=5)
+
+    expected = sorted(
+        ((cosine_similarity(query, emb), chunk) for chunk, emb in zip(book.get_chunks(), book.get_embeddings())),
+        reverse=True
+    )[:5]
+    assert [r['chunk'] for r in results] == [chunk for _, chunk in expected]
+    assert [r['score'] for r in results] == pytest.approx([score for score, _ in expected])
+
+
+def test_acreate_embeddings_uses_cache_and_async_client():
+    vector = [0.5] * EMBEDDING_DIMENSION
+    client = Mock()
+    client.embeddings.create = AsyncMock(return_value=SimpleNamespace(data=[SimpleNamespace(embedding=vector)]))
+    cache = DictCache()
+    cache.set("cached", [1.0] * EMBEDDING_DIMENSION)
+    service = EmbeddingService(openai_client=Mock(), cache_manager=cache, async_client=client)
+
+    embeddings = asyncio.run(service.acreate_embeddings(["cached", "new"]))
+
+    assert embeddings == [[1.0] * EMBEDDING_DIMENSION, vector]
+    client.embeddings.create.assert_awaited_once()
+    assert client.embeddings.create.call_args.kwargs["input"] == ["new"]
+    assert cache.get("new") == vector
+
+
+def test_questions_are_answered_concurrently():
+    book = make_book()
+    query_embedding = book.get_embeddings()[3]
+
+    async def embed(texts):
+        await asyncio.sleep(0.05)
+        return [query_embedding for _ in texts]
+
+    async def generate(query, context):
+        await asyncio.sleep(0.2)
+        return f"answer to {query}"
+
+    embedding_service = Mock(acreate_embeddings=embed)
+    openai_service = Mock(agenerate_answer=generate)
+
+    async def ask_all():
+        return await asyncio.gather(*(
+            arag_query(f"q{i}", book, openai_service, embedding_service) for i in range(30)
+        ))
+
+    start = time.perf_counter()
+    answers = asyncio.run(ask_all())
+    elapsed = time.perf_counter() - start
+
+    assert answers == [f"answer to q{i}" for i in range(30)]
+    assert elapsed < 0.25 * 30 / 4  # Far below answering the questions one after another
+
+
+def test_context_is_built_in_the_retrieval_executor(monkeypatch):
+    book = make_book()
+    threads = []
+    build_context = rag.build_context
+
+    def recording_build_context(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return build_context(*args, **kwargs)
+
+    async def embed(texts):
+        return [book.get_embeddings()[0] for _ in texts]
+
+    async def generate(query, context):
+        return "answer"
+
+    monkeypatch.setattr(rag, 'build_context', recording_build_context)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval") as executor:
+        asyncio.run(arag_query("q", book, Mock(agenerate_answer=generate), Mock(acreate_embeddings=embed), executor))
+
+    assert len(threads) == 1 and threads[0].startswith("retrieval")
+
+
+def test_search_scores_the_book_matrix_without_a_copy():
+    book = make_book()
+    embeddings = book.get_embeddings()
+
+    assert isinstance(embeddings, np.ndarray) and embeddings.dtype == np.float64
+    assert book.get_embeddings() is embeddings  # Built once, when the book was created
+    assert CosineSearch(book, Mock()).embeddings is embeddings
+
+
+def test_retrieve_returns_best_chunk_first():
+    book = make_book()
+    results = retrieve(book.get_embeddings()[7], book, Mock(), top_k=3)
+    assert results[0]['chunk'] == "chunk 7"
+    assert results[0]['score'] == pytest.approx(1.0)
+
+
+def collect(events):
+    async def run():
+        return [event async for event in events]
+    return asyncio.run(run())
+
+
+def test_stream_sends_metadata_first_then_tokens():
+    book = make_book()
+
+    async def embed(texts):
+        return [book.get_embeddings()[2] for _ in texts]
+
+    async def stream(query, context):
+        for piece in ["The ", "answer", "."]:
+            await asyncio.sleep(0.01)
+            yield piece
+
+    metrics = MetricsCollector()
+    events = collect(astream_rag_query(
+        "q", book, Mock(astream_answer=stream), Mock(acreate_embeddings=embed), metrics=metrics
+    ))
+
+    assert [e['type'] for e in events] == ['metadata', 'token', 'token', 'token', 'done']
+    assert events[0]['chunks'][0]['preview'] == "chunk 2"
+    assert "".join(e['content'] for e in events if e['type'] == 'token') == "The answer."
+    assert events[-1]['tokens'] == 3
+    assert metrics.get_histogram_stats("answer_ttft_seconds")
+    assert metrics.get_histogram_stats("answer_tokens_per_second")
+
+
+def test_stream_reports_errors_as_event():
+    book = make_book()
+
+    async def embed(texts):
+        return [book.get_embeddings()[0] for _ in texts]
+
+    async def stream(query, context):
+        yield "partial"
+        raise RuntimeError("connection lost")
+
+    events = collect(astream_rag_query(
+        "q", book, Mock(astream_answer=stream), Mock(acreate_embeddings=embed), metrics=MetricsCollector()
+    ))
+    assert [e['type'] for e in events] == ['metadata', 'token', 'error']
+    assert "connection lost" in events[-1]['message']
+
+
+def test_openai_service_streams_deltas():
+    async def completion_stream():
+        for content in ["Hel", None, "lo"]:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+    service = OpenAIService(api_key="test_key")
+    service.async_client = Mock()
+    service.async_client.chat.completions.create = AsyncMock(return_value=completion_stream())
+
+    assert collect(service.astream_answer("q", "context")) == ["Hel", "lo"]
+    assert service.async_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+def test_format_sse():
+    assert format_sse({"content": "привет"}, "token") == 'event: token\ndata: {"content": "привет"}\n\n'
+
+
+def test_rank_many_matches_rank():
+    book = make_book()
+    queries = np.random.default_rng(2).normal(size=(3, EMBEDDING_DIMENSION)).tolist()
+    search = CosineSearch(book, Mock())
+
+    batched = search.rank_many(queries, top_k=4)
+
+    assert len(batched) == 3
+    for query, results in zip(queries, batched):
+        single = search.rank(query, top_k=4)
+        assert [r['chunk'] for r in results] == [r['chunk'] for r in single]
+        assert [r['score'] for r in results] == pytest.approx([r['score'] for r in single])
+
+
+def test_batch_embeds_once_and_generates_concurrently():
+    book = make_book()
+    questions = [f"question {i}" for i in range(10)]
+    embedding_service = Mock()
+    embedding_service.acreate_embeddings = AsyncMock(
+        return_value=np.random.default_rng(3).normal(size=(10, EMBEDDING_DIMENSION)).tolist()
+    )
+    openai_service = Mock()
+
+    async def generate(query, context, raise_errors=False):
+        assert raise_errors  # Failures must surface as 'error', not as an apology answer
+        await asyncio.sleep(0.1 if query == "question 0" else 0.02)  # The first question is the slowest
+        if query == "question 5":
+            raise RuntimeError("upstream error")
+        return f"answer to {query}"
+
+    openai_service.agenerate_answer = generate
+
+    async def run():
+        return [event async for event in abatch_rag_query(questions, book, openai_service, embedding_service)]
+
+    start = time.perf_counter()
+    events = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    embedding_service.acreate_embeddings.assert_awaited_once_with(questions)
+    answers = [event for event in events if event['type'] == 'answer']
+    assert len(answers) == 10
+    assert answers[-1]['index'] == 0  # Streamed in completion order
+    assert answers[-1]['answer'] == "answer to question 0"
+    assert next(a for a in answers if a['index'] == 5)['error'] == "upstream error"
+    assert events[-1]['type'] == 'done' and events[-1]['count'] == 10
+    assert elapsed < 0.5  # About the slowest answer, not the sum of all
+
+
+def test_batch_marks_failed_generation_as_error():
+    embedding_service = Mock()
+    embedding_service.acreate_embeddings = AsyncMock(
+        return_value=np.random.default_rng(4).normal(size=(2, EMBEDDING_DIMENSION)).tolist()
+    )
+    openai_service = OpenAIService(api_key="sk-test")
+    openai_service.async_client = Mock()
+    openai_service.async_client.chat.completions.create = AsyncMock(side_effect=RuntimeError("model overloaded"))
+
+    async def run():
+        return [event async for event in abatch_rag_query(["q1", "q2"], make_book(), openai_service, embedding_service)]
+
+    answers = [event for event in asyncio.run(run()) if event['type'] == 'answer']
+    assert len(answers) == 2
+    assert all('answer' not in a and "model overloaded" in a['error'] for a in answers)
+
+
+def test_batch_reports_embedding_failure():
+    embedding_service = Mock()
+    embedding_service.acreate_embeddings = AsyncMock(side_effect=RuntimeError("rate limited"))
+
+    async def run():
+        return [event async for event in abatch_rag_query(["q"], make_book(), Mock(), embedding_service)]
+
+    events = asyncio.run(run())
+    assert [event['type'] for event in events] == ['error']
+    assert "rate limited" in events[0]['message']
@@ -56,4 +56,45 @@ def test_retry_mechanism(mock_services):
     
     result = factory.create_from_text("Test content")
     assert result is not None
-    assert embedding_service.create_embeddings.call_count == 2
\ No newline at end of file
+    assert embedding_service.create_embeddings.call_count == 2
+
+def test_incremental_ingest_only_stores_changed_chunks(mock_services, tmp_path):
+    from src.manifest_store import ManifestStore
+    embedding_service, vector_store_service = mock_services
+    factory = BookDataFactory(
+        embedding_service=embedding_service,
+        vector_store_service=vector_store_service,
+        manifest_store=ManifestStore(str(tmp_path))
+    )
+    embeddings = [[0.1] * 1536] * 3
+
+    first = factory._store_changed_vectors(["a", "b", "c"], embeddings, "book")
+    assert first['added'] == 3
+
+    vector_store_service.reset_mock()
+    second = factory._store_changed_vectors(["a", "b", "d"], embeddings, "book")
+
+    stored_chunks = vector_store_service.store_vectors.call_args[0][0]
+    assert stored_chunks == ["d"]
+    vector_store_service.delete_vectors.assert_called_once_with([first['chunk_ids'][2]])
+    assert (second['added'], second['removed'], second['unchanged']) == (1, 1, 2)
+
+def test_same_file_name_of_two_owners_keeps_separate_vectors(mock_services, tmp_path):
+    from src.manifest_store import ManifestStore, make_book_id, owner_book_id
+    embedding_service, vector_store_service = mock_services
+    manifest_store = ManifestStore(str(tmp_path))
+    factory = BookDataFactory(
+        embedding_service=embedding_service,
+        vector_store_service=vector_store_service,
+        manifest_store=manifest_store
+    )
+    embeddings = [[0.1] * 1536] * 2
+    book_id = make_book_id("notes.pdf")
+
+    alice = factory._store_changed_vectors(["a", "b"], embeddings, owner_book_id("alice", book_id))
+    bob = factory._store_changed_vectors(["c", "d"], embeddings, owner_book_id("bob", book_id))
+
+    vector_store_service.delete_vectors.assert_not_called()
+    assert bob['removed'] == 0
+    assert not set(alice['chunk_ids']) & set(bob['chunk_ids'])
+    assert manifest_store.get(owner_book_id("alice", book_id))['chunk_ids'] == alice['chunk_ids']
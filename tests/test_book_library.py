@@ -0,0 +1,84 @@
+import threading
+import numpy as np
+from unittest.mock import MagicMock
+from src.book_library import BookLibrary, library_key, processing_config, hash_file
+from src.book_data_interface import BookDataInterface
+from src.book_data_factory import BookDataFactory
+from src.embedding import EmbeddingService
+from src.manifest_store import ManifestStore
+from src.vector_store_service import VectorStoreService
+
+
+def _book_data():
+    return BookDataInterface(
+        chunks=["first chunk", "second chunk"],
+        embeddings=[[0.1, 0.2], [0.3, 0.4]],
+        processed_text={'chunks': ["first chunk", "second chunk"]},
+        embedding_service=None,
+        dates=["1999"],
+        entities=[],
+        key_phrases=["first chunk"],
+        metadata={'book_id': 'book', 'chunk_ids': ['book-a', 'book-b']}
+    )
+
+
+def test_library_key_depends_on_content_and_config():
+    config = processing_config()
+    assert library_key("abc", config) == library_key("abc", dict(config))
+    assert library_key("abc", config) != library_key("abd", config)
+    assert library_key("abc", config) != library_key("abc", {**config, 'chunk_size': 500})
+
+
+def test_hash_file_matches_content(tmp_path):
+    import hashlib
+    path = tmp_path / "book.txt"
+    path.write_bytes(b"content" * 1000)
+    assert hash_file(str(path), block_size=100) == hashlib.sha256(b"content" * 1000).hexdigest()
+
+
+def test_library_roundtrip(tmp_path):
+    library = BookLibrary(str(tmp_path))
+    embedding_service = MagicMock(spec=EmbeddingService)
+    assert library.get("key") is None
+
+    library.put("key", _book_data())
+    restored = library.get("key", embedding_service)
+
+    assert restored.get_chunks() == ["first chunk", "second chunk"]
+    assert np.allclose(restored.get_embeddings(), [[0.1, 0.2], [0.3, 0.4]])
+    assert isinstance(restored.get_embeddings(), np.memmap)  # The index is mapped, not read into memory
+    assert restored.get_dates() == ["1999"]
+    assert library.get_entry("key")['chunk_ids'] == ['book-a', 'book-b']
+
+    assert library.delete("key")
+    assert library.get("key") is None
+
+
+def test_restore_vectors_only_when_index_differs(tmp_path):
+    vector_store_service = MagicMock(spec=VectorStoreService)
+    embedding_service = MagicMock(spec=EmbeddingService)
+    factory = BookDataFactory(embedding_service, vector_store_service, manifest_store=ManifestStore(str(tmp_path)))
+    book_data = _book_data()
+
+    stats = factory.restore_vectors(book_data)
+    book_data.get_metadata()['chunk_ids'] = stats['chunk_ids']
+    assert vector_store_service.store_vectors.call_args[0][0] == ["first chunk", "second chunk"]
+    embedding_service.create_embeddings.assert_not_called()
+
+    vector_store_service.reset_mock()
+    assert factory.restore_vectors(book_data) is None
+    vector_store_service.store_vectors.assert_not_called()
+
+
+def test_when_saved_runs_after_background_put(tmp_path):
+    library = BookLibrary(str(tmp_path))
+    saved = threading.Event()
+    library.put("key", _book_data(), wait=False)
+    library.when_saved("key", lambda key: saved.set())
+
+    assert saved.wait(5)
+    assert library.get_entry("key") is not None
+
+    called = []
+    library.when_saved("key", called.append)  # Nothing pending: called at once
+    assert called == ["key"]
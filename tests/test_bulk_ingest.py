@@ -0,0 +1,97 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from unittest.mock import MagicMock
+from src.book_data_factory import BookDataFactory
+from src import bulk_ingest
+from src.bulk_ingest import BulkIngester, resolve_inputs, book_id_for
+from src.embedding import EmbeddingService
+from src.manifest_store import ManifestStore
+from src.vector_store_service import VectorStoreService
+from src.utils.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def library(tmp_path):
+    books = tmp_path / "books"
+    (books / "nested").mkdir(parents=True)
+    for name in ("a.txt", "b.txt", "nested/a.txt"):
+        (books / name).write_text(' '.join(f"{name} word{i}" for i in range(300)))
+    (books / "cover.jpg").write_bytes(b"not a book")
+    return books
+
+
+@pytest.fixture
+def factory(tmp_path):
+    embedding_service = MagicMock(spec=EmbeddingService)
+    embedding_service.create_embeddings.side_effect = lambda texts: [[0.1] for _ in texts]
+    return BookDataFactory(
+        embedding_service=embedding_service,
+        vector_store_service=MagicMock(spec=VectorStoreService),
+        manifest_store=ManifestStore(str(tmp_path / "manifests"))
+    )
+
+
+def test_resolve_inputs_directory_and_glob(library):
+    assert len(resolve_inputs(str(library))) == 3
+    assert resolve_inputs(str(library / "*.txt")) == [str(library / "a.txt"), str(library / "b.txt")]
+    assert book_id_for(str(library / "nested" / "a.txt"), str(library)) != book_id_for(str(library / "a.txt"), str(library))
+
+
+def test_ingest_skips_unchanged_files(library, factory):
+    ingester = BulkIngester(factory, workers=1, concurrency=2)
+
+    first = ingester.ingest(str(library))
+    assert (first.files_ingested, first.files_skipped, first.files_failed) == (3, 0, 0)
+    assert first.chunks > 0 and first.tokens > 0
+    assert "files/min" in first.format()
+
+    (library / "b.txt").write_text("changed content " * 50)
+    second = ingester.ingest(str(library))
+    assert (second.files_ingested, second.files_skipped) == (1, 2)
+
+
+def test_extraction_runs_ahead_of_embedding(library, factory, monkeypatch):
+    """With one embedding thread, every file is still sent for extraction while the first book embeds."""
+    submitted = []
+    all_submitted = threading.Event()
+
+    class RecordingPool(ThreadPoolExecutor):  # Threads instead of spawned processes, counting extractions
+        def __init__(self, max_workers, mp_context=None):
+            super().__init__(max_workers=max_workers)
+
+        def submit(self, fn, *args):
+            submitted.append(args[0])
+            if len(submitted) == 3:
+                all_submitted.set()
+            return super().submit(fn, *args)
+
+    waited = []
+
+    def embed(texts):
+        waited.append(all_submitted.wait(5))
+        return [[0.1] for _ in texts]
+
+    monkeypatch.setattr(bulk_ingest, 'ProcessPoolExecutor', RecordingPool)
+    factory.embedding_service.create_embeddings.side_effect = embed
+    summary = BulkIngester(factory, workers=3, concurrency=1, queue_size=1).ingest(str(library))
+
+    assert summary.files_ingested == 3
+    assert waited[0] is True
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(requests_per_minute=600)  # 10 per second, burst of 600
+    limiter._requests = 0  # Start with an empty bucket
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.25
+
+
+def test_rate_limiter_token_budget():
+    limiter = RateLimiter(tokens_per_minute=6000)  # 100 tokens per second
+    limiter.acquire(6000)
+    assert limiter.acquire(50) >= 0.4
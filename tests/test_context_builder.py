@@ -0,0 +1,79 @@
+from src.context_builder import build_context, overlap_words
+from src.services.text_processor import split_into_chunks
+from src.utils.metrics import MetricsCollector
+from src.utils.tokens import count_tokens
+from src.config import GPT_MODEL
+
+TEXT = " ".join(f"word{i}" for i in range(1000))
+
+
+def make_results(chunks, indices):
+    """Search results for the given chunk indices, best first."""
+    return [{'chunk': chunks[i], 'score': 1.0 - n / 100, 'index': i} for n, i in enumerate(indices)]
+
+
+def test_overlap_words():
+    previous, current = "a b c d e".split(), "d e f g".split()
+    assert overlap_words(previous, current, overlap=2) == 2
+    assert overlap_words(previous, current, overlap=3) == 0  # A shorter match is not the chunk overlap
+    assert overlap_words(previous, "x y".split(), overlap=2) == 0
+
+
+def test_adjacent_chunks_are_merged_without_overlap():
+    chunks = split_into_chunks(TEXT, chunk_size=100, overlap=20)
+    context = build_context(make_results(chunks, [3, 2, 7]), budget=100_000, metrics=MetricsCollector(), overlap=20)
+
+    assert context.spans == [[2, 3], [7]]  # Book order, adjacent chunks in one span
+    merged = context.text.split("\n\n")[0]
+    words = merged[len("[1] "):].split()
+    assert len(words) == len(set(words))  # The shared overlap appears once
+    assert words == chunks[2].split() + chunks[3].split()[20:]
+    assert context.tokens_saved > 0
+    assert context.tokens == count_tokens(context.text, GPT_MODEL)
+
+
+def test_budget_keeps_best_chunks():
+    chunks = split_into_chunks(TEXT, chunk_size=100, overlap=20)
+    one_chunk = max(count_tokens(f"[1] {chunk}", GPT_MODEL) for chunk in chunks)
+    context = build_context(make_results(chunks, [5, 1, 8, 3]), budget=int(one_chunk * 2.2),
+                            metrics=MetricsCollector())
+
+    assert context.spans == [[1], [5]]
+    assert context.dropped == 2
+    assert context.tokens <= int(one_chunk * 2.2)
+
+
+def test_oversized_best_chunk_is_truncated():
+    chunks = split_into_chunks(TEXT, chunk_size=100, overlap=20)
+    context = build_context(make_results(chunks, [4]), budget=50, metrics=MetricsCollector())
+    assert 0 < context.tokens <= 50
+    assert context.text.startswith("[1] ")
+
+
+def test_results_without_index_and_empty_results():
+    metrics = MetricsCollector()
+    context = build_context([{'chunk': "alpha beta", 'score': 0.9}, {'chunk': "gamma", 'score': 0.5}], metrics=metrics)
+    assert context.text == "[1] alpha beta\n\n[2] gamma"
+    assert build_context([], metrics=metrics).text == ""
+
+
+def test_chunks_apart_in_the_book_are_not_merged():
+    # Deduplication dropped the chunk at position 1, so stored chunks 0 and 1 are positions 0 and 2
+    results = make_results(["a b c d", "c d e f"], [0, 1])
+
+    merged = build_context(results, budget=100_000, metrics=MetricsCollector(), overlap=2)
+    apart = build_context(results, budget=100_000, metrics=MetricsCollector(), overlap=2, positions=[0, 2])
+
+    assert merged.spans == [[0, 1]] and merged.text == "[1] a b c d e f"
+    assert apart.spans == [[0], [2]] and apart.text == "[1] a b c d\n\n[2] c d e f"
+
+
+def test_neighbours_without_the_exact_overlap_stay_apart():
+    results = [
+        {'chunk': "the tank was placed behind the", 'score': 0.9, 'index': 0},
+        {'chunk': "the jury awarded damages", 'score': 0.8, 'index': 1},
+    ]
+    context = build_context(results, budget=100_000, metrics=MetricsCollector(), overlap=2)
+
+    assert context.spans == [[0], [1]]
+    assert "the jury awarded damages" in context.text
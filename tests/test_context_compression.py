@@ -0,0 +1,158 @@
+import json
+import os
+import zlib
+import numpy as np
+import pytest
+from src import rag
+from src.context_compression import ContextCompressor, evaluate_compression, split_sentences, GAP_MARKER
+from src.services.text_processor import split_into_chunks
+from src.utils.metrics import MetricsCollector
+from src.config import CHUNK_SIZE, OVERLAP
+from tests.utils.mock_factory import DictCache
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'test_data')
+
+
+def load_eval_set():
+    """Eval examples with search results: the chunk holding the evidence first, then two others."""
+    with open(os.path.join(DATA_DIR, 'compression_eval.json')) as f:
+        eval_set = json.load(f)
+    with open(os.path.join(DATA_DIR, eval_set['source']), encoding='utf-8') as f:
+        chunks = split_into_chunks(f.read(), chunk_size=CHUNK_SIZE, overlap=OVERLAP)
+    examples = []
+    for example in eval_set['examples']:
+        evidence = ' '.join(example['evidence'][0].split())
+        index = next(i for i, chunk in enumerate(chunks) if evidence in ' '.join(chunk.split()))
+        others = [(index + 1) % len(chunks), (index + len(chunks) // 2) % len(chunks)]
+        results = [{'chunk': chunks[i], 'score': 0.9 - n / 10, 'index': i} for n, i in enumerate([index] + others)]
+        examples.append({**example, 'results': results})
+    return examples
+
+
+class FakeEmbeddingService:
+    """Hashed bag-of-words embeddings through a cache, counting the texts embedded."""
+
+    def __init__(self):
+        self.cache_manager = DictCache()
+        self.embedded = 0
+
+    @staticmethod
+    def embed(text):
+        vector = np.zeros(64)
+        for term in text.lower().split():
+            vector[zlib.crc32(term.strip('.,;:?"\'').encode()) % 64] += 1
+        return vector.tolist()
+
+    def create_embeddings(self, texts):
+        embeddings = []
+        for text in texts:
+            cached = self.cache_manager.get(text)
+            if cached is None:
+                cached = self.embed(text)
+                self.embedded += 1
+                self.cache_manager.set(text, cached)
+            embeddings.append(cached)
+        return embeddings
+
+
+def test_split_sentences():
+    text = "The tank leaked. Was it punctured? \"Yes,\" he said.\n\nA new paragraph"
+    assert split_sentences(text) == ["The tank leaked.", "Was it punctured?", "\"Yes,\" he said.", "A new paragraph"]
+    assert split_sentences(" ".join(["word"] * 130), max_words=60) == [" ".join(["word"] * 60)] * 2 + [" ".join(["word"] * 10)]
+
+
+def test_keeps_query_sentences_in_order_with_neighbours():
+    filler = " ".join(f"Sentence number {i} talks about weather." for i in range(20))
+    chunk = f"{filler} The Pinto fuel tank was placed behind the axle. {filler}"
+    compressor = ContextCompressor(ratio=0.1, neighbours=1, metrics=MetricsCollector())
+
+    outcome = compressor.compress("Where was the Pinto fuel tank placed?", [{'chunk': chunk, 'score': 0.8, 'index': 4}])
+
+    assert len(outcome.results) == 1
+    kept = outcome.results[0]
+    assert kept['index'] == 4 and kept['score'] == 0.8
+    assert "Sentence number 19 talks about weather. The Pinto fuel tank was placed behind the axle. " \
+           "Sentence number 0 talks about weather." in kept['chunk']
+    assert outcome.ratio < 0.2
+    assert outcome.kept_words == len(kept['chunk'].replace(GAP_MARKER.strip(), '').split())
+
+
+def test_overlapping_sentences_are_sent_once_and_empty_results_dropped():
+    shared = "The jury awarded punitive damages."
+    results = [
+        {'chunk': f"Opening words here. {shared}", 'score': 0.9, 'index': 1},
+        {'chunk': f"{shared} Closing words here.", 'score': 0.8, 'index': 2},
+        {'chunk': "Nothing relevant at all. Still nothing relevant.", 'score': 0.7, 'index': 9},
+    ]
+    outcome = ContextCompressor(ratio=0.2, neighbours=0, metrics=MetricsCollector()).compress(
+        "What punitive damages did the jury award?", results
+    )
+
+    text = " ".join(result['chunk'] for result in outcome.results)
+    assert text.count(shared) == 1
+    assert [result['index'] for result in outcome.results] == [1]
+    assert outcome.sentences == 5  # The shared sentence is scored once
+
+
+def test_cached_sentence_embeddings_are_reused():
+    service = FakeEmbeddingService()
+    example = load_eval_set()[1]
+    compressor = ContextCompressor(service, ratio=0.3, metrics=MetricsCollector())
+
+    compressor.compress(example['question'], example['results'])
+    first = service.embedded
+    compressor.compress(example['question'], example['results'])
+
+    assert first > 0
+    assert service.embedded == first  # Every sentence and the query come from the cache
+
+
+def test_without_embed_missing_only_cached_sentences_get_embedding_scores():
+    service = FakeEmbeddingService()
+    results = [{'chunk': "The fuel tank leaked. The sky was blue.", 'score': 0.9, 'index': 0}]
+    service.cache_manager.set("The sky was blue.", service.embed("The sky was blue."))
+    compressor = ContextCompressor(service, embed_missing=False, metrics=MetricsCollector())
+
+    outcome = compressor.compress("fuel tank", results, query_embedding=service.embed("fuel tank"))
+
+    assert service.embedded == 0
+    assert outcome.scores[0] == 1.0  # Uncached: its term overlap score
+    assert outcome.scores[1] < 0.5
+
+
+def test_embedding_failure_falls_back_to_term_overlap():
+    class FailingService(FakeEmbeddingService):
+        def create_embeddings(self, texts):
+            raise RuntimeError("API down")
+
+    results = [{'chunk': "The fuel tank leaked. The sky was blue.", 'score': 0.9, 'index': 0}]
+    outcome = ContextCompressor(FailingService(), ratio=0.3, neighbours=0, metrics=MetricsCollector()).compress(
+        "fuel tank", results
+    )
+
+    assert outcome.results[0]['chunk'] == "The fuel tank leaked."
+
+
+def test_compress_is_off_unless_enabled(monkeypatch):
+    results = [{'chunk': " ".join(f"Sentence {i} is here." for i in range(10)) + " The tank leaked.",
+                'score': 0.9, 'index': 0}]
+    monkeypatch.setattr(rag, 'CONTEXT_COMPRESSION_ENABLED', False)
+    assert rag.compress("sentence", results, FakeEmbeddingService()) is results
+
+    monkeypatch.setattr(rag, 'CONTEXT_COMPRESSION_ENABLED', True)
+    assert rag.compress("Which tank leaked?", results, FakeEmbeddingService())[0]['chunk'] != results[0]['chunk']
+
+
+@pytest.mark.parametrize("service", [None, FakeEmbeddingService()], ids=["lexical", "lexical+embedding"])
+def test_eval_set_ratio_and_evidence_recall(service):
+    metrics = MetricsCollector()
+    compressor = ContextCompressor(service, ratio=0.3, metrics=metrics)
+
+    report = evaluate_compression(load_eval_set(), compressor.compress)
+
+    print(f"\nratio {report['ratio']:.2f}, evidence recall {report['evidence_recall']:.2f}, "
+          f"complete {report['complete']:.2f}")
+    assert report['examples'] == 6
+    assert report['ratio'] <= 0.35
+    assert report['evidence_recall'] >= 0.8
+    assert len(metrics.histograms['context_compression_ratio']) == 6
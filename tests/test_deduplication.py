@@ -0,0 +1,52 @@
+import random
+import pytest
+from src.services.deduplication import NearDuplicateDetector, dedup_savings
+
+
+def _random_text(rng, n_words=300):
+    return ' '.join(f"word{rng.randint(0, 10000)}" for _ in range(n_words))
+
+
+@pytest.fixture
+def rng():
+    return random.Random(7)
+
+
+def test_exact_duplicates_collapse_to_first_occurrence(rng):
+    licence = _random_text(rng)
+    chunks = [licence, _random_text(rng), licence, _random_text(rng), licence]
+
+    result = NearDuplicateDetector().deduplicate(chunks)
+
+    assert result['canonical_indices'] == [0, 1, 3]
+    assert result['references'] == {0: [2, 4]}
+    assert result['chunks'] == [chunks[0], chunks[1], chunks[3]]
+
+
+def test_near_duplicates_detected(rng):
+    page = _random_text(rng).split()
+    variant = page.copy()
+    variant[150] = "changed"  # Same page with a different page number
+    chunks = [' '.join(page), _random_text(rng), ' '.join(variant)]
+
+    result = NearDuplicateDetector(threshold=0.8).deduplicate(chunks)
+
+    assert result['references'] == {0: [2]}
+
+
+def test_distinct_chunks_kept(rng):
+    chunks = [_random_text(rng) for _ in range(50)]
+
+    result = NearDuplicateDetector().deduplicate(chunks)
+
+    assert result['chunks'] == chunks
+    assert result['stats']['duplicates_removed'] == 0
+
+
+def test_savings_report():
+    stats = dedup_savings(total_chunks=150, removed_chunks=["hello world"] * 60, batch_size=100)
+
+    assert stats['embedding_inputs_saved'] == 60
+    assert stats['embedding_requests_saved'] == 1
+    assert stats['vectors_saved'] == 60
+    assert stats['tokens_saved'] > 0
@@ -0,0 +1,174 @@
+import os
+import time
+import threading
+import pytest
+from types import SimpleNamespace
+from src.services.feature_extractor import (
+    get_feature_extractor,
+    NLTKFeatureExtractor,
+    SpacyFeatureExtractor,
+    FeatureExtractionStage
+)
+from src.book_data_interface import BookDataInterface
+from src.services.text_processor import split_into_chunks
+from src.config import SPACY_MODEL
+
+BOOK_PATH = os.path.join(os.path.dirname(__file__), 'test_data', 'book.txt')
+
+
+def _spacy_model_available() -> bool:
+    try:
+        import spacy
+        spacy.load(SPACY_MODEL)
+        return True
+    except Exception:
+        return False
+
+
+def _token(text, tag):
+    return SimpleNamespace(text=text, tag_=tag, is_space=False)
+
+
+def test_get_feature_extractor_by_name():
+    assert isinstance(get_feature_extractor("nltk"), NLTKFeatureExtractor)
+    assert isinstance(get_feature_extractor("spacy"), SpacyFeatureExtractor)
+
+
+def test_get_feature_extractor_unknown_falls_back_to_nltk():
+    assert isinstance(get_feature_extractor("unknown"), NLTKFeatureExtractor)
+
+
+def test_spacy_entities_use_nltk_labels():
+    doc = SimpleNamespace(ents=[
+        SimpleNamespace(text="Apple", label_="ORG"),
+        SimpleNamespace(text="Paris", label_="GPE"),
+        SimpleNamespace(text="2017", label_="DATE"),  # No NLTK equivalent, dropped
+    ])
+    entities = SpacyFeatureExtractor._entities_from_doc(doc)
+    assert entities == ["Apple (ORGANIZATION)", "Paris (GPE)"]
+
+
+def test_spacy_phrases_use_text_processor_grammar():
+    doc = [
+        _token("The", "DT"), _token("quick", "JJ"), _token("fox", "NN"),
+        _token("jumps", "VBZ"), _token("over", "IN"), _token("dogs", "NNS")
+    ]
+    phrases = SpacyFeatureExtractor._phrases_from_doc(doc)
+    assert phrases == ["quick fox"]
+
+
+@pytest.mark.skipif(not _spacy_model_available(), reason="spaCy model not installed")
+def test_spacy_output_format_matches_nltk():
+    chunks = split_into_chunks("Barack Obama visited Paris in 2009 with the United Nations delegation.", 50, 10)
+    nltk_features = NLTKFeatureExtractor().extract(chunks)
+    spacy_features = SpacyFeatureExtractor().extract(chunks)
+
+    assert set(spacy_features.keys()) == set(nltk_features.keys())
+    assert sorted(spacy_features['dates']) == sorted(nltk_features['dates'])
+    assert all(e.endswith(")") and " (" in e for e in spacy_features['entities'])
+
+
+@pytest.mark.performance
+@pytest.mark.skipif(not _spacy_model_available(), reason="spaCy model not installed")
+def test_feature_extractor_throughput():
+    """Compare NLTK and spaCy engines on tests/test_data/book.txt."""
+    with open(BOOK_PATH, 'r', encoding='utf-8') as f:
+        chunks = split_into_chunks(f.read())
+
+    results = {}
+    for engine in ("nltk", "spacy"):
+        extractor = get_feature_extractor(engine)
+        start = time.perf_counter()
+        features = extractor.extract(chunks)
+        elapsed = time.perf_counter() - start
+        results[engine] = elapsed
+        print(
+            f"\n{engine}: {elapsed:.2f}s, {len(chunks) / elapsed:.1f} chunks/s, "
+            f"entities: {len(features['entities'])}, key phrases: {len(features['key_phrases'])}"
+        )
+
+    assert all(elapsed > 0 for elapsed in results.values())
+
+
+class _SlowExtractor(NLTKFeatureExtractor):
+    """Extractor that waits for a signal before each batch."""
+
+    def __init__(self, gate):
+        self.gate = gate
+
+    def extract(self, chunks):
+        self.gate.wait(timeout=5)
+        return {'dates': [], 'entities': [], 'key_phrases': [c.lower() for c in chunks]}
+
+
+def test_feature_stage_runs_in_background():
+    gate = threading.Event()
+    stage = FeatureExtractionStage(["A", "B", "C"], _SlowExtractor(gate), batch_size=1).start()
+
+    assert stage.get('key_phrases', block=False) == []
+    assert stage.get_status()['status'] in (FeatureExtractionStage.PENDING, FeatureExtractionStage.RUNNING)
+
+    gate.set()
+    assert sorted(stage.get('key_phrases')) == ["a", "b", "c"]
+    status = stage.get_status()
+    assert status['status'] == FeatureExtractionStage.COMPLETED
+    assert status['processed'] == 3
+    assert status['progress'] == 100.0
+
+
+def test_feature_stage_reports_failure():
+    class _FailingExtractor(NLTKFeatureExtractor):
+        def extract(self, chunks):
+            raise RuntimeError("boom")
+
+    stage = FeatureExtractionStage(["A"], _FailingExtractor())
+    stage.run()
+    status = stage.get_status()
+    assert status['status'] == FeatureExtractionStage.FAILED
+    assert status['error'] == "boom"
+
+
+def test_spacy_stage_streams_all_chunks_through_one_pipe():
+    class _Doc(list):
+        def __init__(self, text):
+            super().__init__([_token(text, "NN")])
+            self.ents = [SimpleNamespace(text=text, label_="ORG")]
+
+    class _FakeNLP:
+        calls = []
+
+        def pipe(self, chunks, batch_size, n_process):
+            self.calls.append((batch_size, n_process))
+            return (_Doc(chunk) for chunk in chunks)
+
+    extractor = SpacyFeatureExtractor(batch_size=32, n_process=2)
+    extractor._nlp = _FakeNLP()
+    chunks = [f"Company{i}" for i in range(40)]
+    published = list(extractor.iter_extract(chunks, batch_size=16))
+
+    assert _FakeNLP.calls == [(32, 2)]  # One pipe for the whole book
+    assert [count for count, _ in published] == [16, 16, 8]
+    assert published[0][1]['entities'][0] == "Company0 (ORGANIZATION)"
+
+    stage = FeatureExtractionStage(chunks, extractor, batch_size=16)
+    stage.run()
+    assert len(_FakeNLP.calls) == 2
+    assert stage.get_status()['processed'] == 40
+    assert len(stage.get('entities')) == 40
+
+
+def test_book_data_getters_wait_for_feature_stage():
+    gate = threading.Event()
+    stage = FeatureExtractionStage(["Key Phrase"], _SlowExtractor(gate)).start()
+    book_data = BookDataInterface(["Key Phrase"], [[0.1]], {}, None, feature_stage=stage)
+
+    assert book_data.get_key_phrases(block=False) == []
+    gate.set()
+    assert book_data.get_key_phrases() == ["key phrase"]
+    assert book_data.get_feature_status()['status'] == FeatureExtractionStage.COMPLETED
+
+
+def test_book_data_with_known_features_is_completed():
+    book_data = BookDataInterface(["chunk"], [[0.1]], {}, None, dates=["2017"])
+    assert book_data.get_dates(block=False) == ["2017"]
+    assert book_data.get_feature_status()['status'] == FeatureExtractionStage.COMPLETED
@@ -111,3 +111,59 @@ def test_unsupported_file_format(file_processor, tmp_path):
     assert ".unsupported" in error.details['extension']
     assert all(fmt in error.details['supported_formats'] 
               for fmt in ['.txt', '.pdf', '.docx', '.epub'])
+
+def _create_text_pdf(path, page_count):
+    """Создает PDF, где на каждой странице написан её номер"""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica')
+    }))
+    for i in range(page_count):
+        page = writer.add_blank_page(300, 200)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})
+        })
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 20 100 Td (Page number {i + 1}) Tj ET".encode())
+        page[NameObject('/Contents')] = writer._add_object(stream)
+    with open(path, 'wb') as f:
+        writer.write(f)
+    return str(path)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pdf_pages_streamed_in_order(file_processor, tmp_path, workers):
+    pdf_path = _create_text_pdf(tmp_path / "pages.pdf", 10)
+
+    segments = list(file_processor._iter_pdf_pages(
+        pdf_path, workers=workers, min_parallel_pages=1, pages_per_task=3
+    ))
+
+    assert [s.location for s in segments] == [f"page {i + 1}" for i in range(10)]
+    assert all(f"Page number {i + 1}" in s.text for i, s in enumerate(segments))
+
+def test_pdf_pool_is_spawned_once_and_reused(file_processor, tmp_path):
+    from src.services import file_processor as module
+    first = _create_text_pdf(tmp_path / "first.pdf", 4)
+    second = _create_text_pdf(tmp_path / "second.pdf", 4)
+
+    list(file_processor._iter_pdf_pages(first, workers=2, min_parallel_pages=1, pages_per_task=2))
+    pool = module._pdf_pool
+    segments = list(file_processor._iter_pdf_pages(second, workers=2, min_parallel_pages=1, pages_per_task=2))
+
+    assert module._pdf_pool is pool
+    assert pool._mp_context.get_start_method() == "spawn"  # Not forked from a multithreaded process
+    assert len(segments) == 4
+
+def test_iter_segments_epub_chapters(file_processor, sample_files):
+    segments = list(file_processor.iter_segments(sample_files["epub"]))
+    assert [s.location for s in segments] == ["chapter.xhtml"]
+    assert "test paragraph" in segments[0].text
+
+def test_iter_text_matches_process_file(file_processor, sample_files):
+    streamed = ''.join(file_processor.iter_text(sample_files["txt"]))
+    assert streamed == file_processor.process_file(sample_files["txt"])
@@ -0,0 +1,104 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+from src.ingest_pipeline import IngestPipeline
+from src.manifest_store import ManifestStore
+from src.services.text_processor import split_text
+from src.vector_store_service import VectorStoreService
+from src.utils.metrics import MetricsCollector
+
+
+def _text(words=3000):
+    return ' '.join(f"word{i % 397} token{i % 13}" for i in range(words))
+
+
+def _segments(text, size=500):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+@pytest.fixture
+def vector_store_service():
+    return MagicMock(spec=VectorStoreService)
+
+
+def _pipeline(vector_store_service, tmp_path, embed=None, **kwargs):
+    return IngestPipeline(
+        embed=embed or (lambda texts: [[0.1] * 3 for _ in texts]),
+        vector_store_service=vector_store_service,
+        manifest_store=ManifestStore(str(tmp_path)),
+        metrics=MetricsCollector(),
+        **kwargs
+    )
+
+
+def test_pipeline_matches_batch_chunking(vector_store_service, tmp_path):
+    text = _text()
+    result = _pipeline(vector_store_service, tmp_path, batch_size=2, deduplicate=False).run(_segments(text), "book")
+
+    assert result['chunks'] == split_text(text)
+    assert len(result['embeddings']) == len(result['chunks'])
+    stored = [c for call in vector_store_service.store_vectors.call_args_list for c in call.args[0]]
+    assert stored == result['chunks']
+    assert result['stage_stats']['embedding']['items'] == len(result['chunks'])
+
+
+def test_pipeline_reingest_skips_unchanged_chunks(vector_store_service, tmp_path):
+    text = _text()
+    pipeline = _pipeline(vector_store_service, tmp_path, deduplicate=False)
+    first = pipeline.run(_segments(text), "book")
+
+    vector_store_service.reset_mock()
+    second = pipeline.run(_segments(text), "book")
+
+    assert second['unchanged'] == len(first['chunk_ids'])
+    assert second['added'] == 0
+    vector_store_service.store_vectors.assert_not_called()
+    vector_store_service.delete_vectors.assert_not_called()
+
+
+def test_next_embedding_batch_overlaps_upsert(vector_store_service, tmp_path):
+    second_batch_embedding = threading.Event()
+    calls = []
+
+    def embed(texts):
+        calls.append(texts)
+        if len(calls) == 2:
+            second_batch_embedding.set()
+        return [[0.1] for _ in texts]
+
+    def store_vectors(chunks, embeddings, ids):
+        if vector_store_service.store_vectors.call_count == 1:
+            # The first upsert only finishes once the next batch is being embedded
+            assert second_batch_embedding.wait(timeout=5)
+
+    vector_store_service.store_vectors.side_effect = store_vectors
+    text = ' '.join(f"w{i}" for i in range(4000))
+    result = _pipeline(vector_store_service, tmp_path, embed=embed, batch_size=1, deduplicate=False).run(
+        _segments(text), "book")
+
+    assert len(calls) == len(result['chunks']) > 1
+
+
+def test_embedding_failure_propagates(vector_store_service, tmp_path):
+    def embed(texts):
+        raise RuntimeError("embedding failed")
+
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        _pipeline(vector_store_service, tmp_path, embed=embed).run(_segments(_text()), "book")
+    vector_store_service.store_vectors.assert_not_called()
+
+
+def test_duplicates_are_not_embedded(vector_store_service, tmp_path):
+    block = ' '.join(f"unique{i}" for i in range(1500))
+    text = ' '.join([block, block, block])
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return [[0.1] for _ in texts]
+
+    result = _pipeline(vector_store_service, tmp_path, embed=embed, batch_size=1).run(_segments(text), "book")
+
+    assert result['dedup_stats']['duplicates_removed'] > 0
+    assert len(embedded) == len(result['chunks'])
+    assert sum(len(p) for p in result['duplicates'].values()) == result['dedup_stats']['duplicates_removed']
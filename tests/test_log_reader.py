@@ -0,0 +1,95 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from src.utils.log_reader import tail_lines, follow, LogIndex
+from src.utils.log_analyzer import LogAnalyzer
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def write_json_log(path, count, start=START):
+    with open(path, 'a') as f:
+        for i in range(count):
+            entry = {
+                "timestamp": (start + timedelta(seconds=i)).isoformat(),
+                "level": "ERROR" if i % 10 == 0 else "DEBUG",
+                "message": f"message {i}",
+                "module": "test",
+                "function": "test"
+            }
+            f.write(json.dumps(entry) + "\n")
+
+
+def test_tail_lines_matches_readlines(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"line {i}\n" for i in range(1000)))
+    expected = path.read_text().splitlines(keepends=True)
+
+    for lines in (1, 7, 100, 999, 1000, 5000):
+        assert tail_lines(str(path), lines, block_size=64) == expected[-lines:]
+    assert tail_lines(str(path), 0) == []
+
+
+def test_tail_lines_without_final_newline(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("first\nsecond\nthird")
+    assert tail_lines(str(path), 2, block_size=4) == ["second\n", "third"]
+
+
+def test_follow_yields_appended_lines_and_survives_truncation(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("old line\n")
+
+    async def run():
+        lines = []
+        stream = follow(str(path), poll_interval=0.01)
+
+        async def write():
+            await asyncio.sleep(0.05)
+            with open(path, 'a') as f:
+                f.write("new 1\nnew ")
+            await asyncio.sleep(0.05)
+            with open(path, 'a') as f:
+                f.write("2\n")
+            await asyncio.sleep(0.05)
+            path.write_text("after rotation\n")
+
+        writer = asyncio.ensure_future(write())
+        async for line in stream:
+            lines.append(line)
+            if len(lines) == 3:
+                break
+        await writer
+        return lines
+
+    assert asyncio.run(run()) == ["new 1", "new 2", "after rotation"]
+
+
+def test_index_checkpoints_are_incremental(tmp_path):
+    path = tmp_path / "app.log"
+    write_json_log(path, 500)
+    index = LogIndex(str(path), interval=2048)
+    index.update()
+    checkpoints = len(index.offsets)
+    assert checkpoints > 5
+    assert index.times == sorted(index.times)
+
+    write_json_log(path, 500, start=START + timedelta(seconds=500))
+    reloaded = LogIndex(str(path), interval=2048)  # Read back from the sidecar file
+    assert reloaded.offsets == index.offsets
+    reloaded.update()
+    assert len(reloaded.offsets) > checkpoints
+    assert reloaded.offsets[:checkpoints] == index.offsets
+
+
+def test_errors_by_period_seeks_to_range(tmp_path):
+    path = tmp_path / "app.log"
+    write_json_log(path, 2000)
+    analyzer = LogAnalyzer(str(path))
+    analyzer.index.interval = 4096
+
+    start, end = START + timedelta(seconds=1500), START + timedelta(seconds=1600)
+    errors = analyzer.get_errors_by_period(start, end)
+
+    assert [e["message"] for e in errors] == [f"message {i}" for i in range(1500, 1601, 10)]
+    assert analyzer.index.offset_for(start) > path.stat().st_size // 2  # Reading starts near the range
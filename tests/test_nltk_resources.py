@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import patch
+from src.services import nltk_resources
+from src.services.nltk_resources import ensure_nltk_resources, preload_nltk_resources
+from src.utils.metrics import MetricsCollector
+
+
+@pytest.fixture(autouse=True)
+def reset_resources():
+    nltk_resources._loaded.clear()
+    nltk_resources._failed.clear()
+    yield
+    nltk_resources._loaded.clear()
+    nltk_resources._failed.clear()
+
+
+@pytest.fixture
+def nltk_mocks():
+    with patch('src.services.nltk_resources.nltk.data.find') as mock_find, \
+         patch('src.services.nltk_resources.nltk.download') as mock_download, \
+         patch('src.services.nltk_resources._warm_up') as mock_warm_up:
+        yield mock_find, mock_download, mock_warm_up
+
+
+def test_resources_resolved_once_per_process(nltk_mocks):
+    mock_find, mock_download, mock_warm_up = nltk_mocks
+
+    ensure_nltk_resources('tokenizer', 'tagger')
+    ensure_nltk_resources('tokenizer', 'tagger')
+
+    assert mock_find.call_count == 2
+    assert mock_warm_up.call_count == 2
+    mock_download.assert_not_called()
+
+
+def test_lookup_uses_category_paths(nltk_mocks):
+    mock_find, _, _ = nltk_mocks
+
+    ensure_nltk_resources('tagger', 'chunker')
+
+    looked_up = [call.args[0] for call in mock_find.call_args_list]
+    assert looked_up == [
+        'taggers/averaged_perceptron_tagger_eng',
+        'chunkers/maxent_ne_chunker_tab',
+        'corpora/words'
+    ]
+
+
+def test_missing_resource_without_downloads_fails_once(nltk_mocks):
+    mock_find, mock_download, _ = nltk_mocks
+    mock_find.side_effect = LookupError("not found")
+
+    for _ in range(3):
+        with pytest.raises(LookupError):
+            ensure_nltk_resources('wordnet', download=False)
+
+    assert mock_find.call_count == 1
+    mock_download.assert_not_called()
+
+
+def test_missing_resource_downloaded_when_allowed(nltk_mocks):
+    mock_find, mock_download, _ = nltk_mocks
+    mock_find.side_effect = [LookupError("not found"), None]
+    mock_download.return_value = True
+
+    ensure_nltk_resources('wordnet', download=True, download_dir='/tmp/nltk_data')
+
+    mock_download.assert_called_once_with('wordnet', download_dir='/tmp/nltk_data', quiet=True)
+
+
+def test_preload_records_startup_metrics(nltk_mocks):
+    metrics = MetricsCollector()
+
+    load_times = preload_nltk_resources(metrics)
+
+    assert set(load_times) == set(nltk_resources.NLTK_RESOURCES)
+    assert metrics.get_gauge('startup_nltk_load_seconds') is not None
+    assert metrics.get_gauge('startup_nltk_tokenizer_load_seconds') is not None
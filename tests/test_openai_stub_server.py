@@ -0,0 +1,132 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from openai import OpenAI, RateLimitError
+from src.openai_service import OpenAIService
+from src.embedding import EmbeddingService
+from src.utils.tokens import count_tokens
+from src.config import GPT_MODEL
+from tests.utils.mock_factory import DictCache
+from tests.utils.openai_stub_server import Latency, OpenAIStubServer, StubConfig, stub_embedding
+
+
+@pytest.fixture(scope="module")
+def server():
+    with OpenAIStubServer(StubConfig(embedding_dimension=64, answer_words=12)) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def fresh_counters(server):
+    server.reset()
+
+
+def test_embeddings_are_deterministic_and_counted(server):
+    client = OpenAI(api_key="sk-stub", base_url=server.base_url)
+    texts = ["The tank leaked.", "Grimshaw was awarded damages."]
+
+    first = client.embeddings.create(input=texts, model="text-embedding-3-small")  # base64 by default
+    second = client.embeddings.create(input=texts, model="text-embedding-3-small", encoding_format="float")
+
+    assert [len(d.embedding) for d in first.data] == [64, 64]
+    np.testing.assert_allclose(first.data[0].embedding, second.data[0].embedding, rtol=1e-6)
+    np.testing.assert_allclose(first.data[1].embedding, stub_embedding(texts[1], 64), rtol=1e-6)
+    tokens = sum(count_tokens(text, "text-embedding-3-small") for text in texts)
+    assert first.usage.prompt_tokens == tokens
+    assert server.stats()['requests']['embeddings'] == 2
+    assert server.stats()['prompt_tokens'] == 2 * tokens
+
+
+def test_embedding_service_against_stub(server):
+    service = EmbeddingService(OpenAI(api_key="sk-stub", base_url=server.base_url), DictCache(), batch_size=2)
+
+    embeddings = service.create_embeddings(["a", "b", "c"])
+
+    assert len(embeddings) == 3
+    assert server.stats()['requests']['embeddings'] == 2  # Batches of two
+
+
+def test_answers_plain_and_streamed(server):
+    service = OpenAIService(api_key="sk-stub", base_url=server.base_url)
+
+    answer = service.generate_answer("Who was driving the Pinto?", "Context text.")
+
+    async def stream():
+        return [piece async for piece in service.astream_answer("Who was driving the Pinto?", "Context text.")]
+
+    pieces = asyncio.run(stream())
+    assert len(answer.split()) == 12
+    assert "".join(pieces) == answer  # Same question, same answer
+    assert len(pieces) == 12
+    stats = server.stats()
+    assert stats['requests']['chat'] == 2
+    assert stats['completion_tokens'] == 2 * count_tokens(answer, GPT_MODEL)
+
+
+def test_stream_usage_chunk(server):
+    client = OpenAI(api_key="sk-stub", base_url=server.base_url)
+    stream = client.chat.completions.create(
+        model=GPT_MODEL, messages=[{"role": "user", "content": "How fast?"}],
+        stream=True, stream_options={"include_usage": True}, max_tokens=5
+    )
+    chunks = list(stream)
+
+    assert chunks[-1].usage.completion_tokens == server.stats()['completion_tokens']
+    assert "".join(c.choices[0].delta.content or "" for c in chunks if c.choices).count(" ") == 4
+
+
+def test_rate_limit_injection():
+    config = StubConfig(embedding_dimension=8, rate_limit_probability=1.0, retry_after=0.01)
+    with OpenAIStubServer(config) as server:
+        client = OpenAI(api_key="sk-stub", base_url=server.base_url, max_retries=0)
+        with pytest.raises(RateLimitError):
+            client.embeddings.create(input=["x"], model="text-embedding-3-small")
+        assert server.stats()['rate_limited'] == 1
+
+
+def test_requests_per_minute_limit_and_retry():
+    config = StubConfig(embedding_dimension=8, requests_per_minute=2, retry_after=0.01)
+    with OpenAIStubServer(config) as server:
+        client = OpenAI(api_key="sk-stub", base_url=server.base_url, max_retries=1)
+        client.embeddings.create(input=["a"], model="text-embedding-3-small")
+        client.embeddings.create(input=["b"], model="text-embedding-3-small")
+        with pytest.raises(RateLimitError):
+            client.embeddings.create(input=["c"], model="text-embedding-3-small")
+        assert server.stats()['rate_limited'] == 2  # The call and its retry
+
+
+def test_latency_distributions():
+    import random
+    rng = random.Random(1)
+    samples = [Latency.parse("lognormal:0.1:0.5").sample(rng) for _ in range(2000)]
+
+    assert 0.09 < np.median(samples) < 0.11
+    assert np.percentile(samples, 99) > 0.25  # Long right tail
+    assert Latency.parse("0.05").sample(rng) == 0.05
+    assert all(0.0 <= Latency.parse("uniform:0.1:0.05").sample(rng) <= 0.15 for _ in range(100))
+    with pytest.raises(ValueError):
+        Latency.parse("gamma:1")
+
+
+@pytest.mark.performance
+def test_concurrent_answer_throughput_and_tail_latency():
+    """Concurrent questions against a stub with realistic latency: throughput scales with concurrency."""
+    config = StubConfig(embedding_dimension=64, chat_latency=Latency('lognormal', 0.05, 0.5),
+                        token_interval=Latency('constant', 0.001), answer_words=20, seed=7)
+    with OpenAIStubServer(config) as server:
+        service = OpenAIService(api_key="sk-stub", base_url=server.base_url)
+
+        async def run(questions: int) -> float:
+            start = time.perf_counter()
+            await asyncio.gather(*(service.agenerate_answer(f"Question {i}?", "Context.") for i in range(questions)))
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(run(100))
+        stats = server.stats()
+
+    latency = stats['latency']['chat']
+    print(f"\n100 answers in {elapsed:.2f}s ({100 / elapsed:.0f}/s), "
+          f"p50 {latency['p50'] * 1000:.0f} ms, p99 {latency['p99'] * 1000:.0f} ms")
+    assert stats['requests']['chat'] == 100
+    assert elapsed < 100 * latency['p50']  # Answers overlap instead of running one after another
@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import Mock
+from src.utils.metrics import MetricsCollector
+from src.utils.single_flight import SingleFlight, normalize_question, question_key
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight("ask", metrics=MetricsCollector())
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "42"
+
+    async def burst():
+        return await asyncio.gather(*(flight.do("same", answer) for _ in range(20)))
+
+    assert asyncio.run(burst()) == ["42"] * 20
+    assert len(calls) == 1
+    assert flight.metrics.get_counter("ask_calls") == 1
+    assert flight.metrics.get_counter("ask_coalesced") == 19
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_and_later_calls_are_not_coalesced():
+    flight = SingleFlight("ask", metrics=MetricsCollector())
+    calls = []
+
+    async def answer(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def run():
+        first = await asyncio.gather(flight.do("a", lambda: answer("a")), flight.do("b", lambda: answer("b")))
+        second = await flight.do("a", lambda: answer("a"))  # The first call is finished: nothing cached
+        return first, second
+
+    assert asyncio.run(run()) == (["a", "b"], "a")
+    assert calls == ["a", "b", "a"]
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight("ask", metrics=MetricsCollector())
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream error")
+
+    async def burst():
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight("ask", metrics=MetricsCollector())
+
+    async def answer():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("k", answer))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", answer))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_question_key():
+    book = Mock()
+    book.get_metadata.return_value = {'content_hash': 'abc'}
+    assert normalize_question("  What is   the Plot? ") == "what is the plot"
+    assert question_key("What is the plot?", book, "cosine") == question_key("what is the plot", book, "cosine")
+    assert question_key("What is the plot?", book, "cosine") != question_key("What is the plot?", book, "hybrid")
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import threading
+import pytest
+from src.services.storage import LocalStorageBackend, StorageService, create_storage_service
+from src.utils.metrics import MetricsCollector
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_bytes(os.urandom(100_000))
+    return path
+
+
+def test_local_backend_copies_file(tmp_path, source):
+    backend = LocalStorageBackend(str(tmp_path / "storage"), chunk_size=4096)
+    url = backend.upload(str(source), "alice")
+
+    target = tmp_path / "storage" / "uploads" / "alice" / "book.txt"
+    assert url == f"file://{target}"
+    assert target.read_bytes() == source.read_bytes()
+    assert not list(target.parent.glob("*.part"))
+
+
+def test_local_backend_resumes_interrupted_copy(tmp_path, source):
+    backend = LocalStorageBackend(str(tmp_path / "storage"), chunk_size=4096)
+    target_dir = tmp_path / "storage" / "uploads" / "alice"
+    target_dir.mkdir(parents=True)
+    stat = source.stat()
+    part = target_dir / f"book.txt.{stat.st_size}-{stat.st_mtime_ns}.part"
+    part.write_bytes(source.read_bytes()[:30_000])  # Left by an interrupted copy
+
+    backend.upload(str(source), "alice")
+    assert (target_dir / "book.txt").read_bytes() == source.read_bytes()
+
+
+def test_uploads_run_in_background(tmp_path, source):
+    release = threading.Event()
+
+    class SlowBackend:
+        name = 'slow'
+
+        def upload(self, file_path, user):
+            release.wait(5)
+            return f"slow://{user}/{os.path.basename(file_path)}"
+
+    service = StorageService(SlowBackend(), metrics=MetricsCollector())
+    try:
+        upload = service.submit(str(source), "alice")
+        assert not upload.done()  # submit() does not wait for the upload
+        release.set()
+        assert upload.result(5) == "slow://alice/book.txt"
+        assert service.metrics.get_counter("storage_uploads") == 1
+        assert asyncio.run(service.upload_file(str(source), "bob")) == "slow://bob/book.txt"
+    finally:
+        service.shutdown()
+
+
+def test_failed_upload_is_counted(tmp_path):
+    service = StorageService(LocalStorageBackend(str(tmp_path / "storage")), metrics=MetricsCollector())
+    with pytest.raises(FileNotFoundError):
+        service.submit(str(tmp_path / "missing.txt"), "alice").result(5)
+    assert service.metrics.get_counter("storage_upload_errors") == 1
+    service.shutdown()
+
+
+def test_create_storage_service(tmp_path, monkeypatch):
+    monkeypatch.delenv("FIREBASE_CREDENTIALS_PATH", raising=False)
+    assert create_storage_service("auto") is None
+    assert create_storage_service("none") is None
+    monkeypatch.setattr("src.services.storage.STORAGE_LOCAL_DIR", str(tmp_path))
+    assert create_storage_service("local").name == 'local'
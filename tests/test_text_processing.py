@@ -198,3 +198,34 @@ def test_epub_processing_with_empty_content(tmp_path):
     processed_text = load_and_preprocess_text(text)
     assert processed_text['text'].strip() == ""
     assert len(processed_text['chunks']) == 0
+
+def test_content_defined_chunks_survive_insertion():
+    """Вставка слова меняет только соседние чанки, а не все последующие"""
+    import random
+    from src.services.text_processor import split_into_content_defined_chunks, chunk_id
+    rng = random.Random(42)
+    words = [f"word{rng.randint(0, 5000)}" for _ in range(20000)]
+    original = split_into_content_defined_chunks(' '.join(words), 1000, 150, 500, 1500)
+
+    words.insert(10000, "inserted")
+    edited = split_into_content_defined_chunks(' '.join(words), 1000, 150, 500, 1500)
+
+    changed = set(map(chunk_id, edited)) - set(map(chunk_id, original))
+    assert len(original) > 5
+    assert len(changed) <= 3
+
+def test_content_defined_chunks_respect_size_limits():
+    from src.services.text_processor import split_into_content_defined_chunks
+    text = ' '.join(f"w{i % 997}" for i in range(10000))
+    chunks = split_into_content_defined_chunks(text, chunk_size=200, overlap=0, min_size=100, max_size=300)
+
+    assert sum(len(c.split()) for c in chunks) == 10000
+    assert all(len(c.split()) <= 300 for c in chunks)
+    assert all(len(c.split()) >= 100 for c in chunks[:-1])
+
+@pytest.mark.parametrize("strategy", ["content_defined", "fixed"])
+def test_streamed_chunks_match_whole_text(strategy):
+    from src.services.text_processor import iter_text_chunks, split_text
+    text = ' '.join(f"word{i % 101}x{i % 7}" for i in range(12000))
+    segments = [text[i:i + 999] for i in range(0, len(text), 999)]  # Blocks cut words in half
+    assert list(iter_text_chunks(segments, strategy)) == split_text(text, strategy)
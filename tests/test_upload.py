@@ -2,6 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from src.web.app import app
 import os
+import time
 import base64
 from src.config import UPLOAD_FOLDER
 from src.book_data_interface import BookDataInterface
@@ -56,6 +57,16 @@ def mock_firebase():
 def storage_service(mock_firebase):
     return FirebaseStorageService()
 
+def wait_for_job(client, auth_headers, job_id, timeout=30):
+    """Ждет завершения фонового задания и возвращает его статус"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}", headers=auth_headers).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.1)
+    raise TimeoutError(f"Job {job_id} not finished")
+
 def test_auth_required(client):
     """Проверка что без авторизации доступ запрещен"""
     response = client.post("/upload")
@@ -71,11 +82,12 @@ async def test_file_upload_success(client, auth_headers, test_file, mock_firebas
             headers=auth_headers
         )
     
-    assert response.status_code == 200
+    assert response.status_code == 202
     result = response.json()
-    assert result["status"] == "success"
-    assert "storage_url" in result
-    assert result["storage_url"].startswith("https://storage.googleapis.com/")
+    assert result["status"] == "accepted"
+    assert "job_id" in result
+    # Загрузка в хранилище идет в фоне параллельно с обработкой: ссылка появляется в статусе задания
+    assert "storage_url" not in result
 
 @pytest.mark.asyncio
 async def test_file_upload_firebase_error(client, auth_headers, test_file, storage_service):
@@ -116,7 +128,10 @@ def test_book_data_persistence(client, auth_headers, test_file):
             files={"file": (test_file, f, "text/plain")},
             headers=auth_headers
         )
-    assert response.status_code == 200
+    assert response.status_code == 202
+    job = wait_for_job(client, auth_headers, response.json()["job_id"])
+    assert job["status"] == "completed"
+    assert job["timings"]["run_seconds"] is not None
     
     # Проверяем что данные книги доступны
     response = client.get("/check_book_loaded", headers=auth_headers)
@@ -163,7 +178,7 @@ async def test_cleanup(client, auth_headers, test_file):
                 headers=auth_headers
             )
             
-        assert response.status_code == 200
+        assert response.status_code == 202
         
         # Проверяем очистку всех временных файлов
         for temp_file in temp_files:
@@ -11,7 +11,10 @@ from tests.test_data.constants import (
 )
 from dataclasses import dataclass
 import os
+import numpy as np
 import firebase_admin
+from src.book_data_interface import BookDataInterface
+from src.config import EMBEDDING_DIMENSION
 
 logger = get_main_logger()
 
@@ -59,6 +62,12 @@ class MockPinecone:
             self._vectors[vector_id] = (values, metadata)
         logger.debug(f"Stored {len(vectors)} vectors")
 
+    def delete_vectors(self, ids: List[str]) -> None:
+        """Удаляет векторы по ID."""
+        for vector_id in ids:
+            self._vectors.pop(vector_id, None)
+        logger.debug(f"Deleted {len(ids)} vectors")
+
     def query(
         self,
         vector: List[float],
@@ -205,6 +214,25 @@ class MockWebSocketManager:
             await connection.send_json(message)
 
 
+class DictCache:
+    """Кэш эмбеддингов в словаре (интерфейс CacheManager: get/set)."""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.data.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.data[key] = value
+
+
+def make_book(text: str = "chunk", n_chunks: int = 20, dim: int = EMBEDDING_DIMENSION, seed: int = 0) -> BookDataInterface:
+    """Книга из фрагментов "{text} {i}" с воспроизводимыми случайными эмбеддингами."""
+    chunks = [f"{text} {i}" for i in range(n_chunks)]
+    embeddings = np.random.default_rng(seed).normal(size=(n_chunks, dim)).tolist()
+    return BookDataInterface(chunks, embeddings, {'chunks': chunks}, None, [], [], [], metadata={})
+
+
 class MockFactory:
     """Фабрика для создания тестовых моков."""
     
@@ -0,0 +1,387 @@
+"""
+Local OpenAI-compatible stub server for offline load tests and benchmarks.
+
+Serves /v1/embeddings and /v1/chat/completions (streaming included) with
+deterministic responses: an embedding depends only on its text, an answer
+only on the question. Latency is drawn from configurable distributions,
+429 responses can be injected at random or by per-minute request/token
+limits, and prompt/completion tokens are counted like the real API.
+
+Point the services at it with OPENAI_BASE_URL (or the base_url argument):
+
+    with OpenAIStubServer(StubConfig(chat_latency=Latency.parse("lognormal:0.3:0.5"))) as server:
+        service = OpenAIService(api_key="sk-stub", base_url=server.base_url)
+        ...
+        print(server.stats())
+
+Or run it standalone:
+
+    python -m tests.utils.openai_stub_server --port 8089 --chat-latency lognormal:0.3:0.5 --rate-limit 0.05
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from src.config import EMBEDDING_DIMENSION, EMBEDDING_MODEL, GPT_MODEL
+from src.utils.tokens import count_tokens
+
+
+@dataclass
+class Latency:
+    """
+    Seconds to wait per call.
+
+    kind: 'constant' (always median), 'uniform' (median +- spread) or
+    'lognormal' (median with sigma = spread, a long right tail like real APIs).
+    """
+    kind: str = 'constant'
+    median: float = 0.0
+    spread: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == 'uniform':
+            return max(rng.uniform(self.median - self.spread, self.median + self.spread), 0.0)
+        if self.kind == 'lognormal':
+            return self.median * rng.lognormvariate(0.0, self.spread) if self.median > 0 else 0.0
+        return self.median
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Latency':
+        """Latency from 'kind:median[:spread]', e.g. 'lognormal:0.2:0.5' or '0.05' (constant)."""
+        parts = spec.split(':')
+        if len(parts) == 1:
+            return cls('constant', float(parts[0]))
+        if parts[0] not in ('constant', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {parts[0]}")
+        return cls(parts[0], float(parts[1]), float(parts[2]) if len(parts) > 2 else 0.0)
+
+
+@dataclass
+class StubConfig:
+    embedding_dimension: int = EMBEDDING_DIMENSION
+    embedding_latency: Latency = field(default_factory=Latency)  # Per request
+    embedding_seconds_per_1k_tokens: float = 0.0  # Added to the request latency
+    chat_latency: Latency = field(default_factory=Latency)  # Until the first token
+    token_interval: Latency = field(default_factory=Latency)  # Between generated tokens
+    answer_words: int = 32  # Words in each answer (fewer if max_tokens is lower)
+    rate_limit_probability: float = 0.0  # Share of requests refused with 429 at random
+    requests_per_minute: Optional[int] = None  # 429 beyond this many requests in the last minute
+    tokens_per_minute: Optional[int] = None  # 429 beyond this many prompt tokens in the last minute
+    retry_after: float = 1.0  # Seconds suggested by 429 responses
+    seed: int = 0
+
+
+def stub_embedding(text: str, dimension: int) -> np.ndarray:
+    """Deterministic unit vector for a text."""
+    rng = np.random.default_rng(zlib.crc32(text.encode('utf-8')))
+    vector = rng.standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def stub_answer(messages: List[Dict[str, Any]], words: int) -> str:
+    """Deterministic answer built from the words of the last user message."""
+    question = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+    source = question.split() or ['stub']
+    rng = random.Random(zlib.crc32(question.encode('utf-8')))
+    return ' '.join(rng.choice(source) for _ in range(words))
+
+
+class StubState:
+    """Counters and the sliding rate-limit window; read from the test thread through stats()."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.window: Deque[Tuple[float, int]] = deque()  # (time, prompt tokens) of admitted requests
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests: Dict[str, int] = {'embeddings': 0, 'chat': 0}
+            self.rate_limited = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.latencies: Dict[str, List[float]] = {'embeddings': [], 'chat': []}
+            self.window.clear()
+
+    def admit(self, tokens: int) -> bool:
+        """Whether a request may be served now (False: answer 429)."""
+        config = self.config
+        now = time.monotonic()
+        with self.lock:
+            while self.window and self.window[0][0] <= now - 60:
+                self.window.popleft()
+            limited = (
+                self.rng.random() < config.rate_limit_probability
+                or (config.requests_per_minute is not None and len(self.window) >= config.requests_per_minute)
+                or (config.tokens_per_minute is not None
+                    and sum(t for _, t in self.window) + tokens > config.tokens_per_minute)
+            )
+            if limited:
+                self.rate_limited += 1
+                return False
+            self.window.append((now, tokens))
+            return True
+
+    def sample(self, latency: Latency) -> float:
+        with self.lock:
+            return latency.sample(self.rng)
+
+    def record(self, endpoint: str, seconds: float, prompt_tokens: int, completion_tokens: int = 0) -> None:
+        with self.lock:
+            self.requests[endpoint] += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.latencies[endpoint].append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'rate_limited': self.rate_limited,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'latency': {
+                    endpoint: {
+                        'count': len(values),
+                        'p50': float(np.percentile(values, 50)),
+                        'p99': float(np.percentile(values, 99))
+                    }
+                    for endpoint, values in self.latencies.items() if values
+                }
+            }
+
+
+def _error(status_code: int, message: str, error_type: str, code: str,
+           headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={'error': {'message': message, 'type': error_type, 'param': None, 'code': code}},
+        headers=headers
+    )
+
+
+def _rate_limited(config: StubConfig) -> JSONResponse:
+    return _error(429, "Rate limit reached (stub)", 'requests', 'rate_limit_exceeded', headers={
+        'retry-after': str(max(int(config.retry_after), 1)),
+        'retry-after-ms': str(int(config.retry_after * 1000))
+    })
+
+
+def chat_prompt_tokens(messages: List[Dict[str, Any]], model: str) -> int:
+    """Prompt tokens as the API counts them: content plus a few tokens per message."""
+    return sum(count_tokens(m.get('content') or '', model) + 3 for m in messages) + 3
+
+
+def create_app(config: Optional[StubConfig] = None, state: Optional[StubState] = None) -> Starlette:
+    """The stub API as an ASGI app (state holds its counters)."""
+    config = config or StubConfig()
+    state = state or StubState(config)
+
+    async def embeddings(request: Request) -> JSONResponse:
+        start = time.perf_counter()
+        body = await request.json()
+        texts = body.get('input')
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts or not all(isinstance(text, str) for text in texts):
+            return _error(400, "'input' must be a string or a list of strings", 'invalid_request_error', 'invalid_input')
+        model = body.get('model', EMBEDDING_MODEL)
+        tokens = sum(count_tokens(text, model) for text in texts)
+        if not state.admit(tokens):
+            return _rate_limited(config)
+
+        await asyncio.sleep(state.sample(config.embedding_latency)
+                            + config.embedding_seconds_per_1k_tokens * tokens / 1000)
+        dimension = body.get('dimensions') or config.embedding_dimension
+        data = []
+        for i, text in enumerate(texts):
+            vector = stub_embedding(text, dimension)
+            embedding = base64.b64encode(vector.tobytes()).decode() \
+                if body.get('encoding_format') == 'base64' else vector.tolist()
+            data.append({'object': 'embedding', 'index': i, 'embedding': embedding})
+        state.record('embeddings', time.perf_counter() - start, tokens)
+        return JSONResponse({
+            'object': 'list',
+            'data': data,
+            'model': model,
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        })
+
+    async def chat_completions(request: Request):
+        start = time.perf_counter()
+        body = await request.json()
+        messages = body.get('messages') or []
+        if not messages:
+            return _error(400, "'messages' is required", 'invalid_request_error', 'invalid_messages')
+        model = body.get('model', GPT_MODEL)
+        prompt_tokens = chat_prompt_tokens(messages, model)
+        if not state.admit(prompt_tokens):
+            return _rate_limited(config)
+
+        words = stub_answer(messages, config.answer_words).split(' ')
+        max_tokens = body.get('max_tokens') or body.get('max_completion_tokens')
+        if max_tokens:
+            words = words[:max_tokens]
+        answer = ' '.join(words)
+        completion_tokens = count_tokens(answer, model)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+        completion_id = f"chatcmpl-stub{zlib.crc32(answer.encode()):08x}"
+        created = int(time.time())
+
+        if not body.get('stream'):
+            await asyncio.sleep(state.sample(config.chat_latency)
+                                + sum(state.sample(config.token_interval) for _ in words))
+            state.record('chat', time.perf_counter() - start, prompt_tokens, completion_tokens)
+            return JSONResponse({
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': answer},
+                    'finish_reason': 'stop'
+                }],
+                'usage': usage
+            })
+
+        include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            return 'data: ' + json.dumps({
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }) + '\n\n'
+
+        async def events():
+            await asyncio.sleep(state.sample(config.chat_latency))
+            yield chunk({'role': 'assistant', 'content': ''})
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(state.sample(config.token_interval))
+                yield chunk({'content': word if i == 0 else f" {word}"})
+            yield chunk({}, 'stop')
+            if include_usage:
+                yield 'data: ' + json.dumps({
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': created,
+                    'model': model,
+                    'choices': [],
+                    'usage': usage
+                }) + '\n\n'
+            yield 'data: [DONE]\n\n'
+            state.record('chat', time.perf_counter() - start, prompt_tokens, completion_tokens)
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    app = Starlette(routes=[
+        Route('/v1/embeddings', embeddings, methods=['POST']),
+        Route('/v1/chat/completions', chat_completions, methods=['POST']),
+    ])
+    app.state.stub = state
+    return app
+
+
+class OpenAIStubServer:
+    """Runs the stub API with uvicorn in a background thread (port 0: a free port)."""
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or StubConfig()
+        self.state = StubState(self.config)
+        self.app = create_app(self.config, self.state)
+        self.host = host
+        self.port = port
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self, timeout: float = 10.0) -> 'OpenAIStubServer':
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host=self.host, port=self.port, log_level='warning', lifespan='off'
+        ))
+        self._thread = threading.Thread(target=self._server.run, name='openai-stub', daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("OpenAI stub server did not start")
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+            self._server = self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return self.state.stats()
+
+    def reset(self) -> None:
+        self.state.reset()
+
+    def __enter__(self) -> 'OpenAIStubServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--embedding-latency', default='0', help="kind:median[:spread], e.g. lognormal:0.1:0.4")
+    parser.add_argument('--chat-latency', default='0', help="Time to first token, kind:median[:spread]")
+    parser.add_argument('--token-interval', default='0', help="Between streamed tokens, kind:median[:spread]")
+    parser.add_argument('--answer-words', type=int, default=32)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Share of requests refused with 429")
+    parser.add_argument('--rpm', type=int, default=None, help="Requests per minute before 429")
+    parser.add_argument('--tpm', type=int, default=None, help="Prompt tokens per minute before 429")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        embedding_latency=Latency.parse(args.embedding_latency),
+        chat_latency=Latency.parse(args.chat_latency),
+        token_interval=Latency.parse(args.token_interval),
+        answer_words=args.answer_words,
+        rate_limit_probability=args.rate_limit,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        seed=args.seed
+    )
+    print(f"OpenAI stub at http://{args.host}:{args.port}/v1 (set OPENAI_BASE_URL to use it)")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import asyncio
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from src.web.admission import AdmissionLimiter, AdmissionMiddleware, Overloaded
+from src.web.auth.middleware import AuthMiddleware
+from src.utils.metrics import MetricsCollector
+
+
+def make_limiter(max_concurrent=1, max_queue=1, queue_timeout=1.0, **kwargs):
+    return AdmissionLimiter("query", max_concurrent, max_queue, queue_timeout, metrics=MetricsCollector(), **kwargs)
+
+
+def test_waiters_are_admitted_in_order():
+    limiter = make_limiter(max_concurrent=1, max_queue=5)
+    order = []
+
+    async def request(name):
+        await limiter.acquire()
+        order.append(name)
+        await asyncio.sleep(0.01)
+        limiter.release(0.01)
+
+    async def run():
+        await asyncio.gather(*(request(i) for i in range(4)))
+
+    asyncio.run(run())
+    assert order == [0, 1, 2, 3]
+    assert limiter.active == 0 and limiter.waiting == 0
+    assert limiter.metrics.get_counter("admission_query_admitted") == 4
+    assert limiter.metrics.get_histogram_stats("admission_query_queue_seconds")['max'] > 0
+
+
+def test_full_queue_is_refused_with_429():
+    limiter = make_limiter(max_concurrent=1, max_queue=1)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as error:
+            await limiter.acquire()
+        limiter.release(2.0)
+        await waiter
+        limiter.release(2.0)
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 429
+    assert error.retry_after >= 1
+    assert limiter.metrics.get_counter("admission_query_rejected") == 1
+
+
+def test_queue_timeout_is_refused_with_503():
+    limiter = make_limiter(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+
+    async def run():
+        await limiter.acquire()
+        with pytest.raises(Overloaded) as error:
+            await limiter.acquire()
+        return error.value
+
+    assert asyncio.run(run()).status_code == 503
+    assert limiter.waiting == 0
+    assert limiter.metrics.get_counter("admission_query_timed_out") == 1
+
+
+def test_backlog_limit():
+    backlog = [3]
+    limiter = make_limiter(backlog=lambda: backlog[0], max_backlog=3)
+    with pytest.raises(Overloaded) as error:
+        asyncio.run(limiter.acquire())
+    assert error.value.status_code == 503
+
+    backlog[0] = 2
+    assert asyncio.run(limiter.acquire()) == 0.0
+
+
+def test_middleware_refuses_overload_with_retry_after():
+    limiter = make_limiter(max_concurrent=1, max_queue=0)
+
+    async def slow(request):
+        await asyncio.sleep(0.1)
+        return PlainTextResponse("answer")
+
+    async def other(request):
+        return PlainTextResponse("ok")
+
+    app = AdmissionMiddleware(Starlette(routes=[Route("/ask", slow), Route("/other", other)]), [("/ask", limiter)])
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/ask"))
+            await asyncio.sleep(0.02)
+            refused = await client.get("/ask")
+            unlimited = await client.get("/other")
+            return await first, refused, unlimited
+
+    first, refused, unlimited = asyncio.run(run())
+    assert first.status_code == 200
+    assert refused.status_code == 429
+    assert int(refused.headers["Retry-After"]) >= 1
+    assert unlimited.status_code == 200
+    assert limiter.active == 0
+
+
+def test_unauthenticated_requests_never_reach_the_limiter():
+    limiter = make_limiter(max_concurrent=1, max_queue=0)
+
+    async def ask(request):
+        return PlainTextResponse("answer")
+
+    # Same order as the app: admission is added before auth, so it runs inside it
+    app = Starlette(routes=[Route("/ask", ask)])
+    app.add_middleware(AdmissionMiddleware, limiters=[("/ask", limiter)])
+    app.add_middleware(AuthMiddleware, users={"admin": "secret"})
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ask"), await client.get("/ask", auth=("admin", "secret"))
+
+    refused, answered = asyncio.run(run())
+    assert refused.status_code == 401
+    assert answered.status_code == 200
+    assert limiter.metrics.get_counter("admission_query_admitted") == 1  # Only the authenticated request
@@ -52,8 +52,27 @@ def test_upload_valid_file(auth_headers, test_file):
     with open(test_file, "rb") as f:
         files = {"file": ("test.txt", f, "text/plain")}
         response = client.post("/upload", headers=auth_headers, files=files)
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
+    assert response.status_code == 202
+    assert response.json()["status"] == "accepted"
+    job_id = response.json()["job_id"]
+    job = client.get(f"/jobs/{job_id}", headers=auth_headers)
+    assert job.status_code == 200
+    assert job.json()["job_id"] == job_id
+
+def test_unknown_job(auth_headers):
+    """Test job status of an unknown job"""
+    response = client.get("/jobs/unknown", headers=auth_headers)
+    assert response.status_code == 404
+
+def test_job_status_is_only_visible_to_its_owner(auth_headers, test_file):
+    """Статус задания /jobs/{id} - только для владельца задания"""
+    with open(test_file, "rb") as f:
+        response = client.post("/upload", headers=auth_headers, files={"file": ("test.txt", f, "text/plain")})
+    job_id = response.json()["job_id"]
+
+    response = client.get(f"/jobs/{job_id}", headers=get_auth_header("tester1", "41dsf3qw7sDa"))
+    assert response.status_code == 404
+    assert client.get(f"/jobs/{job_id}", headers=auth_headers).status_code == 200
 
 def test_ask_question_no_book(auth_headers):
     """Test ask endpoint requires book upload first"""
@@ -61,6 +80,11 @@ def test_ask_question_no_book(auth_headers):
     assert response.status_code == 400
     assert "No book data available" in response.json()["detail"]
 
+def test_ask_batch_validation(auth_headers):
+    """Test batch endpoint rejects an empty question list"""
+    response = client.post("/ask/batch", headers=auth_headers, json={"questions": []})
+    assert response.status_code == 422
+
 @pytest.mark.asyncio
 async def test_websocket_connection():
     """Test WebSocket connection"""
@@ -69,6 +93,20 @@ async def test_websocket_connection():
         # Test disconnection
         websocket.close()
 
+def test_job_websocket_requires_the_job_owner(auth_headers, test_file):
+    """Канал задания /ws?job_id=... - только для владельца задания"""
+    from starlette.websockets import WebSocketDisconnect
+    with open(test_file, "rb") as f:
+        response = client.post("/upload", headers=auth_headers, files={"file": ("test.txt", f, "text/plain")})
+    job_id = response.json()["job_id"]
+
+    for headers in ({}, get_auth_header("tester1", "41dsf3qw7sDa")):
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f"/ws?job_id={job_id}", headers=headers):
+                pass
+    with client.websocket_connect(f"/ws?job_id={job_id}", headers=auth_headers) as websocket:
+        websocket.close()
+
 def test_allowed_file():
     """Test file extension validation"""
     from src.web.app import allowed_file
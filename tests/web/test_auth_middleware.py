@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import time
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from src.web.auth.middleware import AuthMiddleware, PublicPathMatcher, verify_password
+
+USERS = {"admin": "secret"}
+PUBLIC_PATHS = ["/login", "/static", "/health", "/"]
+
+
+def basic(username, password):
+    return {"Authorization": "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()}
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+async def login(request):
+    request.session["user"] = "admin"
+    return PlainTextResponse("logged in")
+
+
+def make_app(middleware=AuthMiddleware, **kwargs):
+    app = Starlette(routes=[Route("/", ok), Route("/health", ok), Route("/ask", ok), Route("/login", login)])
+    app.add_middleware(middleware, public_paths=PUBLIC_PATHS, **kwargs)
+    app.add_middleware(SessionMiddleware, secret_key="test")
+    return app
+
+
+def run_requests(app, requests):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path, headers=headers) for path, headers in requests]
+    return asyncio.run(run())
+
+
+def test_public_path_matcher():
+    is_public = PublicPathMatcher(PUBLIC_PATHS)
+    assert is_public("/") and is_public("/static/js/main.js") and is_public("/health")
+    assert not is_public("/ask")  # The root is not a prefix of every path
+
+
+def test_verify_password():
+    assert verify_password(USERS, "admin", "secret")
+    assert not verify_password(USERS, "admin", "wrong")
+    assert not verify_password(USERS, "nobody", "")
+
+
+def test_requests_need_valid_credentials_or_session():
+    app = make_app(users=USERS)
+    responses = run_requests(app, [
+        ("/health", {}),
+        ("/ask", {}),
+        ("/ask", basic("admin", "wrong")),
+        ("/ask", {"Authorization": "Basic not-base64!"}),
+        ("/ask", basic("admin", "secret")),
+        ("/ask", {"Authorization": "Bearer token"}),
+        ("/ask", {"Authorization": "Token secret"}),
+    ])
+    assert [r.status_code for r in responses] == [200, 401, 401, 401, 200, 401, 401]
+    assert responses[1].headers["WWW-Authenticate"] == "Basic"
+
+
+def test_bearer_tokens_need_a_verifier():
+    app = make_app(users=USERS, token_verifier=lambda token: token == "valid")
+    responses = run_requests(app, [
+        ("/ask", {"Authorization": "Bearer valid"}),
+        ("/ask", {"Authorization": "Bearer garbage"}),
+        ("/ask", {"Authorization": "Bearer "}),
+    ])
+    assert [r.status_code for r in responses] == [200, 401, 401]
+
+
+def test_session_user_is_authenticated():
+    app = make_app(users=USERS)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/login")
+            return await client.get("/ask")
+
+    assert asyncio.run(run()).status_code == 200
+
+
+def test_credential_checks_are_cached():
+    middleware = AuthMiddleware(ok, users=USERS)
+    header = basic("admin", "secret")["Authorization"].encode()
+    for _ in range(3):
+        assert middleware._check_authorization(header)
+    assert middleware._check_basic.cache_info().hits == 2
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    """The former BaseHTTPMiddleware implementation, as the benchmark baseline."""
+
+    def __init__(self, app, public_paths=None, users=None):
+        super().__init__(app)
+        self.public_paths = public_paths or []
+
+    async def dispatch(self, request, call_next):
+        if any(request.url.path.startswith(p) for p in self.public_paths if p != "/"):
+            return await call_next(request)
+        if not request.headers.get('Authorization') and not request.session.get("user"):
+            return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+        return await call_next(request)
+
+
+@pytest.mark.performance
+def test_per_request_overhead():
+    """Per-request time of the protected endpoint behind the legacy and the ASGI middleware."""
+    requests = [("/ask", basic("admin", "secret"))] * 500
+    timings = {}
+    for name, middleware in (("BaseHTTPMiddleware", LegacyAuthMiddleware), ("ASGI", AuthMiddleware)):
+        app = make_app(middleware, users=USERS)
+        run_requests(app, requests[:50])  # Warm up
+        start = time.perf_counter()
+        responses = run_requests(app, requests)
+        timings[name] = (time.perf_counter() - start) / len(requests)
+        assert all(r.status_code == 200 for r in responses)
+        print(f"\n{name}: {timings[name] * 1e6:.0f} µs/request")
+
+    assert timings["ASGI"] < timings["BaseHTTPMiddleware"]
@@ -0,0 +1,73 @@
+import sys
+import threading
+import numpy as np
+import pytest
+from src.book_library import BookLibrary
+from src.web.book_catalog import BookCatalog
+from src.web.book_registry import BookRegistry, book_memory_size
+from src.utils.metrics import MetricsCollector
+from src.search import CosineSearch
+from tests.utils.mock_factory import make_book
+
+
+def test_changes_report_new_and_replaced_entries(tmp_path):
+    catalog = BookCatalog(str(tmp_path))
+    catalog.publish("alice", "b1", "key-1")
+    catalog.publish("bob", "b2", "key-2")
+
+    assert [e['book_id'] for e in catalog.changes()] == ["b1", "b2"]
+    assert catalog.changes() == []
+
+    catalog.publish("alice", "b1", "key-3")
+    assert [(e['book_id'], e['snapshot_key']) for e in catalog.changes()] == [("b1", "key-3")]
+    assert len(catalog.entries()) == 2
+
+
+def test_book_ingested_by_one_worker_is_served_by_another(tmp_path):
+    library = BookLibrary(str(tmp_path / "library"))
+    library.put("key-a", make_book("a"), wait=False)
+
+    # Worker 1 publishes once the snapshot is stored; worker 2 watches the catalog
+    library.when_saved("key-a", lambda key: BookCatalog(str(tmp_path / "catalog")).publish("alice", "a", key))
+    registry = BookRegistry(library, metrics=MetricsCollector())
+    catalog = BookCatalog(str(tmp_path / "catalog"), poll_interval=0.02)
+    registered = threading.Event()
+
+    def listener(entries):
+        for entry in entries:
+            registry.register(entry['owner'], entry['book_id'], entry['snapshot_key'], entry['updated_at'])
+        registered.set()
+
+    catalog.watch(listener)
+    try:
+        assert registered.wait(5)
+        book = registry.get("alice")
+    finally:
+        catalog.stop()
+
+    assert book.get_chunks() == make_book("a").get_chunks()
+    assert isinstance(book.get_embeddings(), np.memmap)
+    assert book_memory_size(book) == sum(sys.getsizeof(chunk) for chunk in book.get_chunks())  # Index pages are shared
+    assert registry.metrics.get_counter("registry_reloads") == 1
+
+
+def test_register_replaces_stale_snapshot(tmp_path):
+    registry = BookRegistry(None, metrics=MetricsCollector())
+    registry.put("alice", "a", make_book(), "key-1")
+    assert not registry.register("alice", "a", "key-1")
+    assert registry.register("alice", "a", "key-2")
+    assert registry.list("alice")[0]['loaded'] is False
+    assert registry.stats()['loaded_bytes'] == 0
+
+
+def test_search_over_memory_mapped_index(tmp_path):
+    library = BookLibrary(str(tmp_path))
+    library.put("key", make_book())
+    mapped = library.get("key")
+    assert mapped.get_embeddings().dtype == np.float32
+
+    query = make_book().get_embeddings()[2]
+    expected = CosineSearch(make_book(), None).rank(query, 2)
+    results = CosineSearch(mapped, None).rank(query, 2)
+    assert [r['chunk'] for r in results] == [r['chunk'] for r in expected] == ["chunk 2", expected[1]['chunk']]
+    assert results[0]['score'] == pytest.approx(1.0, abs=1e-5)
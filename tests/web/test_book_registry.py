@@ -0,0 +1,118 @@
+import threading
+import pytest
+from src.book_library import BookLibrary
+from src.web.book_registry import BookRegistry, book_memory_size
+from src.utils.metrics import MetricsCollector
+from tests.utils.mock_factory import make_book
+
+
+@pytest.fixture
+def library(tmp_path):
+    return BookLibrary(str(tmp_path / "library"))
+
+
+def registry_for(library, books):
+    """Registry with room for exactly the given number of test books."""
+    return BookRegistry(library, memory_budget=book_memory_size(make_book()) * books, metrics=MetricsCollector())
+
+
+def test_memory_size_grows_with_embeddings():
+    assert book_memory_size(make_book(dim=64)) > book_memory_size(make_book(dim=8))
+
+
+def test_books_are_kept_per_owner(library):
+    registry = registry_for(library, 10)
+    alice_book, bob_book = make_book(text="alice"), make_book(text="bob")
+    registry.put("alice", "book", alice_book)
+    registry.put("bob", "book", bob_book)
+
+    assert registry.get("alice", "book") is alice_book
+    assert registry.get("bob") is bob_book  # Latest book of the owner
+    with pytest.raises(KeyError):
+        registry.get("carol")
+    with pytest.raises(KeyError):
+        registry.get("alice", "other")
+
+
+def test_least_recently_used_book_is_evicted_and_reloaded(library):
+    registry = registry_for(library, 2)
+    books = {name: make_book(text=name) for name in ("a", "b", "c")}
+    for name, book in books.items():
+        library.put(f"key-{name}", book)
+
+    registry.put("user", "a", books["a"], "key-a")
+    registry.put("user", "b", books["b"], "key-b")
+    registry.get("user", "a")  # "b" becomes the least recently used
+    registry.put("user", "c", books["c"], "key-c")
+
+    loaded = {book['book_id']: book['loaded'] for book in registry.list("user")}
+    assert loaded == {"a": True, "b": False, "c": True}
+    assert registry.stats()['loaded_bytes'] <= registry.memory_budget
+
+    reloaded = registry.get("user", "b")
+    assert reloaded.get_chunks() == books["b"].get_chunks()
+    assert registry.metrics.get_counter("registry_evictions") == 2  # "b", then "a" to make room for it
+    assert registry.metrics.get_counter("registry_reloads") == 1
+
+
+def test_evicted_book_without_snapshot_is_dropped():
+    registry = registry_for(None, 1)
+    registry.put("user", "a", make_book())
+    registry.put("user", "b", make_book())
+    assert [book['book_id'] for book in registry.list("user")] == ["b"]
+
+
+def test_concurrent_requests_reload_once(library):
+    registry = registry_for(library, 1)
+    library.put("key-a", make_book(text="a"))
+    registry.put("user", "a", make_book(text="a"), "key-a")
+    registry.put("user", "b", make_book(text="b"), "key-b")  # Evicts "a"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("user", "a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+    assert registry.metrics.get_counter("registry_reloads") == 1
+
+
+def test_evicted_books_are_persisted_outside_the_registry_lock(library):
+    registry = registry_for(library, 1)
+    locked_during_io = []
+    get_entry, put = library.get_entry, library.put
+
+    def checked_get_entry(key):
+        locked_during_io.append(registry._lock.locked())
+        return get_entry(key)
+
+    def checked_put(key, book_data, wait=True):
+        locked_during_io.append(registry._lock.locked())
+        return put(key, book_data, wait=True)
+
+    library.get_entry, library.put = checked_get_entry, checked_put
+    registry.put("user", "a", make_book(text="a"), "key-a")
+    registry.put("user", "b", make_book(text="b"), "key-b")  # Evicts and persists "a"
+
+    assert locked_during_io == [False, False]
+    assert registry.get("user", "a").get_chunks() == make_book(text="a").get_chunks()
+
+
+def test_missing_snapshot_does_not_drop_a_replacing_book(library):
+    registry = registry_for(library, 1)
+    registry.put("user", "a", make_book(text="a"), "key-a")
+    registry.put("user", "b", make_book(text="b"), "key-b")  # Evicts "a"
+    fresh = make_book(text="fresh")
+
+    def get_while_replaced(key, embedding_service=None):
+        registry.put("user", "a", fresh, "key-a2")  # A new version arrives during the reload
+        return None
+
+    library.get = get_while_replaced
+    with pytest.raises(KeyError):
+        registry.get("user", "a")
+
+    assert registry.get("user", "a") is fresh
@@ -0,0 +1,105 @@
+import time
+import threading
+import pytest
+from src.web.jobs import JobManager, COMPLETED, FAILED, QUEUED, RUNNING
+from src.utils.metrics import MetricsCollector
+
+
+def wait_done(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.done
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, history_limit=3, metrics=MetricsCollector())
+    yield manager
+    manager.shutdown(wait=True)
+
+
+def test_submit_returns_immediately(manager):
+    release = threading.Event()
+    job = manager.submit(lambda progress: release.wait(5) and {"ok": True}, filename="book.txt")
+
+    assert job.status in (QUEUED, RUNNING)
+    assert manager.get(job.id) is job
+    assert job.to_dict()["info"] == {"filename": "book.txt"}
+
+    release.set()
+    wait_done(job)
+    assert job.status == COMPLETED
+    assert job.result == {"ok": True}
+    assert job.to_dict()["timings"]["run_seconds"] >= 0
+
+
+def test_progress_is_reported_per_job(manager):
+    seen = []
+    release = threading.Event()
+
+    def work(progress):
+        release.wait(5)
+        progress("Storing vectors", 5, 10)
+        seen.append(dict(job.progress))
+        return {}
+
+    job = manager.submit(work)
+    release.set()
+    wait_done(job)
+    assert seen == [{"status": "Storing vectors", "current": 5, "total": 10, "progress": 50.0}]
+    assert job.progress["progress"] == 100.0
+
+
+def test_failed_job_records_error(manager):
+    def work(progress):
+        raise ValueError("No text extracted")
+
+    job = manager.submit(work)
+    wait_done(job)
+    assert job.status == FAILED
+    assert job.error == "No text extracted"
+    assert job.finished_at is not None
+    assert manager.metrics.get_counter("jobs_ingest_failed") == 1
+
+
+def test_queue_time_is_measured(manager):
+    release = threading.Event()
+    first = manager.submit(lambda progress: release.wait(5))
+    second = manager.submit(lambda progress: {})
+    time.sleep(0.1)
+    assert second.status == QUEUED  # The only worker is busy
+
+    release.set()
+    wait_done(first)
+    wait_done(second)
+    assert second.timings()["queued_seconds"] >= 0.1
+
+
+def test_finished_jobs_are_pruned(manager):
+    jobs = [manager.submit(lambda progress: {}) for _ in range(3)]
+    for job in jobs:
+        wait_done(job)
+    latest = manager.submit(lambda progress: {})
+    wait_done(latest)
+
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(latest.id) is latest
+    assert len(manager.list()) == 3
+
+
+def test_job_state_is_shared_through_state_dir(tmp_path):
+    worker = JobManager(max_workers=1, metrics=MetricsCollector(), state_dir=str(tmp_path))
+    other_worker = JobManager(max_workers=1, metrics=MetricsCollector(), state_dir=str(tmp_path))
+    try:
+        job = worker.submit(lambda progress: {"book_id": "b1"}, filename="book.txt")
+        wait_done(job)
+
+        seen = other_worker.get(job.id)
+        assert seen is not None and seen is not job
+        assert seen.to_dict()["status"] == COMPLETED
+        assert seen.result == {"book_id": "b1"}
+        assert other_worker.get("0" * 32) is None
+        assert other_worker.get("../secrets") is None
+    finally:
+        worker.shutdown(wait=True)
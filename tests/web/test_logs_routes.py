@@ -0,0 +1,34 @@
+import base64
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.web.auth.dependencies import USERS
+from src.web.routes.logs import router
+
+
+def make_client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_logs_reject_bogus_bearer_token():
+    client = make_client()
+    for path in ["/logs/main", "/logs/main/follow"]:
+        response = client.get(path, headers={"Authorization": "Bearer garbage"})
+        assert response.status_code == 401, path
+        assert client.get(path).status_code == 401, path
+
+
+def test_logs_accept_basic_credentials():
+    credentials = base64.b64encode(f"admin:{USERS['admin']}".encode()).decode()
+    response = make_client().get("/logs/main?lines=5", headers={"Authorization": f"Basic {credentials}"})
+
+    assert response.status_code == 200
+    assert "logs" in response.json()
+
+
+def test_unknown_log_type_is_404():
+    credentials = base64.b64encode(f"admin:{USERS['admin']}".encode()).decode()
+    response = make_client().get("/logs/secrets", headers={"Authorization": f"Basic {credentials}"})
+
+    assert response.status_code == 404
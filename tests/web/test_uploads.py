@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import Future
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+from src.web.uploads import save_upload, make_upload_path, remove_upload, ContentLengthLimitMiddleware
+
+
+def _upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="book.txt")
+
+
+def test_save_upload_hashes_while_writing(tmp_path):
+    content = b"chapter one " * 1000
+    path = tmp_path / "book.txt"
+
+    size, content_hash = asyncio.run(save_upload(_upload(content), str(path), chunk_size=1024))
+
+    assert size == len(content)
+    assert content_hash == hashlib.sha256(content).hexdigest()
+    assert path.read_bytes() == content
+
+
+def test_save_upload_rejects_oversized_file(tmp_path):
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(save_upload(_upload(b"x" * 5000), str(tmp_path / "big.txt"), max_size=4096, chunk_size=1024))
+    assert exc_info.value.status_code == 413
+
+
+def test_middleware_rejects_declared_length_before_reading_body():
+    app = FastAPI()
+    body_read = []
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        body_read.append(await request.body())
+        return {"status": "ok"}
+
+    app.add_middleware(ContentLengthLimitMiddleware, max_size=10, paths=["/upload"])
+    client = TestClient(app)
+
+    assert client.post("/upload", content=b"x" * 11).status_code == 413
+    assert body_read == []
+    assert client.post("/upload", content=b"x" * 5).status_code == 200
+
+
+def test_middleware_stops_a_chunked_upload_past_the_limit():
+    app = FastAPI()
+    parsed = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile):
+        parsed.append(file.filename)
+        return {"status": "ok"}
+
+    app.add_middleware(ContentLengthLimitMiddleware, max_size=1000, paths=["/upload"])
+
+    def post(size):
+        """Send a multipart body in 100-byte messages without Content-Length; return (status, messages taken)."""
+        content = (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"book.txt\"\r\n\r\n"
+                   + b"x" * size + b"\r\n--b--\r\n")
+        pieces = [content[i:i + 100] for i in range(0, len(content), 100)]
+        taken, sent = [], []
+
+        async def receive():
+            body = pieces[len(taken)]
+            taken.append(body)
+            return {"type": "http.request", "body": body, "more_body": len(taken) < len(pieces)}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/upload", "raw_path": b"/upload", "query_string": b"",
+                 "headers": [(b"content-type", b"multipart/form-data; boundary=b")], "root_path": "",
+                 "scheme": "http", "server": ("test", 80), "client": ("test", 1234), "http_version": "1.1"}
+        asyncio.run(app(scope, receive, send))
+        return sent[0]["status"], len(taken)
+
+    status, taken = post(100_000)
+    assert status == 413
+    assert taken == 11  # Refused at the first message past the limit, not after 1000 messages
+    assert parsed == []
+    assert post(500)[0] == 200
+    assert parsed == ["book.txt"]
+
+
+def test_uploads_with_the_same_name_get_separate_paths(tmp_path):
+    first = make_upload_path(str(tmp_path), "book.txt")
+    second = make_upload_path(str(tmp_path), "../book.txt")
+
+    assert first != second
+    assert os.path.basename(first) == os.path.basename(second) == "book.txt"
+    assert os.path.dirname(os.path.dirname(second)) == str(tmp_path)  # No path traversal
+
+
+def test_upload_is_removed_after_its_storage_upload(tmp_path):
+    path = make_upload_path(str(tmp_path), "book.txt")
+    open(path, "w").close()
+    storage_upload = Future()
+
+    remove_upload(path, storage_upload)
+    assert os.path.exists(path)  # Still read by the storage upload
+    storage_upload.set_result("file:///stored/book.txt")
+    assert not os.path.exists(os.path.dirname(path))
+
+    other = make_upload_path(str(tmp_path), "other.txt")
+    remove_upload(other)
+    assert not os.path.exists(os.path.dirname(other))
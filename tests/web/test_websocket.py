@@ -1,3 +1,6 @@
+import asyncio
+import threading
+import time
 import pytest
 from src.web.websocket import WebSocketManager
 from fastapi import WebSocket
@@ -50,4 +53,79 @@ async def test_emit_progress(ws_manager, mock_websocket):
     mock_websocket.send_json.assert_called_once()
     called_data = mock_websocket.send_json.call_args[0][0]
     assert called_data["type"] == "progress"
-    assert called_data["progress"] == 50.0 
\ No newline at end of file
+    assert called_data["progress"] == 50.0 
+
+def make_socket(send_delay: float = 0.0, error: Exception = None):
+    ws = Mock(spec=WebSocket)
+    ws.accept = AsyncMock()
+    sent = []
+
+    async def send_json(data):
+        if error:
+            raise error
+        await asyncio.sleep(send_delay)
+        sent.append(data)
+
+    ws.send_json = send_json
+    ws.sent = sent
+    return ws
+
+
+def test_channels_are_isolated():
+    manager = WebSocketManager()
+    job_socket, other_socket = make_socket(), make_socket()
+
+    async def run():
+        await manager.connect(job_socket, "job:1")
+        await manager.connect(other_socket, "job:2")
+        await manager.emit_progress("Storing vectors", 1, 2, client_id="job:1")
+
+    asyncio.run(run())
+    assert len(job_socket.sent) == 1
+    assert other_socket.sent == []
+
+
+def test_slow_client_does_not_stall_others():
+    manager = WebSocketManager(send_timeout=0.1)
+    slow, fast, broken = make_socket(send_delay=5), make_socket(), make_socket(error=RuntimeError("closed"))
+
+    async def run():
+        for ws in (slow, fast, broken):
+            await manager.connect(ws, "job:1")
+        start = time.perf_counter()
+        await manager.emit_progress("Creating embeddings", 1, 10, client_id="job:1")
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < 1
+    assert len(fast.sent) == 1
+    assert slow in manager.active_connections["job:1"]  # Timed out, still connected
+    assert broken not in manager.active_connections["job:1"]  # Failed, disconnected
+
+
+def test_progress_is_throttled_and_latest_kept():
+    manager = WebSocketManager(max_rate=10)
+    ws = make_socket()
+
+    async def run():
+        await manager.connect(ws, "job:1")
+        await asyncio.gather(*(manager.emit_throttled("job:1", "Storing vectors", i, 100) for i in range(1, 51)))
+
+    asyncio.run(run())
+    assert [event["current"] for event in ws.sent] == [1, 50]  # First sent at once, the rest coalesced
+
+
+def test_publish_from_worker_thread():
+    manager = WebSocketManager(max_rate=0)
+    ws = make_socket()
+
+    async def run():
+        manager.bind_loop(asyncio.get_running_loop())
+        await manager.connect(ws, "job:1")
+        callback = manager.progress_callback("job:1")
+        thread = threading.Thread(target=lambda: [callback("Storing vectors", i, 3) for i in range(1, 4)])
+        thread.start()
+        await asyncio.to_thread(thread.join)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert [event["current"] for event in ws.sent] == [1, 2, 3]